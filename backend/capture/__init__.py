@@ -5,19 +5,35 @@ Provides paper detection, perspective correction, lighting normalization,
 and ghost overlay blending for mobile drawing capture.
 """
 
-from .pipeline import run_capture
-from .models import CaptureResult
-from .geometry import detect_paper_quad, warp_perspective
+from .pipeline import run_capture, LazyCaptureResult
+from .recapture import RecaptureSession, RecaptureResult
+from .batch import run_capture_batch, BatchItem
+from .models import CaptureResult, PaperDetection, TrackingResult
+from .geometry import detect_paper_quad, detect_paper, get_strategy_stats, warp_perspective
+from .scheduler import StrategyScheduler
+from .tracking import PaperTracker
 from .lighting import normalize_lighting
-from .svg_overlay import render_svg_to_png, blend_overlay
+from .svg_overlay import render_svg_to_png, blend_overlay, prepare_overlay
 
 __version__ = "1.0.0"
 __all__ = [
     "run_capture",
     "CaptureResult",
+    "LazyCaptureResult",
+    "RecaptureSession",
+    "RecaptureResult",
+    "run_capture_batch",
+    "BatchItem",
+    "PaperDetection",
     "detect_paper_quad",
+    "detect_paper",
+    "get_strategy_stats",
+    "StrategyScheduler",
+    "PaperTracker",
+    "TrackingResult",
     "warp_perspective",
     "normalize_lighting",
     "render_svg_to_png",
     "blend_overlay",
+    "prepare_overlay",
 ]
\ No newline at end of file
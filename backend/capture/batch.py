@@ -0,0 +1,165 @@
+"""Batch capture: many images per request, processed in parallel."""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .encoding import PreviewOptions
+from .executor import CaptureExecutor, ExecutorBusyError
+from .ingest import run_capture_encoded
+from .metrics import failure_reason
+from .pipeline import run_capture
+from .svg_overlay import render_svg_cached
+
+# Input images: decoded BGR arrays or encoded (JPEG/PNG) bytes
+BatchInput = Union[np.ndarray, bytes]
+
+
+@dataclass
+class BatchItem:
+    """Outcome of one image in a batch.
+
+    Attributes:
+        index: Position of the image in the input
+        result: Capture result, or None if the image failed
+        error: Error message if the image failed
+        reason: Failure label (see ``metrics.failure_reason``) if it failed
+        elapsed: Seconds from submission to completion
+    """
+    index: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    reason: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True if the image was captured successfully."""
+        return self.error is None
+
+
+def run_capture_batch(
+    images: Iterable[BatchInput],
+    ghost_svg: Optional[str] = None,
+    ghost_overlay: Optional[np.ndarray] = None,
+    preview: Optional[PreviewOptions] = None,
+    outputs: Optional[Iterable[str]] = None,
+    executor: Optional[CaptureExecutor] = None,
+    workers: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> Iterator[BatchItem]:
+    """Capture many images in parallel, yielding each result as it finishes.
+
+    Items are yielded in completion order; ``BatchItem.index`` gives each
+    item's input position. A failing image yields an item with ``error``
+    set and does not stop the batch.
+
+    The ghost overlay is rendered once and shared by every image. With an
+    ``executor``, at most ``executor.workers`` images are in flight at a
+    time so a batch never exhausts the executor's admission limit on its
+    own; otherwise a private thread pool of ``workers`` threads is used.
+
+    Args:
+        images: Decoded BGR arrays or encoded image bytes
+        ghost_svg: Optional SVG reference overlay for every image
+        ghost_overlay: Optional pre-rendered 1080×1080 overlay; takes
+            precedence over ``ghost_svg``
+        preview: Preview encoding options
+        outputs: Output selection passed to ``run_capture``
+        executor: Optional executor to run on (e.g. the server's)
+        workers: Thread count when no executor is given (default: CPU count)
+        max_pixels: Largest encoded image (width × height) decoded (default
+            ``ingest.MAX_IMAGE_PIXELS``); larger ones fail with reason
+            "too_large"
+
+    Returns:
+        Iterator of BatchItem
+
+    Raises:
+        FileNotFoundError: If ``ghost_svg`` does not exist (raised by this
+            call, before any image is processed)
+    """
+    if ghost_overlay is None and ghost_svg:
+        # Same uniform-alpha overlay create_ghost_overlay derives from an SVG
+        ghost_overlay = cv2.cvtColor(render_svg_cached(ghost_svg, (1080, 1080)),
+                                     cv2.COLOR_BGRA2BGR)
+        ghost_overlay.flags.writeable = False
+
+    kwargs: Dict[str, Any] = {"ghost_overlay": ghost_overlay, "preview": preview}
+    if outputs is not None:
+        kwargs["outputs"] = tuple(outputs)
+
+    window = executor.workers if executor is not None else workers or os.cpu_count() or 1
+    return _iterate_batch(images, kwargs, executor, window, max_pixels)
+
+
+def _iterate_batch(images: Iterable[BatchInput], kwargs: Dict[str, Any],
+                   executor: Optional[CaptureExecutor], window: int,
+                   max_pixels: Optional[int]) -> Iterator[BatchItem]:
+    """Generator behind ``run_capture_batch``, run once shared resources are ready."""
+    own_pool = None
+    if executor is None:
+        own_pool = ThreadPoolExecutor(max_workers=window, thread_name_prefix="capture-batch")
+
+    def submit(item: BatchInput) -> "Future[Any]":
+        func: Callable[..., Any]
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            # Encoded: decoded (at reduced resolution where possible) in the worker
+            img, func = np.frombuffer(item, dtype=np.uint8), run_capture_encoded
+            job_kwargs = dict(kwargs, max_pixels=max_pixels)
+        else:
+            img, func, job_kwargs = item, run_capture, kwargs
+        if own_pool is not None:
+            return own_pool.submit(partial(func, img, **job_kwargs))
+        assert executor is not None
+        return executor.submit(img, func=func, **job_kwargs)
+
+    pending: Dict["Future[Any]", int] = {}
+    started: Dict[int, float] = {}
+    source = enumerate(images)
+    retry: Optional[Tuple[int, BatchInput]] = None  # Rejected by a busy executor
+    exhausted = False
+
+    try:
+        while pending or retry is not None or not exhausted:
+            # Top up the window of in-flight images
+            while len(pending) < window:
+                entry = retry or next(source, None)
+                retry = None
+                if entry is None:
+                    exhausted = True
+                    break
+                index, item = entry
+                started.setdefault(index, time.perf_counter())
+                try:
+                    pending[submit(item)] = index
+                except ExecutorBusyError as e:
+                    retry = entry
+                    if not pending:
+                        # Shared executor is saturated by other requests
+                        time.sleep(min(e.retry_after, 0.05))
+                    break
+
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                elapsed = time.perf_counter() - started.pop(index)
+                try:
+                    item_result = BatchItem(index=index, result=future.result(), elapsed=elapsed)
+                except Exception as e:
+                    item_result = BatchItem(index=index, error=str(e),
+                                            reason=failure_reason(e), elapsed=elapsed)
+                yield item_result
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_pool is not None:
+            own_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,448 @@
+"""Reproducible latency benchmarks for the capture pipeline.
+
+Runs the full pipeline and each of its stages over the bundled sample
+photos (backend/data/user_samples), the tutorial references
+(backend/data/reference_stages) and generated photos at several
+resolutions. Reports p50/p95/p99 latency, throughput and peak traced
+memory per case as JSON, and flags regressions against a saved baseline:
+
+    python -m backend.capture.bench --out bench.json
+    python -m backend.capture.bench --baseline bench.json
+
+Generated images use a fixed seed and detection starts from a fresh
+strategy scheduler in every case, so two runs on the same machine do the
+same work. Compare only results from the same machine and thread count.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .bundles import prepare_step_assets
+from .encoding import PreviewOptions, encode_preview
+from .geometry import (
+    STRATEGIES, DetectionContext, detect_paper, reset_strategy_stats, warp_perspective
+)
+from .ingest import decode_image, run_capture_encoded
+from .lighting import enhance_color_image
+from .pipeline import OUT_SIZE, run_capture
+from .scheduler import StrategyScheduler
+from .svg_overlay import blend_overlay, prepare_overlay, render_svg_to_png
+
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+SAMPLE_DIRS = (DATA_DIR / "user_samples", DATA_DIR / "reference_stages")
+
+# Generated photo sizes: viewfinder frame, 5MP and 12MP phone photos
+DEFAULT_SIZES: Tuple[Tuple[int, int], ...] = ((640, 480), (2592, 1944), (4032, 3024))
+
+# Latency increase over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+_SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="1080" height="1080">
+  <path d="M200 540 C 300 200, 780 200, 880 540 S 460 900, 200 540" fill="none"
+        stroke="black" stroke-width="6"/>
+  <circle cx="540" cy="520" r="90" fill="none" stroke="black" stroke-width="4"/>
+</svg>"""
+
+
+@dataclass
+class BenchInput:
+    """One benchmark image.
+
+    Attributes:
+        name: Source file name or generated size, e.g. "synthetic-640x480"
+        image: Decoded BGR image
+        encoded: JPEG/PNG bytes of the image
+    """
+    name: str
+    image: np.ndarray
+    encoded: bytes
+
+
+@dataclass
+class CaseResult:
+    """Latency statistics for one benchmark case over all inputs.
+
+    Attributes:
+        case: Case name
+        samples: Timed runs
+        failures: Inputs or runs that raised (excluded from the timings)
+        p50_ms, p95_ms, p99_ms: Latency percentiles in milliseconds
+        mean_ms: Mean latency in milliseconds
+        throughput: Runs per second on one thread
+        peak_memory_mb: Peak traced (Python and NumPy) allocation of one run
+        input_p50_ms: Median latency per input, to see which images are slow
+    """
+    case: str
+    samples: int
+    failures: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput: float
+    peak_memory_mb: float
+    input_p50_ms: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Regression:
+    """A case whose latency grew beyond the tolerance.
+
+    Attributes:
+        case: Case name
+        metric: Compared metric, e.g. "p95_ms"
+        baseline: Baseline value
+        current: Current value
+    """
+    case: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """Current ÷ baseline."""
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def synthetic_photo(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Photo-like image of a sheet of paper with a drawing, lit unevenly.
+
+    The sheet is a perspective-distorted quad covering about half the frame
+    on a noisy, darker background. Deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    shade = 70 + 40 * (xs / width) + 20 * (ys / height)
+    img = np.dstack([shade, shade * 0.95, shade * 0.9])
+    img += rng.normal(0, 6, size=img.shape)
+
+    s = min(width, height)
+    cx, cy = width / 2, height / 2
+    corners = np.array([[cx - 0.38 * s, cy - 0.45 * s], [cx + 0.36 * s, cy - 0.42 * s],
+                        [cx + 0.40 * s, cy + 0.44 * s], [cx - 0.35 * s, cy + 0.46 * s]])
+    corners += rng.uniform(-0.02 * s, 0.02 * s, size=corners.shape)
+    paper = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(paper, [np.rint(corners).astype(np.int32)], 255)
+    img[paper > 0] = (225, 225, 220)
+
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    thickness = max(1, s // 300)
+    cv2.circle(img, (int(cx), int(cy)), int(0.15 * s), (30, 30, 30), thickness)
+    cv2.line(img, (int(cx - 0.2 * s), int(cy + 0.25 * s)),
+             (int(cx + 0.2 * s), int(cy + 0.2 * s)), (30, 30, 30), thickness)
+    return img
+
+
+def load_inputs(dirs: Sequence[Path] = SAMPLE_DIRS,
+                sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+                seed: int = 0) -> List[BenchInput]:
+    """Sample images from ``dirs`` (sorted by name) plus generated photos."""
+    inputs = []
+    for directory in dirs:
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.iterdir()):
+            if path.suffix.lower() not in _IMAGE_EXTENSIONS:
+                continue
+            encoded = path.read_bytes()
+            image = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                inputs.append(BenchInput(f"{directory.name}/{path.name}", image, encoded))
+    for width, height in sizes:
+        image = synthetic_photo(width, height, seed)
+        success, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not success:
+            raise ValueError(f"Failed to encode synthetic {width}x{height} image")
+        inputs.append(BenchInput(f"synthetic-{width}x{height}", image, buf.tobytes()))
+    return inputs
+
+
+# A case prepares its stage's input outside the timed region and returns the
+# timed call
+Case = Callable[[BenchInput], Callable[[], Any]]
+
+
+def _flat(inp: BenchInput) -> np.ndarray:
+    """Lighting-normalized 1080×1080 image, or the resized input if no paper is found."""
+    detection = detect_paper(inp.image, scheduler=StrategyScheduler())
+    if detection.quad is None:
+        return cv2.resize(inp.image, (OUT_SIZE, OUT_SIZE), interpolation=cv2.INTER_AREA)
+    warped, _ = warp_perspective(inp.image, detection.quad, OUT_SIZE)
+    return enhance_color_image(warped)
+
+
+def _strategy_case(name: str) -> Case:
+    def setup(inp: BenchInput) -> Callable[[], Any]:
+        # A new context per run so cached conversions don't flatter later runs;
+        # level 0 is prebuilt so the run times the strategy, not the downscale
+        level0 = DetectionContext(inp.image).bgr(0)
+        return lambda: STRATEGIES[name](DetectionContext(level0))
+    return setup
+
+
+def _warp_case(inp: BenchInput) -> Callable[[], Any]:
+    detection = detect_paper(inp.image, scheduler=StrategyScheduler())
+    if detection.quad is None:
+        raise ValueError("Failed to detect paper in image")
+    quad = detection.quad
+    out = np.empty((OUT_SIZE, OUT_SIZE, 3), dtype=np.uint8)
+    return lambda: warp_perspective(inp.image, quad, OUT_SIZE, out)
+
+
+def _lighting_case(inp: BenchInput) -> Callable[[], Any]:
+    detection = detect_paper(inp.image, scheduler=StrategyScheduler())
+    if detection.quad is None:
+        raise ValueError("Failed to detect paper in image")
+    warped, _ = warp_perspective(inp.image, detection.quad, OUT_SIZE)
+    out = np.empty_like(warped)
+    return lambda: enhance_color_image(warped, out=out)
+
+
+def _overlay_render_case(svg_path: str) -> Case:
+    return lambda inp: lambda: render_svg_to_png(svg_path, (OUT_SIZE, OUT_SIZE))
+
+
+def _blend_case(inp: BenchInput) -> Callable[[], Any]:
+    flat = _flat(inp)
+    overlay = prepare_overlay(prepare_step_assets(inp.image, OUT_SIZE)["overlay"], alpha=0.3)
+    out = np.empty_like(flat)
+    return lambda: blend_overlay(flat, overlay, out=out)
+
+
+def _encode_case(options: PreviewOptions) -> Case:
+    def setup(inp: BenchInput) -> Callable[[], Any]:
+        flat = _flat(inp)
+        return lambda: encode_preview(flat, options)
+    return setup
+
+
+def default_cases(svg_path: str) -> Dict[str, Case]:
+    """The pipeline end to end, then each stage on its own.
+
+    Args:
+        svg_path: SVG file rendered by the overlay render case
+    """
+    cases: Dict[str, Case] = {
+        "pipeline": lambda inp: lambda: run_capture(inp.image),
+        "pipeline.jpeg_preview": lambda inp: lambda: run_capture(
+            inp.image, preview=PreviewOptions(format="jpeg")),
+        "pipeline.encoded": lambda inp: lambda: run_capture_encoded(inp.encoded),
+        "decode": lambda inp: lambda: decode_image(inp.encoded),
+        "detect": lambda inp: lambda: detect_paper(inp.image, scheduler=StrategyScheduler()),
+    }
+    for name in STRATEGIES:
+        cases[f"detect.{name}"] = _strategy_case(name)
+    cases.update({
+        "warp": _warp_case,
+        "lighting": _lighting_case,
+        "overlay.render": _overlay_render_case(svg_path),
+        "overlay.blend": _blend_case,
+        "encode.png": _encode_case(PreviewOptions()),
+        "encode.jpeg": _encode_case(PreviewOptions(format="jpeg")),
+    })
+    return cases
+
+
+def run_case(name: str, case: Case, inputs: Sequence[BenchInput],
+             repeats: int = 5, warmup: int = 1) -> CaseResult:
+    """Time ``case`` on every input.
+
+    Each input gets ``warmup`` untimed runs, ``repeats`` timed runs and one
+    extra run under ``tracemalloc`` for peak memory. Inputs whose setup or
+    runs raise are counted in ``failures``.
+    """
+    reset_strategy_stats()
+    latencies: List[float] = []
+    input_p50: Dict[str, float] = {}
+    failures = 0
+    peak = 0
+
+    for inp in inputs:
+        try:
+            run = case(inp)
+            for _ in range(warmup):
+                run()
+        except Exception:
+            failures += 1
+            continue
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            try:
+                run()
+            except Exception:
+                failures += 1
+                continue
+            runs.append(time.perf_counter() - start)
+        latencies.extend(runs)
+        if runs:
+            input_p50[inp.name] = round(float(np.median(runs)) * 1000, 3)
+
+        tracemalloc.start()
+        try:
+            run()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        except Exception:
+            pass
+        finally:
+            tracemalloc.stop()
+
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return CaseResult(
+        case=name,
+        samples=len(ms),
+        failures=failures,
+        p50_ms=round(float(p50), 3),
+        p95_ms=round(float(p95), 3),
+        p99_ms=round(float(p99), 3),
+        mean_ms=round(float(ms.mean()), 3) if len(ms) else 0.0,
+        throughput=round(len(ms) / float(sum(latencies)), 3) if latencies else 0.0,
+        peak_memory_mb=round(peak / 2**20, 3),
+        input_p50_ms=input_p50,
+    )
+
+
+def run_benchmarks(inputs: Sequence[BenchInput], cases: Optional[Sequence[str]] = None,
+                   repeats: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    """Run benchmark cases and collect a JSON-serializable report.
+
+    Args:
+        inputs: Images to run every case on
+        cases: Case names or prefixes to run, e.g. ["detect"] (default: all)
+        repeats: Timed runs per case and input
+        warmup: Untimed runs per case and input before timing
+
+    Returns:
+        Dict with "meta" (environment and settings) and "cases" (name to
+        ``CaseResult`` fields)
+
+    Raises:
+        ValueError: If no case matches ``cases``
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        svg_path = os.path.join(tmp, "overlay.svg")
+        with open(svg_path, "w") as f:
+            f.write(_SVG)
+
+        available = default_cases(svg_path)
+        selected = [name for name in available
+                    if cases is None or any(name == c or name.startswith(c + ".") for c in cases)]
+        if not selected:
+            raise ValueError(f"No benchmark cases match {cases} (available: {list(available)})")
+
+        results = {name: asdict(run_case(name, available[name], inputs, repeats, warmup))
+                   for name in selected}
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.getVersionString(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv_threads": cv2.getNumThreads(),
+            "inputs": [inp.name for inp in inputs],
+            "repeats": repeats,
+            "warmup": warmup,
+        },
+        "cases": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE,
+            metrics: Sequence[str] = ("p50_ms", "p95_ms")) -> List[Regression]:
+    """Cases whose latency exceeds the baseline by more than ``tolerance``.
+
+    A case that fails on more inputs than in the baseline (e.g. detection
+    stopped finding paper in a sample) is a regression too. Cases missing
+    from either report are skipped.
+    """
+    regressions = []
+    for name, current in report["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        if current["failures"] > previous["failures"]:
+            regressions.append(Regression(name, "failures", previous["failures"],
+                                          current["failures"]))
+        for metric in metrics:
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(Regression(name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def _parse_size(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command-line entry point; returns 1 if a regression was found."""
+    parser = argparse.ArgumentParser(description="Benchmark the capture pipeline.")
+    parser.add_argument("--out", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed latency increase over the baseline (default: %(default)s)")
+    parser.add_argument("--cases", nargs="+", help="Case names or prefixes to run")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Timed runs per case and image (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Untimed runs per case and image (default: %(default)s)")
+    parser.add_argument("--sizes", nargs="*", default=[f"{w}x{h}" for w, h in DEFAULT_SIZES],
+                        help="Generated image sizes as WxH (default: %(default)s)")
+    parser.add_argument("--no-samples", action="store_true",
+                        help="Only use generated images")
+    parser.add_argument("--threads", type=int, help="OpenCV thread count (cv2.setNumThreads)")
+    args = parser.parse_args(argv)
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+    sizes = [_parse_size(size) for size in args.sizes]
+    inputs = load_inputs(() if args.no_samples else SAMPLE_DIRS, sizes)
+    report = run_benchmarks(inputs, args.cases, args.repeats, args.warmup)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    print(f"{'case':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>9}{'MB':>9}",
+          file=sys.stderr)
+    for name, result in report["cases"].items():
+        print(f"{name:<24}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['throughput']:>9.1f}"
+              f"{result['peak_memory_mb']:>9.1f}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r.case} {r.metric}: {r.baseline:g} -> {r.current:g} "
+                  f"({r.ratio:.2f}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Precomputed, memory-mappable asset bundles for tutorial reference steps.
+
+A bundle packs everything the server needs for one tutorial into a single
+file, so serving a step never decodes or renders anything:
+
+    magic (8 bytes) | version (uint32) | index length (uint64) | JSON index |
+    array blobs, each aligned to 64 bytes
+
+The JSON index lists every step and, for each array, its offset, shape and
+dtype. Arrays per step:
+
+    overlay    size×size×4 uint8 BGRA ghost overlay (ink opaque, paper clear)
+    alpha      size×size uint8 overlay alpha mask
+    edges      size×size uint8 Canny edge map of the reference
+    values     size×size uint8 smoothed grayscale value map
+    reference  1-D uint8 original encoded image bytes, served as-is
+
+Build bundles offline with:
+
+    python -m backend.capture.bundles backend/data/reference_stages bundles/
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+BUNDLE_MAGIC = b"MSBUNDLE"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".msb"
+STANDARD_SIZE = 1080
+
+_HEADER = struct.Struct("<8sIQ")
+_ALIGN = 64
+
+# "bird-3" -> ("bird", 3); "how-to-draw-eyes-step-2" -> ("how-to-draw-eyes", 2)
+_STEP_PATTERN = re.compile(r"^(?P<name>.+?)-(?:step-)?(?P<step>\d+)$")
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+@dataclass
+class BundleStep:
+    """Precomputed assets for one tutorial step (read-only memory-mapped views).
+
+    Attributes:
+        step: Step number
+        source: File name the step was built from
+        overlay: size×size×4 BGRA ghost overlay
+        alpha: size×size overlay alpha mask
+        edges: size×size reference edge map
+        values: size×size smoothed grayscale value map
+        reference: Encoded bytes of the original reference image
+    """
+    step: int
+    source: str
+    overlay: np.ndarray
+    alpha: np.ndarray
+    edges: np.ndarray
+    values: np.ndarray
+    reference: np.ndarray
+
+
+def group_tutorial_images(src_dir: str) -> Dict[str, List[Tuple[int, str]]]:
+    """Group reference images in ``src_dir`` into tutorials by file name.
+
+    Returns:
+        Mapping of tutorial name to ``(step, path)`` pairs sorted by step
+    """
+    tutorials: Dict[str, List[Tuple[int, str]]] = {}
+    for entry in sorted(os.listdir(src_dir)):
+        stem, ext = os.path.splitext(entry)
+        match = _STEP_PATTERN.match(stem)
+        if ext.lower() not in _IMAGE_EXTENSIONS or match is None:
+            continue
+        tutorials.setdefault(match["name"], []).append(
+            (int(match["step"]), os.path.join(src_dir, entry))
+        )
+    for steps in tutorials.values():
+        steps.sort()
+    return tutorials
+
+
+def prepare_step_assets(img_bgr: np.ndarray, size: int = STANDARD_SIZE) -> Dict[str, np.ndarray]:
+    """Compute a step's overlay, alpha mask, edge map and value map.
+
+    The reference is letterboxed onto a white square of ``size`` pixels.
+    Overlay alpha follows ink darkness, so blank paper stays transparent.
+
+    Args:
+        img_bgr: Reference image in BGR format
+        size: Output side length in pixels
+
+    Returns:
+        Dict with "overlay", "alpha", "edges" and "values" arrays
+    """
+    h, w = img_bgr.shape[:2]
+    scale = size / max(h, w)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+    resized = cv2.resize(img_bgr, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    square = np.full((size, size, 3), 255, dtype=np.uint8)
+    x0, y0 = (size - new_w) // 2, (size - new_h) // 2
+    square[y0:y0 + new_h, x0:x0 + new_w] = resized
+
+    gray = cv2.cvtColor(square, cv2.COLOR_BGR2GRAY)
+    alpha = cv2.subtract(np.full_like(gray, 255), gray)
+    overlay = np.dstack([square, alpha])
+
+    # Same edge parameters the prototype used for reference stages
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 20, 60)
+    values = cv2.GaussianBlur(gray, (0, 0), 3)
+
+    return {"overlay": overlay, "alpha": alpha, "edges": edges, "values": values}
+
+
+def build_bundle(name: str, steps: Sequence[Tuple[int, str]], out_path: str,
+                 size: int = STANDARD_SIZE) -> str:
+    """Build a bundle file for one tutorial.
+
+    Args:
+        name: Tutorial name
+        steps: ``(step, image_path)`` pairs
+        out_path: Destination file
+        size: Side length of the precomputed maps
+
+    Returns:
+        ``out_path``
+
+    Raises:
+        ValueError: If a reference image cannot be decoded
+    """
+    blobs: List[np.ndarray] = []
+    index: Dict[str, Any] = {"tutorial": name, "size": size, "steps": []}
+    offset = 0
+
+    def add(arr: np.ndarray) -> Dict[str, Any]:
+        nonlocal offset
+        arr = np.ascontiguousarray(arr)
+        entry = {"offset": offset, "shape": list(arr.shape), "dtype": arr.dtype.str}
+        blobs.append(arr)
+        offset += _aligned(arr.nbytes)
+        return entry
+
+    for step, path in steps:
+        with open(path, "rb") as src:
+            raw = src.read()
+        img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to decode reference image: {path}")
+
+        assets = prepare_step_assets(img, size)
+        assets["reference"] = np.frombuffer(raw, dtype=np.uint8)
+        index["steps"].append({
+            "step": step,
+            "source": os.path.basename(path),
+            "arrays": {key: add(arr) for key, arr in assets.items()},
+        })
+
+    index_bytes = json.dumps(index).encode("utf-8")
+    data_start = _aligned(_HEADER.size + len(index_bytes))
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for arr in blobs:
+            f.write(arr.tobytes())
+            f.write(b"\0" * (_aligned(arr.nbytes) - arr.nbytes))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def build_bundles(src_dir: str, out_dir: str, size: int = STANDARD_SIZE) -> List[str]:
+    """Build one bundle per tutorial found in ``src_dir``.
+
+    Returns:
+        Paths of the bundles written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    return [
+        build_bundle(name, steps, os.path.join(out_dir, name + BUNDLE_SUFFIX), size)
+        for name, steps in group_tutorial_images(src_dir).items()
+    ]
+
+
+class TutorialBundle:
+    """Read-only, memory-mapped view of a bundle file.
+
+    Opening a bundle only parses the JSON index; array pages are loaded by
+    the OS on first access and shared between processes.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a bundle.
+
+        Raises:
+            ValueError: If the file is not a bundle of a supported version
+        """
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"Not a tutorial bundle: {path}")
+        magic, version, index_len = _HEADER.unpack(self._mm[:_HEADER.size].tobytes())
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"Not a tutorial bundle: {path}")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {version}: {path}")
+
+        index = json.loads(self._mm[_HEADER.size:_HEADER.size + index_len].tobytes())
+        self.name: str = index["tutorial"]
+        self.size: int = index["size"]
+        self._data_start = _aligned(_HEADER.size + index_len)
+        self._steps = {entry["step"]: entry for entry in index["steps"]}
+        # Views are reused so per-array caches (e.g. prepared overlays) hit
+        self._views: Dict[int, BundleStep] = {}
+
+    @property
+    def steps(self) -> List[int]:
+        """Available step numbers in order."""
+        return sorted(self._steps)
+
+    def step(self, step: int) -> BundleStep:
+        """Assets for ``step``.
+
+        Raises:
+            KeyError: If the bundle has no such step
+        """
+        view = self._views.get(step)
+        if view is not None:
+            return view
+        entry = self._steps.get(step)
+        if entry is None:
+            raise KeyError(f"Tutorial {self.name!r} has no step {step}")
+        arrays = {key: self._array(spec) for key, spec in entry["arrays"].items()}
+        view = BundleStep(step=step, source=entry["source"], **arrays)
+        self._views[step] = view
+        return view
+
+    def __iter__(self) -> Iterator[BundleStep]:
+        return (self.step(step) for step in self.steps)
+
+    def _array(self, spec: Dict[str, Any]) -> np.ndarray:
+        arr: np.ndarray = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+                                     buffer=self._mm,
+                                     offset=self._data_start + spec["offset"])
+        arr.flags.writeable = False
+        return arr
+
+
+def load_bundles(bundle_dir: str) -> Dict[str, TutorialBundle]:
+    """Open every bundle in ``bundle_dir``, keyed by tutorial name."""
+    bundles = {}
+    for entry in sorted(os.listdir(bundle_dir)):
+        if entry.endswith(BUNDLE_SUFFIX):
+            bundle = TutorialBundle(os.path.join(bundle_dir, entry))
+            bundles[bundle.name] = bundle
+    return bundles
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command-line entry point for building bundles."""
+    parser = argparse.ArgumentParser(description="Build tutorial asset bundles.")
+    parser.add_argument("src_dir", help="Directory of reference images, e.g. bird-1.jpg")
+    parser.add_argument("out_dir", help="Directory to write .msb bundles to")
+    parser.add_argument("--size", type=int, default=STANDARD_SIZE,
+                        help="Side length of precomputed maps (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    for path in build_bundles(args.src_dir, args.out_dir, args.size):
+        bundle = TutorialBundle(path)
+        print(f"{path}: {bundle.name}, steps {bundle.steps}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""In-process caches for rendered assets and capture responses."""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+
+def is_immutable(arr: np.ndarray) -> bool:
+    """True if nothing can change ``arr``'s pixels while it is referenced.
+
+    The array and every array in its base chain must be read-only, and the
+    memory at the end of the chain must be the array's own or a read-only
+    buffer (e.g. a read-only memory map). A read-only view of a writable
+    array is not immutable: the writable array can still change it.
+    """
+    obj: Any = arr
+    while isinstance(obj, np.ndarray):
+        if obj.flags.writeable:
+            return False
+        obj = obj.base
+    if obj is None:
+        return True
+    try:
+        return memoryview(obj).readonly
+    except TypeError:
+        return False
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by total size in bytes.
+
+    Attributes:
+        max_bytes: Size budget; least recently used entries are evicted beyond it
+        hits: Number of successful lookups
+        misses: Number of failed lookups
+        evictions: Number of entries evicted to stay within budget
+    """
+
+    def __init__(self, max_bytes: int,
+                 sizeof: Callable[[Any], int] = lambda value: int(value.nbytes)) -> None:
+        """Create a cache.
+
+        Args:
+            max_bytes: Size budget in bytes
+            sizeof: Returns the size in bytes of a cached value
+        """
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        """Total size of cached values."""
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert ``value``, evicting old entries as needed.
+
+        Values larger than the whole budget are not cached.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Drop the entry for ``key``, if any."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class OverlayCache:
+    """Two-tier cache of rendered SVG overlays.
+
+    Entries are keyed by the SVG's resolved path (or a hash of its content
+    with ``key_by_content=True``), its mtime and size on disk, and the output
+    size, so editing an SVG invalidates its renders. The memory tier is an
+    ``LRUCache`` of read-only BGRA arrays; the optional disk tier stores raw
+    ``.npy`` files in ``disk_dir`` so renders survive restarts and are shared
+    between worker processes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 key_by_content: bool = False) -> None:
+        """Create an overlay cache.
+
+        Args:
+            max_bytes: Memory tier budget in bytes
+            disk_dir: Optional directory for the disk tier (created if missing)
+            key_by_content: Key on a hash of the SVG bytes instead of its path,
+                so identical files at different paths share renders
+        """
+        self.memory = LRUCache(max_bytes)
+        self.disk_dir = disk_dir
+        self.key_by_content = key_by_content
+        self.disk_hits = 0
+        self.disk_writes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, svg_path: str, size_px: Tuple[int, int]) -> Tuple[Any, ...]:
+        """Cache key for rendering ``svg_path`` at ``size_px``.
+
+        Raises:
+            FileNotFoundError: If the SVG file does not exist
+        """
+        try:
+            st = os.stat(svg_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"SVG file not found: {svg_path}")
+        if self.key_by_content:
+            with open(svg_path, "rb") as f:
+                source = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        else:
+            source = os.path.realpath(svg_path)
+        return (source, st.st_mtime_ns, st.st_size, int(size_px[0]), int(size_px[1]))
+
+    def get_or_render(self, svg_path: str, size_px: Tuple[int, int],
+                      render: Callable[[str, Tuple[int, int]], np.ndarray]) -> np.ndarray:
+        """Return the cached render of ``svg_path``, rendering it on a miss.
+
+        Args:
+            svg_path: Path to SVG file
+            size_px: Output size as (width, height) in pixels
+            render: Renderer called on a miss, e.g. ``render_svg_to_png``
+
+        Returns:
+            Read-only BGRA array shared between callers
+        """
+        key = self.key(svg_path, size_px)
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+
+        img = self._load_disk(key)
+        if img is None:
+            img = np.ascontiguousarray(render(svg_path, size_px))
+            self._store_disk(key, img)
+        img.flags.writeable = False
+        self.memory.put(key, img)
+        return img
+
+    def stats(self) -> Dict[str, int]:
+        """Memory tier counters plus disk tier hits and writes."""
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_writes"] = self.disk_writes
+        return stats
+
+    def _disk_path(self, key: Tuple[Any, ...]) -> str:
+        assert self.disk_dir is not None
+        name = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.npy")
+
+    def _load_disk(self, key: Tuple[Any, ...]) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        try:
+            img = np.load(self._disk_path(key), allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        return img
+
+    def _store_disk(self, key: Tuple[Any, ...], img: np.ndarray) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # Write under a temporary name so concurrent readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, img, allow_pickle=False)
+            os.replace(tmp_path, path)
+            self.disk_writes += 1
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+@dataclass
+class CachedResponse:
+    """A stored capture response.
+
+    Attributes:
+        body: Encoded preview image
+        metadata: JSON-serializable response fields other than the preview
+        created: ``time.time()`` when the response was stored
+    """
+    body: bytes
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    created: float = field(default_factory=time.time)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the entry."""
+        return len(self.body) + len(json.dumps(self.metadata))
+
+
+class ResponseCache:
+    """Two-tier cache of capture responses, keyed by upload content.
+
+    Keys hash the raw upload bytes together with every parameter that
+    changes the response (overlay, preview options, ...), so a retried or
+    re-submitted upload is answered from the cache without decoding it.
+    The memory tier is an ``LRUCache``; the optional disk tier stores one
+    file per response in ``disk_dir``, so responses survive restarts and
+    are shared between worker processes. Both tiers have byte budgets and
+    entries older than ``ttl`` seconds are treated as missing.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 1024 * 1024 * 1024,
+                 ttl: Optional[float] = None) -> None:
+        """Create a response cache.
+
+        Args:
+            max_bytes: Memory tier budget in bytes
+            disk_dir: Optional directory for the disk tier (created if missing)
+            disk_max_bytes: Disk tier budget in bytes; the oldest files are
+                removed beyond it
+            ttl: Lifetime of entries in seconds (None: no expiry)
+        """
+        if disk_max_bytes < 0:
+            raise ValueError(f"disk_max_bytes must be >= 0, got {disk_max_bytes}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be > 0, got {ttl}")
+        self.memory = LRUCache(max_bytes, sizeof=lambda entry: entry.nbytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+        self._lock = threading.Lock()
+        # Disk files known to this process: name -> (mtime, size), oldest first
+        self._disk_index: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def key(data: Union[bytes, bytearray, memoryview],
+            params: Optional[Mapping[str, Any]] = None) -> str:
+        """Cache key for an upload and the parameters it is processed with.
+
+        Args:
+            data: Raw upload bytes
+            params: JSON-serializable parameters that affect the response
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the stored response for ``key``, or None if absent or expired."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            if not self._expired(entry.created):
+                self._count("hits")
+                return entry
+            self.memory.discard(key)
+            self._count("expired")
+
+        entry = self._load_disk(key)
+        if entry is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self.memory.put(key, entry)
+        return entry
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Store a response in both tiers."""
+        self.memory.put(key, response)
+        self._store_disk(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        """Memory tier counters, lookups by outcome, hit rate and disk usage."""
+        stats: Dict[str, Any] = self.memory.stats()
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats.update({
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_writes": self.disk_writes,
+                "disk_evictions": self.disk_evictions,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+            })
+        return stats
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        assert self.disk_dir is not None
+        return os.path.join(self.disk_dir, f"{key}.resp")
+
+    def _scan_disk(self) -> None:
+        """Index existing files (e.g. from an earlier run), oldest first."""
+        assert self.disk_dir is not None
+        found = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".resp"):
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name, st.st_size))
+        for mtime, name, size in sorted(found):
+            self._disk_index[name] = (mtime, size)
+            self._disk_bytes += size
+
+    def _load_disk(self, key: str) -> Optional[CachedResponse]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            (length,) = struct.unpack_from(">I", data)
+            header = json.loads(data[4:4 + length])
+            entry = CachedResponse(data[4 + length:], dict(header["metadata"]),
+                                   float(header["created"]))
+        except (ValueError, KeyError, TypeError, struct.error):
+            # Truncated or foreign file: drop it and treat as a miss
+            self._remove_disk(os.path.basename(path))
+            return None
+        if self._expired(entry.created):
+            self._count("expired")
+            self._remove_disk(os.path.basename(path))
+            return None
+        return entry
+
+    def _store_disk(self, key: str, response: CachedResponse) -> None:
+        if not self.disk_dir:
+            return
+        header = json.dumps({"metadata": response.metadata,
+                             "created": response.created}).encode("utf-8")
+        size = 4 + len(header) + len(response.body)
+        if size > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        # Write under a temporary name so concurrent readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(struct.pack(">I", len(header)))
+                f.write(header)
+                f.write(response.body)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        name = os.path.basename(path)
+        with self._lock:
+            self.disk_writes += 1
+            old = self._disk_index.pop(name, None)
+            if old is not None:
+                self._disk_bytes -= old[1]
+            self._disk_index[name] = (response.created, size)
+            self._disk_bytes += size
+            evict = []
+            while self._disk_bytes > self.disk_max_bytes:
+                oldest, (_, oldest_size) = self._disk_index.popitem(last=False)
+                self._disk_bytes -= oldest_size
+                self.disk_evictions += 1
+                evict.append(oldest)
+        for oldest in evict:
+            try:
+                os.remove(os.path.join(self.disk_dir, oldest))
+            except OSError:
+                pass
+
+    def _remove_disk(self, name: str) -> None:
+        assert self.disk_dir is not None
+        with self._lock:
+            old = self._disk_index.pop(name, None)
+            if old is not None:
+                self._disk_bytes -= old[1]
+        try:
+            os.remove(os.path.join(self.disk_dir, name))
+        except OSError:
+            pass
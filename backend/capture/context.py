@@ -0,0 +1,96 @@
+"""Per-thread processing state reused across capture requests."""
+
+import threading
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+from numpy.typing import DTypeLike
+
+
+# CLAHE settings used by lighting normalization, by profile name
+CLAHE_PROFILES: Dict[str, Tuple[float, Tuple[int, int]]] = {
+    "mild": (2.0, (8, 8)),
+    "strong": (3.0, (8, 8)),
+}
+
+
+class ProcessingContext:
+    """Preconfigured OpenCV objects and working buffers for one thread.
+
+    ``cv2.CLAHE`` objects are created once per profile, and named working
+    buffers (warp output, LAB planes, blend output, ...) are allocated on
+    first use and handed back on every later request of the same shape, so a
+    thread running captures of a fixed output size reaches a steady state
+    with no large allocations. ``allocations`` counts the buffers allocated
+    so far; it stops growing once that steady state is reached.
+
+    Buffers are scratch space: their contents are overwritten by the next
+    request, so results handed to callers must never alias them.
+
+    Attributes:
+        allocations: Number of buffer allocations (including reallocations)
+        allocated_bytes: Total bytes of those allocations
+        reuses: Number of buffer requests served without allocating
+    """
+
+    def __init__(self) -> None:
+        self._clahe: Dict[str, "cv2.CLAHE"] = {}
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.reuses = 0
+
+    def clahe(self, profile: str) -> "cv2.CLAHE":
+        """CLAHE instance for a profile in ``CLAHE_PROFILES``.
+
+        Raises:
+            ValueError: If the profile is unknown
+        """
+        clahe = self._clahe.get(profile)
+        if clahe is None:
+            if profile not in CLAHE_PROFILES:
+                raise ValueError(f"Unknown CLAHE profile: {profile}")
+            clip_limit, tile_grid = CLAHE_PROFILES[profile]
+            clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid)
+            self._clahe[profile] = clahe
+        return clahe
+
+    def buffer(self, name: str, shape: Tuple[int, ...],
+               dtype: DTypeLike = np.uint8) -> np.ndarray:
+        """Working buffer ``name`` with the given shape and dtype.
+
+        The same array is returned while the shape and dtype stay the same;
+        otherwise it is reallocated. Contents are undefined.
+        """
+        buf = self._buffers.get(name)
+        if buf is not None and buf.shape == tuple(shape) and buf.dtype == dtype:
+            self.reuses += 1
+            return buf
+        buf = np.empty(shape, dtype=dtype)
+        self._buffers[name] = buf
+        self.allocations += 1
+        self.allocated_bytes += buf.nbytes
+        return buf
+
+    def stats(self) -> Dict[str, int]:
+        """Allocation counters and bytes currently held in buffers."""
+        return {
+            "allocations": self.allocations,
+            "allocated_bytes": self.allocated_bytes,
+            "reuses": self.reuses,
+            "buffers": len(self._buffers),
+            "buffer_bytes": sum(buf.nbytes for buf in self._buffers.values()),
+        }
+
+
+_local = threading.local()
+
+
+def get_processing_context() -> ProcessingContext:
+    """The calling thread's processing context, created on first use."""
+    context = getattr(_local, "context", None)
+    if context is None:
+        context = ProcessingContext()
+        _local.context = context
+    return context
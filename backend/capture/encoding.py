@@ -0,0 +1,96 @@
+"""Preview image encoding."""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .context import get_processing_context
+
+
+# Format name -> (file extension for cv2.imencode, media type)
+PREVIEW_FORMATS: Dict[str, Tuple[str, str]] = {
+    "png": (".png", "image/png"),
+    "jpeg": (".jpg", "image/jpeg"),
+    "webp": (".webp", "image/webp"),
+}
+
+
+@dataclass
+class PreviewOptions:
+    """How capture previews are encoded.
+
+    The defaults reproduce the original preview: full-size PNG at zlib level
+    9, the smallest PNG but by far the slowest encode. Lower PNG levels or
+    JPEG/WebP encode many times faster.
+
+    Attributes:
+        format: "png", "jpeg" or "webp"
+        png_level: PNG zlib compression level (0-9)
+        quality: JPEG/WebP quality (1-100)
+        max_size: Optional longest side in pixels; larger previews are
+            downscaled before encoding
+    """
+    format: str = "png"
+    png_level: int = 9
+    quality: int = 85
+    max_size: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        """Validate options.
+
+        Raises:
+            ValueError: If any option is out of range
+        """
+        if self.format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unknown preview format: {self.format} "
+                             f"(expected one of {tuple(PREVIEW_FORMATS)})")
+        if not 0 <= self.png_level <= 9:
+            raise ValueError(f"PNG level must be in range [0, 9], got {self.png_level}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"Quality must be in range [1, 100], got {self.quality}")
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError(f"max_size must be >= 1, got {self.max_size}")
+
+    @property
+    def media_type(self) -> str:
+        """MIME type of encoded previews."""
+        return PREVIEW_FORMATS[self.format][1]
+
+    def encode_params(self) -> List[int]:
+        """``cv2.imencode`` parameters for these options."""
+        if self.format == "png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.png_level]
+        if self.format == "jpeg":
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+
+
+def encode_preview(img_bgr: np.ndarray, options: Optional[PreviewOptions] = None) -> bytes:
+    """Encode a preview image.
+
+    Args:
+        img_bgr: Image in BGR format
+        options: Encoding options (default: ``PreviewOptions()``)
+
+    Returns:
+        Encoded image bytes
+
+    Raises:
+        ValueError: If encoding fails
+    """
+    options = options or PreviewOptions()
+
+    h, w = img_bgr.shape[:2]
+    if options.max_size is not None and max(h, w) > options.max_size:
+        scale = options.max_size / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        small = get_processing_context().buffer("preview_small", (size[1], size[0], 3))
+        img_bgr = cv2.resize(img_bgr, size, small, interpolation=cv2.INTER_AREA)
+
+    extension = PREVIEW_FORMATS[options.format][0]
+    success, buffer = cv2.imencode(extension, img_bgr, options.encode_params())
+    if not success:
+        raise ValueError(f"Failed to encode preview {options.format.upper()}")
+    return buffer.tobytes()
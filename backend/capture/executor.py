@@ -0,0 +1,335 @@
+"""Execution backends for running the capture pipeline off the event loop."""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import is_immutable
+from .pipeline import LazyCaptureResult, run_capture
+
+
+BACKENDS = ("thread", "process")
+
+# Process backend: immutable array arguments (e.g. a tutorial's ghost overlay)
+# of at least this many bytes are copied into shared memory once and reused
+# by later jobs, instead of being pickled into every job
+SHARE_MIN_BYTES = 256 * 1024
+
+# Shared array arguments kept for reuse; older idle ones are released
+MAX_SHARED_ARRAYS = 8
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when a job is submitted while the executor is at its admission limit.
+
+    Attributes:
+        retry_after: Suggested number of seconds before retrying
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Capture executor is busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class WorkerStats:
+    """Throughput counters for one worker thread or process.
+
+    Attributes:
+        jobs: Jobs completed successfully
+        errors: Jobs that raised
+        busy_time: Seconds spent running jobs
+    """
+    jobs: int = 0
+    errors: int = 0
+    busy_time: float = 0.0
+
+
+# Outcome of one job in a worker: (result or exception, worker id, elapsed seconds)
+_JobOutcome = Tuple[Any, str, float]
+
+# Shared-memory array handed to a worker: (segment name, shape, dtype)
+_SharedSpec = Tuple[str, Tuple[int, ...], str]
+
+
+class _SharedArray:
+    """A shared-memory copy of an immutable array argument, with its users."""
+
+    def __init__(self, source: np.ndarray) -> None:
+        self.source = source  # Pinned, so its id (the cache key) stays unique
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, source.nbytes))
+        np.ndarray(source.shape, dtype=source.dtype, buffer=self.shm.buf)[...] = source
+        self.spec: _SharedSpec = (self.shm.name, source.shape, source.dtype.str)
+        self.jobs = 0
+        self.evicted = False
+
+    def release(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _run_job(func: Callable[..., Any], img: np.ndarray, kwargs: Dict[str, Any],
+             worker: Optional[str] = None) -> _JobOutcome:
+    """Run ``func`` on ``img``, reporting which worker ran it and for how long."""
+    worker = worker or threading.current_thread().name
+    start = time.perf_counter()
+    try:
+        value: Any = func(img, **kwargs)
+    except Exception as e:
+        # Drop the traceback: it pins the frames (and shared-memory views) alive
+        value = e.with_traceback(None)
+    return value, worker, time.perf_counter() - start
+
+
+def _run_shared_job(func: Callable[..., Any], shm_name: str, shape: Tuple[int, ...],
+                    dtype: str, kwargs: Dict[str, Any],
+                    shared_kwargs: Optional[Dict[str, _SharedSpec]] = None) -> _JobOutcome:
+    """Process-pool entry point: attach to the shared arrays and run the job."""
+    # Pool workers share the parent's resource tracker, so attaching here does not
+    # take ownership; the parent unlinks the segments once they are no longer used
+    segments = [shared_memory.SharedMemory(name=shm_name)]
+    try:
+        img: np.ndarray = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segments[0].buf)
+        kwargs = dict(kwargs)
+        for key, (name, arg_shape, arg_dtype) in (shared_kwargs or {}).items():
+            segments.append(shared_memory.SharedMemory(name=name))
+            arg: np.ndarray = np.ndarray(arg_shape, dtype=np.dtype(arg_dtype),
+                                         buffer=segments[-1].buf)
+            arg.flags.writeable = False
+            kwargs[key] = arg
+        outcome = _run_job(func, img, kwargs, worker=f"process-{os.getpid()}")
+        if isinstance(outcome[0], LazyCaptureResult):
+            outcome[0].detach()  # Lazy results must not keep the shared arrays alive
+        del img, kwargs  # Release the views so the segments can be closed
+        return outcome
+    finally:
+        for shm in segments:
+            shm.close()
+
+
+def _warm_worker() -> None:
+    """Process-pool initializer: import OpenCV once and run a tiny detection."""
+    import cv2
+    from .geometry import detect_paper_quad
+
+    cv2.setNumThreads(1)  # One job per process; don't oversubscribe cores
+    detect_paper_quad(np.zeros((64, 64, 3), dtype=np.uint8))
+
+
+class CaptureExecutor:
+    """Bounded pool that runs capture jobs in worker threads or processes.
+
+    The ``thread`` backend suits hosts where OpenCV's GIL release gives enough
+    parallelism. The ``process`` backend uses warm worker processes (OpenCV is
+    imported once per worker) and hands images over through shared memory
+    rather than pickling them. Large immutable arguments such as a tutorial's
+    ghost overlay are copied into shared memory once and reused across jobs.
+
+    At most ``workers + max_queue`` jobs are admitted at a time; beyond that
+    ``submit`` raises ``ExecutorBusyError`` with a Retry-After estimate.
+    """
+
+    def __init__(self, backend: str = "thread", workers: Optional[int] = None,
+                 max_queue: Optional[int] = None) -> None:
+        """Create an executor.
+
+        Args:
+            backend: "thread" or "process"
+            workers: Number of workers (default: CPU count)
+            max_queue: Jobs allowed to wait for a worker (default: 2 × workers)
+
+        Raises:
+            ValueError: If the backend is unknown or sizes are invalid
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown executor backend: {backend} (expected one of {BACKENDS})")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = 2 * self.workers if max_queue is None else max_queue
+        if self.workers < 1 or self.max_queue < 0:
+            raise ValueError("workers must be >= 1 and max_queue >= 0")
+
+        self._pool: Executor
+        if backend == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="capture")
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._worker_stats: Dict[str, WorkerStats] = {}
+        self._shared: Dict[int, _SharedArray] = {}
+        self._started = time.monotonic()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of admitted (running or queued) jobs."""
+        return self.workers + self.max_queue
+
+    def submit(self, img: np.ndarray, func: Callable[..., Any] = run_capture,
+               **kwargs: Any) -> "Future[Any]":
+        """Schedule ``func(img, **kwargs)`` (default: ``run_capture``).
+
+        For the process backend ``func`` must be a picklable module-level
+        function.
+
+        Returns:
+            Future resolving to the job's return value
+
+        Raises:
+            ExecutorBusyError: If the admission limit is reached
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise ExecutorBusyError(self._retry_after())
+            self._in_flight += 1
+            self._submitted += 1
+
+        result: "Future[Any]" = Future()
+        try:
+            if self.backend == "process":
+                shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+                np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+                kwargs, shared = self._share_arrays(kwargs)
+                try:
+                    job = self._pool.submit(_run_shared_job, func, shm.name, img.shape,
+                                            img.dtype.str, kwargs,
+                                            {key: arr.spec for key, arr in shared.items()})
+                except BaseException:
+                    self._release_job(shm, list(shared.values()))
+                    raise
+                job.add_done_callback(
+                    lambda _: self._release_job(shm, list(shared.values())))
+            else:
+                job = self._pool.submit(_run_job, func, img, kwargs)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+        def forward_cancel(result: "Future[Any]") -> None:
+            # A caller giving up (client disconnect, batch cleanup) frees the queue slot
+            if result.cancelled():
+                job.cancel()
+
+        result.add_done_callback(forward_cancel)
+        job.add_done_callback(lambda job: self._finish(job, result))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Admission counters and per-worker throughput."""
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            return {
+                "backend": self.backend,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "per_worker": {
+                    worker: {
+                        "jobs": stats.jobs,
+                        "errors": stats.errors,
+                        "busy_time": stats.busy_time,
+                        "utilization": stats.busy_time / uptime if uptime else 0.0,
+                        "jobs_per_second": stats.jobs / uptime if uptime else 0.0,
+                    }
+                    for worker, stats in self._worker_stats.items()
+                },
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            for key in list(self._shared):
+                self._evict(key)
+
+    def _finish(self, job: "Future[_JobOutcome]", result: "Future[Any]") -> None:
+        with self._lock:
+            self._in_flight -= 1
+        if job.cancelled():
+            result.cancel()
+            return
+        try:
+            value, worker, elapsed = job.result()
+        except BaseException as e:  # Pool broken
+            if result.set_running_or_notify_cancel():
+                result.set_exception(e)
+            return
+
+        with self._lock:
+            stats = self._worker_stats.setdefault(worker, WorkerStats())
+            stats.busy_time += elapsed
+            if isinstance(value, Exception):
+                stats.errors += 1
+            else:
+                stats.jobs += 1
+
+        # The caller may have cancelled while the job was already running
+        if not result.set_running_or_notify_cancel():
+            return
+        if isinstance(value, Exception):
+            result.set_exception(value)
+        else:
+            result.set_result(value)
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the mean job time so far."""
+        jobs = sum(s.jobs + s.errors for s in self._worker_stats.values())
+        busy = sum(s.busy_time for s in self._worker_stats.values())
+        mean_job = busy / jobs if jobs else 1.0
+        return max(1, math.ceil(mean_job * self._in_flight / self.workers))
+
+    def _share_arrays(self, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any],
+                                                             Dict[str, _SharedArray]]:
+        """Split off the large immutable array arguments, shared with the workers."""
+        plain: Dict[str, Any] = {}
+        shared: Dict[str, _SharedArray] = {}
+        with self._lock:
+            for key, value in kwargs.items():
+                if (not isinstance(value, np.ndarray) or value.nbytes < SHARE_MIN_BYTES
+                        or not is_immutable(value)):
+                    plain[key] = value
+                    continue
+                entry = self._shared.get(id(value))
+                if entry is None or entry.source is not value:
+                    entry = _SharedArray(value)
+                    self._shared[id(value)] = entry
+                    # Keep the most recently added; idle ones are released now,
+                    # busy ones when their last job finishes
+                    for old in list(self._shared)[:-MAX_SHARED_ARRAYS]:
+                        self._evict(old)
+                entry.jobs += 1
+                shared[key] = entry
+        return plain, shared
+
+    def _evict(self, key: int) -> None:
+        """Forget a shared array (lock held); release it once no job uses it."""
+        entry = self._shared.pop(key)
+        entry.evicted = True
+        if entry.jobs == 0:
+            entry.release()
+
+    def _release_job(self, shm: shared_memory.SharedMemory,
+                     shared: List[_SharedArray]) -> None:
+        """Free a finished job's image and its hold on shared arguments."""
+        shm.close()
+        shm.unlink()
+        with self._lock:
+            for entry in shared:
+                entry.jobs -= 1
+                if entry.evicted and entry.jobs == 0:
+                    entry.release()
@@ -1,67 +1,443 @@
 """Geometric operations for paper detection and perspective correction."""
 
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
 import cv2
 import numpy as np
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import PaperDetection
+from .scheduler import StrategyScheduler
+
+
+# Confidence a candidate quad needs before remaining strategies are skipped
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Longer side of pyramid level 0, where detection runs
+DETECT_MAX_SIDE = 1000
+PYRAMID_LEVELS = 3
+PYRAMID_MIN_SIDE = 64
+
+# Longer side each strategy wants to work at (it gets the coarsest level >= this)
+EDGES_TARGET_SIDE = 1000
+COARSE_TARGET_SIDE = 480
+
+# Upper bound on the sub-pixel refinement half-window (full-resolution pixels)
+MAX_REFINE_WINDOW = 25
 
+# Worker threads shared by all parallel detections in the process
+DETECT_POOL_SIZE = max(2, min(8, os.cpu_count() or 1))
 
-def detect_paper_quad(img: np.ndarray) -> Optional[np.ndarray]:
+_default_scheduler = StrategyScheduler()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def detect_paper_quad(img: np.ndarray, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                      scheduler: Optional[StrategyScheduler] = None,
+                      parallel: bool = False,
+                      deadline: Optional[float] = None) -> Optional[np.ndarray]:
     """Detect the largest quadrilateral (paper) in the image.
     
     Uses multiple detection strategies to find paper in various conditions.
+    See ``detect_paper`` for how strategies are scheduled.
+    """
+    return detect_paper(img, min_confidence=min_confidence, scheduler=scheduler,
+                        parallel=parallel, deadline=deadline).quad
+
+
+def detect_paper(img: np.ndarray, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                 scheduler: Optional[StrategyScheduler] = None,
+                 parallel: bool = False,
+                 deadline: Optional[float] = None) -> PaperDetection:
+    """Detect paper, running strategies in scheduled order with early exit.
+    
+    Strategies are ordered by the scheduler (cheap, recently successful ones
+    first). Each candidate quad is scored with ``quad_confidence`` and detection
+    stops as soon as one reaches ``min_confidence``. If none does, the most
+    confident candidate seen is returned (the largest one on ties). Pass
+    ``min_confidence > 1`` to always run every strategy.
+    
+    All strategies share one ``DetectionContext``, so they run on a downscaled
+    pyramid; the selected quad is then refined on the full-resolution frame.
+    
+    With ``parallel=True`` all strategies are submitted at once to a shared,
+    bounded thread pool (OpenCV releases the GIL) and candidates are considered
+    as they complete. With a ``deadline``, the best candidate available when it
+    expires is returned; strategies still queued are cancelled and ones still
+    running are ignored (their stats are recorded when they finish).
+    
+    Args:
+        img: Input image in BGR format
+        min_confidence: Confidence (0-1) at which to stop trying strategies
+        scheduler: Scheduler providing order and collecting stats (default: shared)
+        parallel: Run strategies concurrently on the detection thread pool
+        deadline: Optional time budget in seconds for the whole call
+        
+    Returns:
+        PaperDetection with the selected quad (or None) and run details
+        
+    Raises:
+        ValueError: If image is invalid
+    """
+    start = time.perf_counter()
+    stop_at = None if deadline is None else start + deadline
+    
+    ctx = DetectionContext(img)
+    scheduler = scheduler or _default_scheduler
+    result = PaperDetection()
+    order = scheduler.order(STRATEGIES)
+    
+    if parallel:
+        _run_parallel(ctx, order, result, scheduler, min_confidence, stop_at)
+    else:
+        for name in order:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                break
+            result.attempted.append(name)
+            if _accept(ctx, name, _run_strategy(name, ctx), result, scheduler, min_confidence):
+                break
+    
+    scheduler.record_outcome(result.finished, result.strategy)
+    
+    if result.quad is not None and ctx.scale < 1.0:
+        # Corners are only as accurate as the coarsest level a strategy ran on;
+        # search about two of its pixels to recover full-resolution precision
+        coarse = ctx.level_for(COARSE_TARGET_SIDE)
+        full_per_px = ctx.bgr(0).shape[1] / ctx.bgr(coarse).shape[1] / ctx.scale
+        window = min(MAX_REFINE_WINDOW, int(np.ceil(2.0 * full_per_px)) + 1)
+        result.quad = _order_points(refine_quad_corners(img, ctx.to_full(result.quad), window))
+    
+    return result
+
+
+# Outcome of one strategy run: (quad or None, elapsed seconds, raised an exception)
+_StrategyOutcome = Tuple[Optional[np.ndarray], float, bool]
+
+
+def _run_strategy(name: str, ctx: "DetectionContext") -> _StrategyOutcome:
+    """Run one strategy, timing it and capturing failures."""
+    start = time.perf_counter()
+    try:
+        quad = STRATEGIES[name](ctx)
+    except Exception:
+        return None, time.perf_counter() - start, True
+    return quad, time.perf_counter() - start, False
+
+
+def _accept(ctx: "DetectionContext", name: str, outcome: _StrategyOutcome,
+            result: PaperDetection, scheduler: StrategyScheduler,
+            min_confidence: float) -> bool:
+    """Fold a strategy outcome into ``result``; True once it is confident enough."""
+    quad, elapsed, failed = outcome
+    result.finished.append(name)
+    if failed:
+        scheduler.record(name, elapsed, failed=True)
+        return False
+    result.timings[name] = elapsed
+    
+    # Validate quad: between 10% and 95% of image
+    gray = ctx.gray(0)
+    img_area = gray.shape[0] * gray.shape[1]
+    area = 0.0 if quad is None else cv2.contourArea(quad.astype(np.float32))
+    valid = quad is not None and 0.1 < area / img_area < 0.95
+    scheduler.record(name, elapsed, hit=valid)
+    if quad is None or not valid:
+        return False
+    
+    # Most confident candidate; equally confident ones are ranked by area,
+    # the only criterion before confidence scoring
+    confidence = quad_confidence(quad, gray)
+    if (result.quad is None or confidence > result.confidence
+            or (confidence == result.confidence
+                and area > cv2.contourArea(result.quad.astype(np.float32)))):
+        result.quad = quad
+        result.confidence = confidence
+        result.strategy = name
+    return confidence >= min_confidence
+
+
+def _run_parallel(ctx: "DetectionContext", order: List[str], result: PaperDetection,
+                  scheduler: StrategyScheduler, min_confidence: float,
+                  stop_at: Optional[float]) -> None:
+    """Run all strategies on the shared pool, stopping early when confident."""
+    # Convert once up front so workers don't race to build the same level
+    ctx.gray(0)
+    
+    executor = _get_executor()
+    futures = {executor.submit(_run_strategy, name, ctx): name for name in order}
+    result.attempted.extend(order)
+    rank = {name: i for i, name in enumerate(order)}
+    
+    pending = set(futures)
+    while pending:
+        timeout = None if stop_at is None else max(0.0, stop_at - time.perf_counter())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break  # Deadline reached
+        
+        confident = False
+        # Handle simultaneous completions in scheduled order so ties are stable
+        for future in sorted(done, key=lambda f: rank[futures[f]]):
+            confident |= _accept(ctx, futures[future], future.result(), result,
+                                 scheduler, min_confidence)
+        if confident:
+            break
+    
+    for future in pending:
+        name = futures[future]
+        if future.cancel():
+            result.attempted.remove(name)
+        else:
+            def record(f: "Future[_StrategyOutcome]", name: str = name) -> None:
+                _record_straggler(scheduler, name, f)
+            
+            future.add_done_callback(record)
+
+
+def _record_straggler(scheduler: StrategyScheduler, name: str,
+                      future: "Future[_StrategyOutcome]") -> None:
+    """Record stats for a strategy that finished after detect_paper returned."""
+    quad, elapsed, failed = future.result()
+    scheduler.record(name, elapsed, hit=quad is not None, failed=failed)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared, bounded thread pool used by parallel detection."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DETECT_POOL_SIZE,
+                                           thread_name_prefix="detect")
+        return _executor
+
+
+def get_strategy_stats() -> Dict[str, Dict[str, float]]:
+    """Per-strategy hit rate and timing stats of the shared scheduler."""
+    return _default_scheduler.stats()
+
+
+def reset_strategy_stats() -> None:
+    """Clear the shared scheduler's statistics."""
+    _default_scheduler.reset()
+
+
+def quad_confidence(quad: np.ndarray, img: np.ndarray) -> float:
+    """Score how likely a candidate quad is to be the paper outline.
+    
+    Combines three terms, each in [0, 1]:
+      - area: ramps up from 10% to 30% of the frame, down again above 90%
+      - rectangularity: worst corner angle's deviation from 90 degrees
+      - edge support: fraction of points along the sides with a clear
+        brightness step across the side
+    
+    Args:
+        quad: 4×2 array of corners ordered TL, TR, BR, BL
+        img: Image the quad was detected in (BGR or grayscale)
+        
+    Returns:
+        Confidence in range [0, 1]
     """
-    if img is None or len(img.shape) != 3:
-        raise ValueError("Invalid input image")
+    pts = quad.reshape(4, 2).astype(np.float64)
+    h, w = img.shape[:2]
     
-    # Try multiple detection strategies
-    strategies = [
-        _detect_with_edges,
-        _detect_with_threshold,
-        _detect_with_color_segmentation,
-        _detect_with_morphology
-    ]
+    area_ratio = abs(cv2.contourArea(pts.astype(np.float32))) / (h * w)
+    area_term = min(1.0, max(0.0, (area_ratio - 0.1) / 0.2))
+    area_term *= min(1.0, max(0.0, (0.95 - area_ratio) / 0.05))
     
-    best_quad = None
-    max_score = 0
-    img_area = img.shape[0] * img.shape[1]
-    
-    for strategy in strategies:
-        try:
-            quad = strategy(img)
-            if quad is not None:
-                area = cv2.contourArea(quad)
-                score = area / img_area
-                
-                # Validate quad
-                if score > 0.1 and score < 0.95:  # Between 10% and 95% of image
-                    if score > max_score:
-                        max_score = score
-                        best_quad = quad
-        except:
-            continue
+    v1 = np.roll(pts, 1, axis=0) - pts
+    v2 = np.roll(pts, -1, axis=0) - pts
+    cosines = np.sum(v1 * v2, axis=1) / (
+        np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1) + 1e-6
+    )
+    worst_deviation = np.max(np.abs(np.degrees(np.arccos(np.clip(cosines, -1, 1))) - 90))
+    rect_term = max(0.0, 1.0 - worst_deviation / 45.0)
     
-    return best_quad
+    edge_term = _edge_support(pts, img)
+    
+    return float(0.25 * area_term + 0.25 * rect_term + 0.5 * edge_term)
 
 
-def _detect_with_edges(img: np.ndarray) -> Optional[np.ndarray]:
-    """Original edge-based detection method."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def _edge_support(pts: np.ndarray, img: np.ndarray, samples_per_side: int = 16,
+                  min_step: float = 20.0) -> float:
+    """Fraction of side samples with a brightness step across the quad outline."""
+    h, w = img.shape[:2]
+    offset = max(2.0, 0.01 * np.hypot(h, w))
+    centroid = pts.mean(axis=0)
+    
+    t = np.linspace(0.1, 0.9, samples_per_side)[:, np.newaxis]
+    supported = 0
+    counted = 0
+    for i in range(4):
+        p1, p2 = pts[i], pts[(i + 1) % 4]
+        direction = p2 - p1
+        normal = np.array([-direction[1], direction[0]]) / (np.linalg.norm(direction) + 1e-6)
+        # Point the normal away from the quad centre
+        if np.dot(normal, (p1 + p2) / 2 - centroid) < 0:
+            normal = -normal
+        
+        along = p1 + t * direction
+        inside = np.rint(along - offset * normal).astype(int)
+        outside = np.rint(along + offset * normal).astype(int)
+        
+        # Sides touching the frame border have nothing to compare against
+        in_bounds = (
+            (inside[:, 0] >= 0) & (inside[:, 0] < w) & (inside[:, 1] >= 0) & (inside[:, 1] < h)
+            & (outside[:, 0] >= 0) & (outside[:, 0] < w)
+            & (outside[:, 1] >= 0) & (outside[:, 1] < h)
+        )
+        inside, outside = inside[in_bounds], outside[in_bounds]
+        
+        inner = img[inside[:, 1], inside[:, 0]].astype(np.float32)
+        outer = img[outside[:, 1], outside[:, 0]].astype(np.float32)
+        if img.ndim == 3:
+            inner, outer = inner.mean(axis=1), outer.mean(axis=1)
+        supported += int(np.count_nonzero(np.abs(inner - outer) >= min_step))
+        counted += len(inside)
+    
+    # A quad whose sides all lie on the frame border is weakly supported at best
+    return supported / counted if counted else 0.5
+
+
+class DetectionContext:
+    """Per-frame inputs shared by every detection strategy.
+    
+    The frame is downscaled once to at most ``max_side`` pixels (level 0) and
+    a small pyramid is built from there with ``cv2.pyrDown``. Grayscale and
+    HSV conversions are computed at most once per level, on first use.
+    Quads produced by strategies are in level-0 coordinates; ``scale`` maps
+    them back to the full-resolution frame.
+    
+    A context may be shared by concurrently running strategies; at worst a
+    level's conversion is computed twice.
+    
+    Attributes:
+        image: Full-resolution BGR frame
+        scale: Level-0 size divided by full size (<= 1)
+    """
+    
+    def __init__(self, img: np.ndarray, max_side: int = DETECT_MAX_SIDE,
+                 levels: int = PYRAMID_LEVELS) -> None:
+        if img is None or len(img.shape) != 3:
+            raise ValueError("Invalid input image")
+        
+        self.image = img
+        self.scale = min(1.0, max_side / max(img.shape[:2]))
+        if self.scale < 1.0:
+            # INTER_LINEAR is several times cheaper than INTER_AREA on 12MP frames;
+            # the aliasing it adds is irrelevant once corners are refined at full size
+            base = cv2.resize(img, None, fx=self.scale, fy=self.scale,
+                              interpolation=cv2.INTER_LINEAR)
+        else:
+            base = img
+        
+        self._bgr = [base]
+        while len(self._bgr) < levels and min(self._bgr[-1].shape[:2]) >= 2 * PYRAMID_MIN_SIDE:
+            self._bgr.append(cv2.pyrDown(self._bgr[-1]))
+        self._gray: Dict[int, np.ndarray] = {}
+        self._hsv: Dict[int, np.ndarray] = {}
+    
+    @property
+    def levels(self) -> int:
+        """Number of pyramid levels."""
+        return len(self._bgr)
+    
+    def bgr(self, level: int = 0) -> np.ndarray:
+        """BGR image at a pyramid level."""
+        return self._bgr[level]
+    
+    def gray(self, level: int = 0) -> np.ndarray:
+        """Grayscale image at a pyramid level (converted once)."""
+        if level not in self._gray:
+            self._gray[level] = cv2.cvtColor(self._bgr[level], cv2.COLOR_BGR2GRAY)
+        return self._gray[level]
+    
+    def hsv(self, level: int = 0) -> np.ndarray:
+        """HSV image at a pyramid level (converted once)."""
+        if level not in self._hsv:
+            self._hsv[level] = cv2.cvtColor(self._bgr[level], cv2.COLOR_BGR2HSV)
+        return self._hsv[level]
+    
+    def level_for(self, target_side: int) -> int:
+        """Coarsest pyramid level whose longer side is still >= ``target_side``."""
+        level = 0
+        while level + 1 < self.levels and max(self._bgr[level + 1].shape[:2]) >= target_side:
+            level += 1
+        return level
+    
+    def kernel(self, size: int, level: int) -> np.ndarray:
+        """Rectangular structuring element for pyramid ``level``.
+        
+        ``size`` is in level-0 pixels and shrinks with the level's downscale
+        factor, to the nearest odd size of at least 3 pixels so openings and
+        closings stay centred.
+        """
+        scaled = size * self._bgr[level].shape[1] / self._bgr[0].shape[1]
+        side = max(3, 2 * int(round((scaled - 1) / 2)) + 1)
+        return cv2.getStructuringElement(cv2.MORPH_RECT, (side, side))
+    
+    def to_level0(self, quad: np.ndarray, level: int) -> np.ndarray:
+        """Map a quad from pyramid ``level`` coordinates to level 0."""
+        if level == 0:
+            return quad
+        factor = self._bgr[0].shape[1] / self._bgr[level].shape[1]
+        return quad.astype(np.float32) * factor
+    
+    def to_full(self, quad: np.ndarray) -> np.ndarray:
+        """Map a quad from level-0 coordinates to the full-resolution frame."""
+        if self.scale == 1.0:
+            return quad
+        return quad.astype(np.float32) / self.scale
+
+
+def refine_quad_corners(img: np.ndarray, quad: np.ndarray, window: int) -> np.ndarray:
+    """Refine quad corners to sub-pixel accuracy on the full-resolution frame.
     
-    # Resize for faster processing if image is large
-    scale = 1.0
-    if gray.shape[0] > 1500 or gray.shape[1] > 1500:
-        scale = 1000.0 / max(gray.shape)
-        gray = cv2.resize(gray, None, fx=scale, fy=scale)
+    Only a small patch around each corner is converted to grayscale, so the
+    cost does not depend on the frame size. Corners that move further than
+    ``window`` pixels are left unchanged.
+    
+    Args:
+        img: Full-resolution BGR image
+        quad: 4×2 corner estimate in full-resolution coordinates
+        window: Half-size of the search window in pixels
+        
+    Returns:
+        4×2 float32 array of refined corners
+    """
+    refined = quad.astype(np.float32).copy()
+    h, w = img.shape[:2]
+    pad = window + 2
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+    
+    for i, (x, y) in enumerate(refined):
+        x0, y0 = max(0, int(x) - pad), max(0, int(y) - pad)
+        x1, y1 = min(w, int(x) + pad + 1), min(h, int(y) + pad + 1)
+        if x1 - x0 < 2 * window + 1 or y1 - y0 < 2 * window + 1:
+            continue  # Too close to the frame border to refine
+        
+        patch = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        corner = np.array([[[x - x0, y - y0]]], dtype=np.float32)
+        cv2.cornerSubPix(patch, corner, (window, window), (-1, -1), criteria)
+        
+        moved = corner[0, 0] + (x0, y0)
+        if np.all(np.abs(moved - (x, y)) <= window):
+            refined[i] = moved
+    
+    return refined
+
+
+def _detect_with_edges(ctx: DetectionContext) -> Optional[np.ndarray]:
+    """Original edge-based detection method."""
+    level = ctx.level_for(EDGES_TARGET_SIDE)
+    gray = ctx.gray(level)
     
     # Bilateral filter
     filtered = cv2.bilateralFilter(gray, 9, 75, 75)
     
-    # Adaptive threshold
-    thresh = cv2.adaptiveThreshold(
-        filtered, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-        cv2.THRESH_BINARY, 11, 2
-    )
-    
     # Canny edges with auto thresholds
     median = np.median(filtered)
     lower = int(max(0, (1.0 - 0.33) * median))
@@ -78,22 +454,45 @@ def _detect_with_edges(img: np.ndarray) -> Optional[np.ndarray]:
     # Find best quad
     best_quad = _find_best_quad(contours, gray.shape)
     
-    if best_quad is not None and scale != 1.0:
-        # Scale back to original size
-        best_quad = best_quad / scale
+    if best_quad is not None:
+        best_quad = ctx.to_level0(best_quad, level)
     
     return best_quad
 
 
-def _detect_with_threshold(img: np.ndarray) -> Optional[np.ndarray]:
+def _detect_coarse_to_fine(ctx: DetectionContext,
+                           detect: Callable[[DetectionContext, int], Optional[np.ndarray]]
+                           ) -> Optional[np.ndarray]:
+    """Run ``detect`` on the coarse level, then on finer levels until it
+    finds a usable quad.
+    
+    Thin pencil strokes or paper edges can merge or vanish on the coarse
+    level and leave a degenerate quad, so a quad outside 10-95% of the
+    image is retried one level finer, down to level 0.
+    """
+    for level in range(ctx.level_for(COARSE_TARGET_SIDE), -1, -1):
+        quad = detect(ctx, level)
+        if quad is None:
+            continue
+        h, w = ctx.gray(level).shape
+        if 0.1 < cv2.contourArea(quad.astype(np.float32)) / (h * w) < 0.95:
+            return ctx.to_level0(quad, level)
+    return None
+
+
+def _detect_with_threshold(ctx: DetectionContext) -> Optional[np.ndarray]:
     """Detection using global threshold."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return _detect_coarse_to_fine(ctx, _threshold_quad)
+
+
+def _threshold_quad(ctx: DetectionContext, level: int) -> Optional[np.ndarray]:
+    gray = ctx.gray(level)
     
     # Try Otsu's threshold
     _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
     # Morphological operations to clean up
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    kernel = ctx.kernel(5, level)
     cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
     cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
     
@@ -103,10 +502,13 @@ def _detect_with_threshold(img: np.ndarray) -> Optional[np.ndarray]:
     return _find_best_quad(contours, gray.shape)
 
 
-def _detect_with_color_segmentation(img: np.ndarray) -> Optional[np.ndarray]:
+def _detect_with_color_segmentation(ctx: DetectionContext) -> Optional[np.ndarray]:
     """Detection using color segmentation for white paper."""
-    # Convert to HSV
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    return _detect_coarse_to_fine(ctx, _color_segmentation_quad)
+
+
+def _color_segmentation_quad(ctx: DetectionContext, level: int) -> Optional[np.ndarray]:
+    hsv = ctx.hsv(level)
     
     # Define range for white/light colors
     lower_white = np.array([0, 0, 180])
@@ -116,29 +518,30 @@ def _detect_with_color_segmentation(img: np.ndarray) -> Optional[np.ndarray]:
     mask = cv2.inRange(hsv, lower_white, upper_white)
     
     # Clean up mask
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, ctx.kernel(5, level))
     
     # Find contours
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    return _find_best_quad(contours, img.shape[:2])
+    return _find_best_quad(contours, hsv.shape[:2])
 
 
-def _detect_with_morphology(img: np.ndarray) -> Optional[np.ndarray]:
+def _detect_with_morphology(ctx: DetectionContext) -> Optional[np.ndarray]:
     """Detection using morphological gradient."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return _detect_coarse_to_fine(ctx, _morphology_quad)
+
+
+def _morphology_quad(ctx: DetectionContext, level: int) -> Optional[np.ndarray]:
+    gray = ctx.gray(level)
     
     # Morphological gradient
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, ctx.kernel(5, level))
     
     # Threshold
     _, thresh = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
     # Close gaps
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (10, 10))
-    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, ctx.kernel(10, level))
     
     # Find contours
     contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -146,6 +549,15 @@ def _detect_with_morphology(img: np.ndarray) -> Optional[np.ndarray]:
     return _find_best_quad(contours, gray.shape)
 
 
+# Detection strategies by name, in their historical order
+STRATEGIES: Dict[str, Callable[[DetectionContext], Optional[np.ndarray]]] = {
+    "edges": _detect_with_edges,
+    "threshold": _detect_with_threshold,
+    "color": _detect_with_color_segmentation,
+    "morphology": _detect_with_morphology,
+}
+
+
 def _find_best_quad(contours, img_shape) -> Optional[np.ndarray]:
     """Find the best quadrilateral from contours."""
     if not contours:
@@ -244,9 +656,35 @@ def _reduce_to_quad(approx):
     return best_quad
 
 
-def warp_perspective(img: np.ndarray, quad: np.ndarray, 
-                    out_size: int = 1080) -> Tuple[np.ndarray, np.ndarray]:
-    """Apply perspective transform to extract and flatten the paper region."""
+def scale_transform(factor: float) -> np.ndarray:
+    """Transform (3×3 float64) from a 1/``factor`` scaled image to the original.
+    
+    Pixel centres are aligned, matching a box-filtered reduction such as a
+    reduced JPEG decode: pixel ``x`` of the small image covers original
+    pixels ``factor * x`` to ``factor * x + factor - 1``.
+    """
+    offset = (factor - 1) / 2
+    return np.array([[factor, 0, offset], [0, factor, offset], [0, 0, 1]], dtype=np.float64)
+
+
+def transform_quad(quad: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    """Apply a 3×3 transform to a 4×2 quad (float32 result)."""
+    pts = quad.reshape(-1, 1, 2).astype(np.float32)
+    return cv2.perspectiveTransform(pts, transform.astype(np.float64)).reshape(-1, 2)
+
+
+def paper_homography(quad: np.ndarray, out_size: int = 1080,
+                     source_transform: Optional[np.ndarray] = None) -> np.ndarray:
+    """Homography (float64) mapping the paper quad onto an out_size square.
+    
+    Args:
+        quad: 4×2 paper corners
+        out_size: Output side length in pixels
+        source_transform: Optional 3×3 transform from the pixels of the image
+            to be warped into the coordinates of ``quad``, e.g. from a
+            reduced or unrotated decode to the full-resolution photo. It is
+            composed into the result, so one warp samples that image directly.
+    """
     if quad.shape != (4, 2):
         raise ValueError(f"Expected quad shape (4, 2), got {quad.shape}")
     
@@ -261,15 +699,81 @@ def warp_perspective(img: np.ndarray, quad: np.ndarray,
         [0, out_size - 1]
     ], dtype=np.float32)
     
-    # Calculate homography
     M = cv2.getPerspectiveTransform(quad.astype(np.float32), dst_pts)
+    if source_transform is not None:
+        M = M @ source_transform
+    return M
+
+
+def warp_perspective(img: np.ndarray, quad: np.ndarray, 
+                    out_size: int = 1080,
+                    out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Apply perspective transform to extract and flatten the paper region.
+    
+    ``out`` is an optional out_size×out_size array to warp into.
+    """
+    # Calculate homography
+    M = paper_homography(quad, out_size)
     
     # Apply transform
-    warped = cv2.warpPerspective(img, M, (out_size, out_size))
+    warped = cv2.warpPerspective(img, M, (out_size, out_size), out)
     
     return warped, M.astype(np.float32)
 
 
+class WarpMapCache:
+    """Remap tables for a perspective warp, reused while the homography holds.
+    
+    ``cv2.warpPerspective`` recomputes the source coordinate of every output
+    pixel on each call. For a live stream the tracked quad barely moves
+    between frames, so the tables are computed once (as fixed-point maps for
+    ``cv2.remap``) and reused until the homography moves any output corner's
+    source position by more than ``tolerance`` pixels, or the frame or
+    output size changes.
+    
+    Not thread-safe; use one cache per stream.
+    
+    Attributes:
+        tolerance: Source-pixel drift accepted before recomputing the tables
+        hits: Warps served from cached tables
+        misses: Warps that recomputed the tables
+    """
+    
+    def __init__(self, tolerance: float = 0.25) -> None:
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._key: Optional[Tuple[Tuple[int, ...], Tuple[int, int]]] = None
+        self._corners: Optional[np.ndarray] = None
+        self._maps: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    
+    def warp(self, img: np.ndarray, homography: np.ndarray, size: Tuple[int, int],
+             out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Warp ``img`` like ``cv2.warpPerspective(img, homography, size, out)``."""
+        w, h = size
+        inverse = np.linalg.inv(homography.astype(np.float64))
+        dst = np.array([[[0, 0]], [[w - 1, 0]], [[w - 1, h - 1]], [[0, h - 1]]], dtype=np.float64)
+        corners = cv2.perspectiveTransform(dst, inverse)
+        key = (img.shape[:2], (w, h))
+        
+        if (self._maps is None or self._key != key or self._corners is None
+                or np.abs(corners - self._corners).max() > self.tolerance):
+            self._maps = self._compute_maps(inverse, w, h)
+            self._key = key
+            self._corners = corners
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cv2.remap(img, self._maps[0], self._maps[1], cv2.INTER_LINEAR, out)
+    
+    @staticmethod
+    def _compute_maps(inverse: np.ndarray, w: int, h: int) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+        grid = np.dstack([xs, ys]).reshape(-1, 1, 2)
+        src = cv2.perspectiveTransform(grid, inverse).reshape(h, w, 2)
+        return cv2.convertMaps(src, None, cv2.CV_16SC2)
+
+
 def _order_points(pts: np.ndarray) -> np.ndarray:
     """Order points in clockwise manner: TL, TR, BR, BL."""
     rect = np.zeros((4, 2), dtype=pts.dtype)
@@ -282,4 +786,12 @@ def _order_points(pts: np.ndarray) -> np.ndarray:
     rect[1] = pts[np.argmin(diff)]
     rect[3] = pts[np.argmax(diff)]
     
+    if len({tuple(p) for p in rect}) < 4 and len({tuple(p) for p in pts}) == 4:
+        # Strongly skewed quads can give one corner two roles; order by angle
+        # around the centroid instead, starting from the top-left corner
+        centre = pts.astype(np.float64).mean(axis=0)
+        angles = np.arctan2(pts[:, 1] - centre[1], pts[:, 0] - centre[0])
+        ordered = pts[np.argsort(angles)]
+        rect = np.roll(ordered, -int(np.argmin(ordered.sum(axis=1))), axis=0)
+    
     return rect
\ No newline at end of file
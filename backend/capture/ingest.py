@@ -0,0 +1,319 @@
+"""Upload ingest: bounded reads, header probing and reduced-resolution decoding."""
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .geometry import scale_transform, transform_quad
+from .models import StageTimings
+from .pipeline import OUT_SIZE, detect_quad, run_capture
+
+
+# Upload limits (the server can override them from the environment)
+MAX_UPLOAD_BYTES = 32 * 1024 * 1024
+MAX_IMAGE_PIXELS = 100_000_000
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale, skipping most IDCT work
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Fewest source pixels per output pixel (along the paper's shorter side)
+# accepted before decoding at a higher resolution for the warp. At 1.0 the
+# warp never upsamples a reduced decode where the full image has more detail
+WARP_MIN_SCALE = 1.0
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+Buffer = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the byte or pixel limit."""
+    reason = "too_large"
+
+
+class DecodeError(ValueError):
+    """Raised when an image cannot be decoded."""
+    reason = "decode"
+
+
+@dataclass
+class ImageHeader:
+    """Facts read from an encoded image's header without decoding it.
+
+    Attributes:
+        format: "jpeg", "png" or "unknown"
+        width: Stored width in pixels (0 if unknown)
+        height: Stored height in pixels (0 if unknown)
+        orientation: EXIF orientation (1-8, 1 = as stored)
+    """
+    format: str
+    width: int = 0
+    height: int = 0
+    orientation: int = 1
+
+    @property
+    def transposed(self) -> bool:
+        """True if the orientation swaps width and height."""
+        return self.orientation >= 5
+
+    @property
+    def oriented_size(self) -> Tuple[int, int]:
+        """(width, height) after applying the orientation."""
+        if self.transposed:
+            return self.height, self.width
+        return self.width, self.height
+
+
+async def read_upload(read: Callable[[int], Awaitable[bytes]],
+                      max_bytes: int = MAX_UPLOAD_BYTES,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> bytes:
+    """Read an upload in chunks, stopping as soon as it exceeds ``max_bytes``.
+
+    This bounds the memory held for decoding. A multipart upload has already
+    been spooled by the time it is read; the server rejects oversized
+    requests from their Content-Length before that happens.
+
+    Args:
+        read: Async read function, e.g. ``UploadFile.read``
+        max_bytes: Size limit in bytes
+        chunk_size: Bytes per read
+
+    Returns:
+        The upload's bytes
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than ``max_bytes``
+    """
+    data = bytearray()
+    while True:
+        chunk = await read(chunk_size)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+        if len(data) > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+
+def probe_image(data: Buffer) -> ImageHeader:
+    """Read format, size and EXIF orientation from an encoded image's header.
+
+    Only the JPEG markers before the image data (or the PNG IHDR chunk) are
+    parsed; nothing is decoded.
+
+    Raises:
+        DecodeError: If a JPEG or PNG header is truncated or malformed
+    """
+    buf = memoryview(data.data if isinstance(data, np.ndarray) else data).cast("B")
+    if bytes(buf[:2]) == b"\xff\xd8":
+        return _probe_jpeg(buf)
+    if bytes(buf[:8]) == b"\x89PNG\r\n\x1a\n":
+        if len(buf) < 24 or bytes(buf[12:16]) != b"IHDR":
+            raise DecodeError("Malformed PNG header")
+        width, height = struct.unpack_from(">II", buf, 16)
+        return ImageHeader("png", width, height)
+    return ImageHeader("unknown")
+
+
+def _probe_jpeg(buf: memoryview) -> ImageHeader:
+    header = ImageHeader("jpeg")
+    pos = 2
+    try:
+        while pos < len(buf):
+            if buf[pos] != 0xFF:
+                raise DecodeError("Malformed JPEG header")
+            marker = buf[pos + 1]
+            if marker == 0xFF:  # Fill byte
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # No length field
+                pos += 2
+                continue
+            (length,) = struct.unpack_from(">H", buf, pos + 2)
+            segment = buf[pos + 4:pos + 2 + length]
+            if marker in _SOF_MARKERS:
+                header.height, header.width = struct.unpack_from(">HH", segment, 1)
+            elif marker == 0xE1 and bytes(segment[:6]) == b"Exif\x00\x00":
+                header.orientation = _exif_orientation(segment[6:])
+            elif marker == 0xDA:  # Start of scan: image data follows
+                break
+            pos += 2 + length
+    except struct.error:
+        raise DecodeError("Truncated JPEG header")
+    if header.width == 0 or header.height == 0:
+        raise DecodeError("JPEG header has no frame size")
+    return header
+
+
+def _exif_orientation(tiff: memoryview) -> int:
+    """Orientation tag from IFD0 of an EXIF TIFF block (1 if absent or invalid)."""
+    try:
+        order = {b"II": "<", b"MM": ">"}[bytes(tiff[:2])]
+        (ifd,) = struct.unpack_from(order + "I", tiff, 4)
+        (count,) = struct.unpack_from(order + "H", tiff, ifd)
+        for i in range(count):
+            tag, _, _, value = struct.unpack_from(order + "HHIH", tiff, ifd + 2 + 12 * i)
+            if tag == _EXIF_ORIENTATION_TAG:
+                return value if 1 <= value <= 8 else 1
+    except (KeyError, struct.error):
+        pass
+    return 1
+
+
+def apply_orientation(img: np.ndarray, orientation: int) -> np.ndarray:
+    """Rotate/flip a decoded image from stored to EXIF display orientation."""
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.rotate(cv2.transpose(img), cv2.ROTATE_180)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def orientation_transform(header: ImageHeader) -> np.ndarray:
+    """Transform (3×3 float64) from stored pixel coordinates to display orientation.
+
+    Warping the stored image with it (and ``header.oriented_size``) gives
+    the same pixels as ``apply_orientation``.
+    """
+    w, h = header.width - 1, header.height - 1
+    # Rows of the affine part, per orientation
+    rows = {
+        1: ((1, 0, 0), (0, 1, 0)),
+        2: ((-1, 0, w), (0, 1, 0)),
+        3: ((-1, 0, w), (0, -1, h)),
+        4: ((1, 0, 0), (0, -1, h)),
+        5: ((0, 1, 0), (1, 0, 0)),
+        6: ((0, -1, h), (1, 0, 0)),
+        7: ((0, -1, h), (-1, 0, w)),
+        8: ((0, 1, 0), (-1, 0, w)),
+    }[header.orientation]
+    return np.array(rows + ((0, 0, 1),), dtype=np.float64)
+
+
+def decode_transform(header: ImageHeader, reduction: int = 1) -> np.ndarray:
+    """Transform from a stored-orientation decode at 1/``reduction`` scale to
+    full-resolution display coordinates."""
+    if header.format != "jpeg":
+        reduction = 1
+    return orientation_transform(header) @ scale_transform(reduction)
+
+
+def choose_reduction(header: ImageHeader, min_side: int) -> int:
+    """Largest JPEG decode reduction (1, 2, 4 or 8) keeping the shorter side >= ``min_side``."""
+    if header.format != "jpeg":
+        return 1
+    shorter = min(header.width, header.height)
+    for factor in (8, 4, 2):
+        if shorter // factor >= min_side:
+            return factor
+    return 1
+
+
+def decode_image(data: Buffer, header: Optional[ImageHeader] = None,
+                 reduction: int = 1, orient: bool = True,
+                 max_pixels: Optional[int] = None) -> np.ndarray:
+    """Decode an image at 1/``reduction`` scale, in EXIF display orientation.
+
+    The reduced decode is only faster for JPEG; other formats are decoded in
+    full and ignore ``reduction``.
+
+    Args:
+        data: Encoded image bytes
+        header: Header from ``probe_image`` (probed if not given)
+        reduction: 1, 2, 4 or 8
+        orient: Apply the EXIF orientation. With False the image is returned
+            as stored, saving a full-size rotated copy; map its coordinates
+            with ``decode_transform``.
+        max_pixels: Largest stored image (width × height) decoded
+            (default MAX_IMAGE_PIXELS)
+
+    Returns:
+        BGR image
+
+    Raises:
+        DecodeError: If the image cannot be decoded
+        UploadTooLargeError: If the image has more than ``max_pixels`` pixels
+    """
+    header = header or probe_image(data)
+    max_pixels = MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    if header.width * header.height > max_pixels:
+        raise UploadTooLargeError(
+            f"Image is {header.width}x{header.height}, over {max_pixels} pixels")
+    if header.format != "jpeg":
+        reduction = 1
+
+    array = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(array, _REDUCED_FLAGS[reduction] | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        raise DecodeError("Failed to decode image")
+    return apply_orientation(img, header.orientation) if orient else img
+
+
+def run_capture_encoded(data: Buffer, max_pixels: Optional[int] = None,
+                        **kwargs: Any) -> Any:
+    """Run ``run_capture`` on an encoded image, decoding no more than needed.
+
+    The header is probed first. A JPEG is decoded at the largest reduction
+    whose shorter side still covers the 1080px output, and paper detection
+    runs on that image. Only if the paper turns out too small in it for a
+    sharp warp is the image decoded again at a higher resolution.
+
+    Images are decoded as stored: the reduction and the EXIF orientation are
+    folded into the warp homography, so the output is sampled straight from
+    the decode without a rotated or rescaled copy. The returned quad, score
+    and warp matrix are in full-resolution coordinates of the EXIF-oriented
+    image, as if it had been decoded in full.
+
+    Args:
+        data: Encoded image bytes (JPEG/PNG)
+        max_pixels: Largest stored image (width × height) decoded
+            (default MAX_IMAGE_PIXELS)
+        **kwargs: Passed to ``run_capture``
+
+    Raises:
+        DecodeError: If the image cannot be decoded
+        UploadTooLargeError: If the image has more than ``max_pixels`` pixels
+        PaperNotFoundError: If paper is not found
+    """
+    timings = StageTimings()
+    with timings.time("decode"):
+        header = probe_image(data)
+        reduction = choose_reduction(header, OUT_SIZE)
+        img = decode_image(data, header, reduction, orient=False, max_pixels=max_pixels)
+
+    quad = detect_quad(img, timings)
+    full_quad = transform_quad(quad, decode_transform(header, reduction))
+
+    # Paper's shorter side, in source pixels per output pixel
+    sides = np.linalg.norm(quad - np.roll(quad, -1, axis=0), axis=1)
+    coverage = float(sides.min()) / OUT_SIZE
+    needed = reduction
+    while needed > 1 and coverage < WARP_MIN_SCALE:
+        needed //= 2
+        coverage *= 2
+    if needed != reduction:
+        with timings.time("decode"):
+            img = decode_image(data, header, needed, orient=False, max_pixels=max_pixels)
+
+    return run_capture(img, quad=full_quad, source_transform=decode_transform(header, needed),
+                       timings=timings, **kwargs)
@@ -2,117 +2,196 @@
 
 import cv2
 import numpy as np
+from typing import Optional, Tuple
 
+from .context import get_processing_context
 
-def normalize_lighting(gray: np.ndarray) -> np.ndarray:
-    """Normalize lighting using CLAHE and optional histogram equalization.
-    
-    Applies Contrast Limited Adaptive Histogram Equalization (CLAHE) to
-    improve local contrast. If the image is too dark or bright overall,
-    also applies global histogram equalization.
+
+def _histogram(gray: np.ndarray) -> np.ndarray:
+    """256-bin histogram of a uint8 image as int64 counts."""
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    return hist.ravel().astype(np.int64)
+
+
+def _lut_mean(hist: np.ndarray, lut: np.ndarray) -> float:
+    """Mean of the image with histogram ``hist`` after mapping through ``lut``."""
+    return float(np.dot(hist, lut)) / float(hist.sum())
+
+
+def _lut_percentiles(hist: np.ndarray, lut: np.ndarray,
+                     percentiles: Tuple[float, ...]) -> Tuple[float, ...]:
+    """``np.percentile`` (linear) of the mapped image, read off its histogram."""
+    mapped = np.bincount(lut, weights=hist, minlength=256)
+    cumulative = np.cumsum(mapped)
+    n = int(cumulative[-1])
+    
+    def value_at(rank: int) -> float:
+        # rank-th smallest pixel (0-based): first value whose cumulative count exceeds it
+        return float(np.searchsorted(cumulative, rank, side="right"))
+    
+    results = []
+    for q in percentiles:
+        index = q / 100 * (n - 1)
+        lo = int(np.floor(index))
+        hi = min(lo + 1, n - 1)
+        results.append(float(np.percentile([value_at(lo), value_at(hi)], (index - lo) * 100)))
+    return tuple(results)
+
+
+def lighting_profile(hist: np.ndarray) -> Tuple[str, float]:
+    """Choose the CLAHE profile for an image from its histogram.
     
     Args:
-        gray: Grayscale image (single channel)
+        hist: 256-bin histogram of the grayscale image
         
     Returns:
-        Normalized grayscale image
-        
-    Raises:
-        ValueError: If input is not grayscale
+        Tuple of (profile, mean_brightness): "mild" for images already in a
+        good range with decent contrast (CLAHE only), otherwise "strong"
+        (CLAHE followed by the corrections of ``lighting_lut``)
     """
-    if len(gray.shape) != 2:
-        raise ValueError("Input must be grayscale (single channel)")
-    
-    # Calculate initial statistics
-    mean_brightness = np.mean(gray)
-    std_brightness = np.std(gray)
-    
-    # If image is already in a good range with decent contrast, apply minimal processing
+    values = np.arange(256, dtype=np.float64)
+    mean_brightness = float(np.dot(hist, values)) / float(hist.sum())
+    std_brightness = float(np.sqrt(np.dot(hist, (values - mean_brightness) ** 2) / hist.sum()))
     if 100 <= mean_brightness <= 180 and std_brightness > 20:
-        # Just apply mild CLAHE for local contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        return clahe.apply(gray)
+        return "mild", mean_brightness
+    return "strong", mean_brightness
+
+
+def lighting_lut(mean_brightness: float, hist: np.ndarray) -> np.ndarray:
+    """Brightness corrections applied after strong CLAHE, as a lookup table.
     
-    # Step 1: Apply initial CLAHE for local contrast
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
+    Args:
+        mean_brightness: Mean of the image before CLAHE
+        hist: 256-bin histogram of the CLAHE output
+        
+    Returns:
+        256-entry uint8 lookup table
+    """
+    lut = np.arange(256, dtype=np.uint8)
     
     # Step 2: Apply brightness correction based on initial brightness
     if mean_brightness < 80:
         # Very dark image - apply aggressive brightening
         # Method 1: Gamma correction
         gamma = 2.2
-        enhanced = np.power(enhanced / 255.0, 1.0 / gamma)
-        enhanced = (enhanced * 255).astype(np.uint8)
+        lut = np.power(lut / 255.0, 1.0 / gamma)
+        lut = (lut * 255).astype(np.uint8)
         
         # Method 2: Linear scaling to target range
-        current_mean = enhanced.mean()
+        current_mean = _lut_mean(hist, lut)
         if current_mean < 80:
             target_mean = 120
             scale = target_mean / max(current_mean, 1)
-            enhanced = np.clip(enhanced * scale, 0, 255).astype(np.uint8)
+            lut = np.clip(lut * scale, 0, 255).astype(np.uint8)
             
     elif mean_brightness > 200:  # Increased threshold from 180 to 200
         # Very bright image - apply darkening
         # Method 1: Gamma correction
         gamma = 0.4
-        enhanced = np.power(enhanced / 255.0, gamma)
-        enhanced = (enhanced * 255).astype(np.uint8)
+        lut = np.power(lut / 255.0, gamma)
+        lut = (lut * 255).astype(np.uint8)
         
         # Method 2: Linear scaling to target range
-        current_mean = enhanced.mean()
+        current_mean = _lut_mean(hist, lut)
         if current_mean > 170:
             target_mean = 130
             scale = target_mean / max(current_mean, 1)
-            enhanced = np.clip(enhanced * scale, 0, 255).astype(np.uint8)
+            lut = np.clip(lut * scale, 0, 255).astype(np.uint8)
     
     # Step 3: Final adjustment using histogram stretching (only for extreme cases)
-    final_mean = enhanced.mean()
+    final_mean = _lut_mean(hist, lut)
     if final_mean < 80 or final_mean > 200:  # Increased upper threshold
         # Apply percentile-based stretching
-        p2, p98 = np.percentile(enhanced, (2, 98))
+        p2, p98 = _lut_percentiles(hist, lut, (2, 98))
         
         # Stretch to use more of the dynamic range
         if p98 - p2 > 10:  # Avoid division by zero
-            enhanced = np.clip((enhanced - p2) * 255.0 / (p98 - p2), 0, 255).astype(np.uint8)
+            lut = np.clip((lut - p2) * 255.0 / (p98 - p2), 0, 255).astype(np.uint8)
         
         # Apply one more scaling to get into target range
-        current_mean = enhanced.mean()
+        current_mean = _lut_mean(hist, lut)
         if current_mean < 80:
             target_mean = 100
             scale = target_mean / max(current_mean, 1)
-            enhanced = np.clip(enhanced * scale, 0, 255).astype(np.uint8)
+            lut = np.clip(lut * scale, 0, 255).astype(np.uint8)
         elif current_mean > 170:
             target_mean = 150
             scale = target_mean / max(current_mean, 1)
-            enhanced = np.clip(enhanced * scale, 0, 255).astype(np.uint8)
+            lut = np.clip(lut * scale, 0, 255).astype(np.uint8)
+    
+    return lut
+
+
+def normalize_lighting(gray: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Normalize lighting using CLAHE and optional histogram equalization.
+    
+    Applies Contrast Limited Adaptive Histogram Equalization (CLAHE) to
+    improve local contrast. If the image is too dark or bright overall,
+    also applies global histogram equalization.
+    
+    Every correction after CLAHE maps one uint8 value to another, so they
+    are composed into a single 256-entry lookup table (``lighting_lut``),
+    with the statistics each step depends on read from the CLAHE output's
+    histogram, and applied with one ``cv2.LUT`` pass. CLAHE objects and the
+    intermediate CLAHE output come from the thread's processing context.
     
-    return enhanced
+    Args:
+        gray: Grayscale image (single channel)
+        out: Optional array shaped like ``gray`` to write the result into
+        
+    Returns:
+        Normalized grayscale image
+        
+    Raises:
+        ValueError: If input is not grayscale
+    """
+    if len(gray.shape) != 2:
+        raise ValueError("Input must be grayscale (single channel)")
+    
+    context = get_processing_context()
+    
+    # Calculate initial statistics from the histogram
+    profile, mean_brightness = lighting_profile(_histogram(gray))
+    
+    # If image is already in a good range with decent contrast, apply minimal processing
+    if profile == "mild":
+        # Just apply mild CLAHE for local contrast enhancement
+        return context.clahe("mild").apply(gray, out)
+    
+    # Step 1: Apply initial CLAHE for local contrast
+    enhanced = context.clahe("strong").apply(gray, context.buffer("clahe", gray.shape))
+    
+    # Remaining steps transform a lookup table instead of the image
+    lut = lighting_lut(mean_brightness, _histogram(enhanced))
+    return cv2.LUT(enhanced, lut, out)
 
 
-def enhance_color_image(bgr: np.ndarray) -> np.ndarray:
+def enhance_color_image(bgr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
     """Enhance color image by normalizing each channel independently.
     
+    LAB conversion works in the thread's processing context buffers, so
+    only the result (unless ``out`` is given) is newly allocated.
+    
     Args:
         bgr: Color image in BGR format
+        out: Optional array shaped like ``bgr`` to write the result into
         
     Returns:
         Enhanced BGR image
     """
-    # Convert to LAB color space for better lighting control
-    lab = cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB)
+    context = get_processing_context()
+    h, w = bgr.shape[:2]
     
-    # Split channels
-    l, a, b = cv2.split(lab)
+    # Convert to LAB color space for better lighting control
+    lab = cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB, context.buffer("lab", bgr.shape))
     
     # Apply lighting normalization to L channel only
-    l_normalized = normalize_lighting(l)
-    
-    # Merge and convert back
-    lab_normalized = cv2.merge([l_normalized, a, b])
-    bgr_enhanced = cv2.cvtColor(lab_normalized, cv2.COLOR_LAB2BGR)
+    lightness = cv2.extractChannel(lab, 0, context.buffer("lab_l", (h, w)))
+    l_normalized = normalize_lighting(lightness, out=context.buffer("lab_l_normalized", (h, w)))
     
-    return bgr_enhanced
+    # Put L back and convert back
+    cv2.insertChannel(l_normalized, lab, 0)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, out)
 
 
 def adaptive_normalize(gray: np.ndarray, target_mean: int = 120, target_std: int = 40) -> np.ndarray:
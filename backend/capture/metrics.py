@@ -0,0 +1,197 @@
+"""Stage timing and Prometheus-style metrics for the capture pipeline.
+
+Pipeline code records into a ``models.StageTimings`` that travels with each
+result (it pickles with it, so timings measured in a worker process reach
+the server). The server folds those into the process-wide ``CaptureMetrics``
+and exposes them in the Prometheus text format.
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .models import StageTimings
+
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """Thread-safe histogram with fixed buckets, one series per label set."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record one observation for the series ``label_values``.
+
+        Raises:
+            ValueError: If the number of label values is wrong
+        """
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {label_values}")
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound),
+                     len(self.buckets))
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Count and sum per label set."""
+        with self._lock:
+            return {key: {"count": sum(counts), "sum": total[0]}
+                    for key, (counts, total) in self._series.items()}
+
+    def render(self) -> List[str]:
+        """Lines of the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total[0])
+                            for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (le,))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter, one series per label set."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """Increase the series ``label_values`` by ``amount``.
+
+        Raises:
+            ValueError: If the number of label values is wrong
+        """
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {label_values}")
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        """Value per label set."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        """Lines of the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def failure_reason(error: BaseException) -> str:
+    """Short label for why a capture failed.
+
+    Errors raised by the pipeline carry a ``reason`` attribute (e.g.
+    ``"no_paper"``); other ``ValueError``s count as ``"invalid_input"``.
+    """
+    reason = getattr(error, "reason", None)
+    if reason:
+        return str(reason)
+    return "invalid_input" if isinstance(error, ValueError) else "error"
+
+
+class CaptureMetrics:
+    """Process-wide capture metrics.
+
+    Attributes:
+        stage_seconds: Histogram of pipeline stage durations by stage
+        strategy_seconds: Histogram of detection strategy run times by strategy
+        strategy_errors: Detection strategies that raised, by strategy
+        failures: Failed captures by reason
+        request_seconds: HTTP request durations by method, route and status
+        response_cache: Response cache lookups by result ("hit" or "miss")
+    """
+
+    def __init__(self) -> None:
+        self.stage_seconds = Histogram(
+            "capture_stage_seconds", "Time spent in each capture pipeline stage.", ("stage",))
+        self.strategy_seconds = Histogram(
+            "capture_detect_strategy_seconds", "Run time of each paper detection strategy.",
+            ("strategy",))
+        self.strategy_errors = Counter(
+            "capture_detect_strategy_errors_total", "Detection strategies that raised.",
+            ("strategy",))
+        self.failures = Counter(
+            "capture_failures_total", "Captures that failed, by reason.", ("reason",))
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds", "HTTP request latency.",
+            ("method", "route", "status"))
+        self.response_cache = Counter(
+            "capture_response_cache_lookups_total", "Capture response cache lookups, by result.",
+            ("result",))
+
+    def record(self, timings: StageTimings) -> None:
+        """Fold one capture's timings into the histograms."""
+        for stage, seconds in timings.stages.items():
+            self.stage_seconds.observe(seconds, stage)
+        for strategy, seconds in timings.strategies.items():
+            self.strategy_seconds.observe(seconds, strategy)
+        for strategy in timings.strategy_errors:
+            self.strategy_errors.inc(strategy)
+
+    def record_failure(self, error: BaseException) -> str:
+        """Count a failed capture (and its timings, if it has any).
+
+        Returns:
+            The failure reason label
+        """
+        timings: Optional[StageTimings] = getattr(error, "timings", None)
+        if timings is not None:
+            self.record(timings)
+        reason = failure_reason(error)
+        self.failures.inc(reason)
+        return reason
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in (self.stage_seconds, self.strategy_seconds, self.strategy_errors,
+                       self.failures, self.request_seconds, self.response_cache):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared metrics of this process (see get_metrics)
+_metrics = CaptureMetrics()
+
+
+def get_metrics() -> CaptureMetrics:
+    """Return the process-wide capture metrics."""
+    return _metrics
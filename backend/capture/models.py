@@ -1,8 +1,53 @@
 """Data models for capture results."""
 
-from dataclasses import dataclass
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 import numpy as np
-from typing import Optional
+from typing import Dict, Iterator, List, Optional
+
+
+@dataclass
+class StageTimings:
+    """Per-stage durations of one capture, in seconds (monotonic clock).
+
+    Attributes:
+        stages: Seconds per stage; a stage timed twice accumulates
+        strategies: Seconds per detection strategy that completed
+        strategy_errors: Detection strategies that raised
+    """
+    stages: Dict[str, float] = field(default_factory=dict)
+    strategies: Dict[str, float] = field(default_factory=dict)
+    strategy_errors: List[str] = field(default_factory=list)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Context manager adding the time spent in its body to ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add ``seconds`` to ``stage``."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_detection(self, detection: "PaperDetection") -> None:
+        """Record per-strategy timings and errors from a detection."""
+        self.strategies.update(detection.timings)
+        self.strategy_errors.extend(name for name in detection.finished
+                                    if name not in detection.timings)
+
+    @property
+    def total(self) -> float:
+        """Sum of all stage times."""
+        return sum(self.stages.values())
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, e.g. ``detect;dur=12.5, warp;dur=3.1``."""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}"
+                         for stage, seconds in self.stages.items())
 
 
 @dataclass
@@ -13,12 +58,17 @@ class CaptureResult:
         flat: 1080×1080 uint8 array of the deskewed, lighting-normalized image
         warp_matrix: 3×3 float32 homography matrix used for perspective transform
         alignment_score: Paper area ratio (0-1), where 1.0 means paper fills entire frame
-        preview_png: Encoded PNG bytes of the final overlay image for frontend display
+        preview_png: Encoded bytes of the final overlay image for frontend display
+            (PNG unless another preview format was requested)
+        preview_media_type: MIME type of ``preview_png``
+        timings: Time spent in each pipeline stage
     """
     flat: np.ndarray          # 1080×1080 uint8 (post-warp, lighting fixed)
     warp_matrix: np.ndarray   # 3×3 float32 homography
     alignment_score: float    # paper area ÷ image area (0–1)
     preview_png: bytes        # colour PNG overlay for frontend
+    preview_media_type: str = "image/png"
+    timings: StageTimings = field(default_factory=StageTimings)
     
     def __post_init__(self) -> None:
         """Validate data types and shapes."""
@@ -26,4 +76,42 @@ class CaptureResult:
         assert self.flat.dtype == np.uint8, f"Expected uint8, got {self.flat.dtype}"
         assert self.warp_matrix.shape == (3, 3), f"Expected (3, 3), got {self.warp_matrix.shape}"
         assert 0 <= self.alignment_score <= 1, f"Invalid alignment score: {self.alignment_score}"
-        assert isinstance(self.preview_png, bytes), "preview_png must be bytes"
\ No newline at end of file
+        assert isinstance(self.preview_png, bytes), "preview_png must be bytes"
+
+
+@dataclass
+class PaperDetection:
+    """Outcome of paper detection, with details about how it was reached.
+
+    Attributes:
+        quad: 4×2 array of paper corners ordered TL, TR, BR, BL, or None
+        confidence: Confidence score (0-1) of the selected quad
+        strategy: Name of the strategy that produced the quad, if any
+        attempted: Strategies that were started, in scheduled order
+        finished: Strategies that completed before detection returned
+        timings: Run time in seconds for each strategy that completed without error
+    """
+    quad: Optional[np.ndarray] = None
+    confidence: float = 0.0
+    strategy: Optional[str] = None
+    attempted: List[str] = field(default_factory=list)
+    finished: List[str] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class TrackingResult:
+    """Per-frame output of the live paper tracker.
+    
+    Attributes:
+        quad: 4×2 float32 corners (TL, TR, BR, BL) in frame coordinates, or None
+        homography: 3×3 float32 homography mapping the quad onto the output square
+        confidence: Detection or tracking confidence (0-1)
+        alignment_score: Paper area ÷ frame area (0–1)
+        keyframe: True if full detection ran on this frame
+    """
+    quad: Optional[np.ndarray] = None
+    homography: Optional[np.ndarray] = None
+    confidence: float = 0.0
+    alignment_score: float = 0.0
+    keyframe: bool = False
@@ -1,90 +1,323 @@
 """High-level capture pipeline orchestration."""
 
 import cv2
+import logging
 import numpy as np
-import time
-from typing import Optional, Tuple
-from .models import CaptureResult
-from .geometry import detect_paper_quad, warp_perspective
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple, Union
+from .context import get_processing_context
+from .encoding import PreviewOptions, encode_preview
+from .models import CaptureResult, StageTimings
+from .geometry import detect_paper, paper_homography, transform_quad
 from .lighting import enhance_color_image
 from .svg_overlay import create_ghost_overlay
 
+logger = logging.getLogger(__name__)
+
+
+# Outputs selectable with ``run_capture(outputs=...)``. The quad, alignment
+# score and warp matrix are always available once the paper is found.
+CAPTURE_OUTPUTS = ("quad", "score", "warped", "flat", "composite", "preview")
+
+OUT_SIZE = 1080
+
+# Feedback when no paper is found in a viewfinder frame
+NO_PAPER_FEEDBACK = "No paper detected. Fit all four corners in the frame."
+
+
+class PaperNotFoundError(ValueError):
+    """Raised when paper detection finds no quad.
+    
+    Attributes:
+        reason: Failure label used by metrics
+        timings: Stage timings up to and including the failed detection
+    """
+    reason = "no_paper"
+    
+    def __init__(self, message: str = "Failed to detect paper in image",
+                 timings: Optional[StageTimings] = None) -> None:
+        super().__init__(message)
+        self.timings = timings
+
+
+class LazyCaptureResult:
+    """Capture result whose images are computed on first access.
+    
+    Paper detection has already run when this is created, so ``quad``,
+    ``alignment_score`` and ``warp_matrix`` are plain attributes. The
+    warped image, the lighting-normalized ``flat`` image, the overlay
+    ``composite`` and the encoded preview are each computed on first access
+    and memoized; later stages reuse earlier ones.
+    
+    When pickled (e.g. returned from a worker process) only the outputs
+    requested from ``run_capture`` are kept, and the source image is
+    dropped, so other outputs can no longer be computed.
+    
+    Attributes:
+        quad: 4×2 array of paper corners in the input image (in the
+            ``source_transform`` target frame if one was given)
+        alignment_score: Paper area ÷ image area (0-1)
+        warp_matrix: 3×3 float32 homography onto the 1080×1080 output
+        outputs: Outputs requested from ``run_capture``
+        timings: Time spent in each stage so far (outputs computed later
+            add to it)
+    """
+    
+    def __init__(self, img_bgr: np.ndarray, quad: np.ndarray, alignment_score: float,
+                 ghost_svg: Optional[str] = None,
+                 ghost_overlay: Optional[np.ndarray] = None,
+                 preview: Optional[PreviewOptions] = None,
+                 outputs: Iterable[str] = (),
+                 source_transform: Optional[np.ndarray] = None,
+                 timings: Optional[StageTimings] = None) -> None:
+        self.quad = quad
+        self.alignment_score = alignment_score
+        self.outputs: FrozenSet[str] = frozenset(outputs)
+        self.preview_options = preview or PreviewOptions()
+        self.timings = timings or StageTimings()
+        
+        self.warp_matrix = paper_homography(quad, OUT_SIZE).astype(np.float32)
+        # What the warp applies to the source image, which may be a reduced or
+        # unrotated decode of the photo ``quad`` refers to
+        self._homography = paper_homography(quad, OUT_SIZE, source_transform)
+        
+        self._img: Optional[np.ndarray] = img_bgr
+        self._ghost_svg = ghost_svg
+        self._ghost_overlay = ghost_overlay
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+    
+    @property
+    def warped(self) -> np.ndarray:
+        """1080×1080 perspective-corrected image."""
+        return self._get("warped", self._compute_warped)
+    
+    @property
+    def flat(self) -> np.ndarray:
+        """1080×1080 warped, lighting-normalized image (without overlay)."""
+        return self._get("flat", self._compute_flat)
+    
+    @property
+    def composite(self) -> np.ndarray:
+        """``flat`` with the ghost overlay blended in (``flat`` if there is none)."""
+        return self._get("composite", lambda: self._compute_composite(None))
+    
+    @property
+    def preview_png(self) -> bytes:
+        """Encoded preview of ``composite`` (PNG unless configured otherwise)."""
+        return self._get("preview", self._compute_preview)
+    
+    @property
+    def preview_media_type(self) -> str:
+        """MIME type of ``preview_png``."""
+        return self.preview_options.media_type
+    
+    def to_capture_result(self) -> CaptureResult:
+        """Compute any missing outputs and return an eager ``CaptureResult``."""
+        return CaptureResult(
+            flat=self.flat,
+            warp_matrix=self.warp_matrix,
+            alignment_score=self.alignment_score,
+            preview_png=self.preview_png,
+            preview_media_type=self.preview_media_type,
+            timings=self.timings
+        )
+    
+    def detach(self) -> None:
+        """Drop the source image and any outputs that were not requested.
+        
+        Called before the result outlives its input, e.g. when the input is
+        a view of shared memory that is about to be released.
+        """
+        with self._lock:
+            self._img = None
+            self._ghost_overlay = None
+            self._values = {k: v for k, v in self._values.items() if k in self.outputs}
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_img"] = None
+        state["_ghost_overlay"] = None
+        state["_values"] = {k: v for k, v in self._values.items() if k in self.outputs}
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    def _get(self, name: str, compute: Any) -> Any:
+        with self._lock:
+            if name not in self._values:
+                if self._img is None:
+                    raise ValueError(f"Capture output {name!r} was not requested "
+                                     f"and the source image is no longer available")
+                self._values[name] = compute()
+            return self._values[name]
+    
+    def _warp(self, out: Optional[np.ndarray]) -> np.ndarray:
+        assert self._img is not None
+        with self.timings.time("warp"):
+            return cv2.warpPerspective(self._img, self._homography, (OUT_SIZE, OUT_SIZE), out)
+    
+    def _compute_warped(self) -> np.ndarray:
+        return self._warp(None)
+    
+    def _compute_flat(self) -> np.ndarray:
+        # Warp into scratch space unless the warped image is kept anyway
+        if "warped" in self._values:
+            warped = self._values["warped"]
+        else:
+            warped = self._warp(get_processing_context().buffer("warp", (OUT_SIZE, OUT_SIZE, 3)))
+        with self.timings.time("lighting"):
+            return enhance_color_image(warped)
+    
+    def _compute_composite(self, out: Optional[np.ndarray]) -> np.ndarray:
+        if self._ghost_overlay is None and not self._ghost_svg:
+            return self.flat
+        flat = self.flat
+        with self.timings.time("overlay"):
+            return create_ghost_overlay(flat, self._ghost_svg, alpha=0.3,
+                                        overlay=self._ghost_overlay, out=out)
+    
+    def _compute_preview(self) -> bytes:
+        # Blend into scratch space unless the composite is kept anyway
+        if "composite" in self._values:
+            composite = self._values["composite"]
+        else:
+            scratch = get_processing_context().buffer("blend", (OUT_SIZE, OUT_SIZE, 3))
+            composite = self._compute_composite(scratch)
+        with self.timings.time("encode"):
+            return encode_preview(composite, self.preview_options)
+
 
 def run_capture(
     img_bgr: np.ndarray,
     ghost_svg: Optional[str] = None,
-    paper_size_mm: Tuple[int, int] = (210, 297)
-) -> CaptureResult:
+    paper_size_mm: Tuple[int, int] = (210, 297),
+    ghost_overlay: Optional[np.ndarray] = None,
+    preview: Optional[PreviewOptions] = None,
+    outputs: Optional[Iterable[str]] = None,
+    quad: Optional[np.ndarray] = None,
+    source_transform: Optional[np.ndarray] = None,
+    timings: Optional[StageTimings] = None
+) -> Union[CaptureResult, LazyCaptureResult]:
     """
     High-level orchestration of the guided capture pipeline.
     
+    Intermediate images live in the calling thread's processing context
+    buffers; only the returned ``flat`` image and the PNG are allocated per
+    call.
+    
     Steps:
       1. Detect paper quadrilateral and compute alignment score
       2. Apply perspective warp to extract square paper region
       3. Normalize lighting for consistent appearance
       4. Optionally blend SVG reference overlay
-      5. Encode preview PNG for frontend display
+      5. Encode preview image for frontend display
+    
+    With ``outputs``, a ``LazyCaptureResult`` is returned instead: step 1
+    always runs, the requested outputs are computed before returning, and
+    the rest only if accessed. ``outputs={"score"}`` or ``{"quad"}`` stops
+    after detection.
     
     Args:
         img_bgr: Input image in BGR format
         ghost_svg: Optional path to SVG reference file for overlay
         paper_size_mm: Expected paper size in mm (width, height)
+        ghost_overlay: Optional pre-rendered 1080×1080 BGRA overlay, e.g. from
+            a tutorial bundle; takes precedence over ``ghost_svg``
+        preview: Preview encoding options (default: full-size PNG, level 9)
+        outputs: Optional selection from ``CAPTURE_OUTPUTS``
+        quad: Optional paper corners already found in ``img_bgr``; skips
+            detection
+        source_transform: Optional 3×3 transform from ``img_bgr`` pixels to
+            the coordinates ``quad`` is given in, e.g. when ``img_bgr`` is a
+            reduced or unrotated decode and ``quad`` refers to the
+            full-resolution, upright photo. The warp samples ``img_bgr``
+            directly; the quad, score and warp matrix are reported in the
+            ``quad`` frame. Requires ``quad``.
+        timings: Optional timings to add the stage times to (e.g. with the
+            decode already recorded); returned as the result's ``timings``
         
     Returns:
-        CaptureResult containing processed image, warp matrix, and metrics
+        CaptureResult containing processed image, warp matrix, and metrics,
+        or a LazyCaptureResult if ``outputs`` is given
         
     Raises:
-        ValueError: If paper detection fails or image is invalid
+        PaperNotFoundError: If paper detection fails
+        ValueError: If the image is invalid or an output name is unknown
     """
-    start_time = time.time()
+    timings = timings or StageTimings()
     
     if img_bgr is None or len(img_bgr.shape) != 3:
         raise ValueError("Invalid input image")
     
+    if outputs is not None:
+        outputs = frozenset(outputs)
+        unknown = outputs - set(CAPTURE_OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown capture outputs: {sorted(unknown)} "
+                             f"(expected any of {CAPTURE_OUTPUTS})")
+    
+    if source_transform is not None and quad is None:
+        raise ValueError("source_transform requires quad")
+    
     # Step 1: Detect paper quadrilateral
-    quad = detect_paper_quad(img_bgr)
     if quad is None:
-        raise ValueError("Failed to detect paper in image")
+        quad = detect_quad(img_bgr, timings)
     
     # Calculate alignment score (paper area / image area)
-    img_area = img_bgr.shape[0] * img_bgr.shape[1]
+    h, w = img_bgr.shape[:2]
+    if source_transform is None:
+        img_area = h * w
+    else:
+        # Outer pixel edges, so the area is exact for scaled/rotated decodes
+        corners = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32) - 0.5
+        img_area = cv2.contourArea(transform_quad(corners, source_transform))
     paper_area = cv2.contourArea(quad)
     alignment_score = float(paper_area / img_area)
     
-    # Step 2: Apply perspective warp
-    warped_bgr, warp_matrix = warp_perspective(img_bgr, quad, out_size=1080)
-    
-    # Step 3: Normalize lighting
-    enhanced_bgr = enhance_color_image(warped_bgr)
-    
-    # Step 4: Apply ghost overlay if SVG provided
-    if ghost_svg:
-        final_bgr = create_ghost_overlay(enhanced_bgr, ghost_svg, alpha=0.3)
-    else:
-        final_bgr = enhanced_bgr
-    
-    # Step 5: Encode preview PNG
-    encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 9]  # Max compression
-    success, png_buffer = cv2.imencode('.png', final_bgr, encode_params)
-    if not success:
-        raise ValueError("Failed to encode preview PNG")
+    # Steps 2-5 run as the result's outputs are computed
+    result = LazyCaptureResult(img_bgr, quad, alignment_score, ghost_svg=ghost_svg,
+                               ghost_overlay=ghost_overlay, preview=preview,
+                               outputs=outputs or (), source_transform=source_transform,
+                               timings=timings)
+    if outputs is not None:
+        for name in ("warped", "flat", "composite"):
+            if name in outputs:
+                getattr(result, name)
+        if "preview" in outputs:
+            result.preview_png
+        return result
     
-    preview_png = png_buffer.tobytes()
+    capture = result.to_capture_result()
     
     # Log processing time
-    elapsed = time.time() - start_time
+    elapsed = timings.total
     if elapsed > 0.5:
-        print(f"Warning: Capture pipeline took {elapsed:.2f}s (target: <0.5s)")
+        logger.warning(f"Capture pipeline took {elapsed:.2f}s (target: <0.5s)")
     
-    return CaptureResult(
-        flat=enhanced_bgr,  # Return lighting-normalized version without overlay
-        warp_matrix=warp_matrix,
-        alignment_score=alignment_score,
-        preview_png=preview_png
-    )
+    return capture
 
 
-def validate_capture_quality(result: CaptureResult) -> Tuple[bool, str]:
+def detect_quad(img_bgr: np.ndarray, timings: StageTimings) -> np.ndarray:
+    """Detect the paper quad, recording detection and per-strategy timings.
+    
+    Raises:
+        PaperNotFoundError: If no quad is found
+    """
+    with timings.time("detect"):
+        detection = detect_paper(img_bgr)
+    timings.add_detection(detection)
+    if detection.quad is None:
+        raise PaperNotFoundError(timings=timings)
+    return detection.quad
+
+
+def validate_capture_quality(
+    result: Union[CaptureResult, LazyCaptureResult]
+) -> Tuple[bool, str]:
     """Validate capture quality and provide feedback.
     
     Args:
@@ -93,13 +326,25 @@ def validate_capture_quality(result: CaptureResult) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, feedback_message)
     """
-    if result.alignment_score < 0.2:
+    return feedback_for_score(result.alignment_score)
+
+
+def feedback_for_score(alignment_score: float) -> Tuple[bool, str]:
+    """Quality feedback for a paper alignment score.
+    
+    Args:
+        alignment_score: Paper area ÷ image area (0-1)
+        
+    Returns:
+        Tuple of (is_valid, feedback_message)
+    """
+    if alignment_score < 0.2:
         return False, "Paper too small or far away. Move closer to fill more of the frame."
     
-    if result.alignment_score < 0.4:
+    if alignment_score < 0.4:
         return True, "Good capture. For best results, move slightly closer."
     
-    if result.alignment_score > 0.9:
+    if alignment_score > 0.9:
         return True, "Warning: Paper very close to edges. Ensure all corners are visible."
     
     return True, "Excellent capture!"
\ No newline at end of file
@@ -0,0 +1,456 @@
+"""Incremental re-capture: repeated photos of one sheet, reprocessing only what changed.
+
+In a drawing session the same sheet is photographed again and again as
+strokes are added, so most of each new ``flat`` image equals the previous
+one. A ``RecaptureSession`` keeps the previous capture's intermediates
+(LAB planes, CLAHE output, lighting lookup table, flat and composite
+images). Each new photo is warped into the session's frame and compared
+with the previous one at reduced resolution. Only the tiles that changed
+go through lighting normalization, overlay blending and preview encoding.
+
+Photos are registered against the previous warp: the previous paper quad
+is reused while ``quad_confidence`` still finds the sheet's outline there,
+so detection neither runs again nor jitters the frame. Detection reruns
+when the outline is lost or when most of the warped frame changed (the
+sheet or the phone moved).
+
+Lighting is regional, not per-tile. A CLAHE output pixel depends on the
+histograms of the CLAHE tiles around it (135px at 1080px). So a change
+refreshes the surrounding CLAHE tiles, and the regions handed downstream
+are the changed tiles grown by about half a CLAHE tile. CLAHE runs on
+crops aligned to its own tile grid, which reproduces the full-image result
+there (within ±1). The global brightness corrections after CLAHE are kept
+from the previous capture while they stay within ``LUT_TOLERANCE`` of what
+the new image would get. Otherwise the whole image is relit.
+
+``RecaptureResult.regions`` is also what ``compare.StrokeTracker.update``
+takes, so stroke comparison only redoes its edge and distance maps there.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .context import CLAHE_PROFILES, get_processing_context
+from .encoding import PreviewOptions, encode_preview
+from .geometry import quad_confidence
+from .lighting import _histogram, lighting_lut, lighting_profile
+from .models import CaptureResult, StageTimings
+from .pipeline import OUT_SIZE, LazyCaptureResult, run_capture
+from .svg_overlay import PreparedOverlay, blend_overlay, prepare_overlay, render_svg_cached
+
+# Rectangle (x, y, width, height) in frame pixels
+Rect = Tuple[int, int, int, int]
+
+# Side of the change-detection tiles in frame pixels (18×18 tiles at 1080px)
+TILE_SIZE = 60
+
+# Change detection compares the frames downscaled by this factor
+DIFF_SCALE = 4
+
+# A tile changed if any of its downscaled gray levels moved by more than this.
+# A 2px pencil stroke still moves 4×4 blocks by ~30 levels; sensor noise and
+# sub-pixel registration jitter stay well below after the averaging
+CHANGE_THRESHOLD = 20
+
+# Above this fraction of changed tiles (e.g. the lighting or the framing
+# changed) the capture is redone in full
+FULL_FRACTION = 0.5
+
+# Largest change of any lighting lookup table entry (gray levels) tolerated
+# before the whole image is relit
+LUT_TOLERANCE = 2
+
+# Confidence the previous quad must keep on a new photo to be reused
+# (PaperTracker's default for tracked quads)
+REUSE_MIN_CONFIDENCE = 0.6
+
+
+@dataclass
+class PreviewPatch:
+    """An encoded rectangle of the composite, to paint over the previous preview.
+
+    Attributes:
+        x, y, width, height: Position and size in frame pixels
+        data: Encoded image of the rectangle
+    """
+    x: int
+    y: int
+    width: int
+    height: int
+    data: bytes
+
+
+@dataclass
+class RecaptureResult:
+    """Outcome of one ``RecaptureSession.update``.
+
+    ``flat`` and ``composite`` are the session's own images. They are updated
+    in place by the next update, so copy them to keep them.
+
+    Attributes:
+        capture: Detection result (quad, alignment score, warp matrix)
+        flat: 1080×1080 lighting-normalized image
+        composite: ``flat`` with the ghost overlay blended in
+        regions: Rectangles of ``flat``/``composite`` recomputed by this
+            update (the whole frame for a full capture, empty if nothing
+            changed)
+        changed_tiles: Number of change-detection tiles that changed
+        full: True if everything was recomputed
+        preview_options: Encoding of previews and patches
+        timings: Time spent in each stage
+    """
+    capture: LazyCaptureResult
+    flat: np.ndarray
+    composite: np.ndarray
+    regions: List[Rect] = field(default_factory=list)
+    changed_tiles: int = 0
+    full: bool = False
+    preview_options: PreviewOptions = field(default_factory=PreviewOptions)
+    timings: StageTimings = field(default_factory=StageTimings)
+
+    @property
+    def alignment_score(self) -> float:
+        """Paper area ÷ image area (0-1)."""
+        return self.capture.alignment_score
+
+    @property
+    def warp_matrix(self) -> np.ndarray:
+        """3×3 float32 homography onto the 1080×1080 output."""
+        return self.capture.warp_matrix
+
+    def preview_patches(self) -> List[PreviewPatch]:
+        """Encode each recomputed region of the composite.
+
+        Patches are at frame resolution; ``preview_options.max_size`` only
+        applies to ``preview_png``.
+        """
+        options = PreviewOptions(format=self.preview_options.format,
+                                 png_level=self.preview_options.png_level,
+                                 quality=self.preview_options.quality)
+        patches = []
+        with self.timings.time("encode"):
+            for x, y, w, h in self.regions:
+                data = encode_preview(self.composite[y:y + h, x:x + w], options)
+                patches.append(PreviewPatch(x, y, w, h, data))
+        return patches
+
+    @property
+    def preview_png(self) -> bytes:
+        """Encoded preview of the whole composite."""
+        with self.timings.time("encode"):
+            return encode_preview(self.composite, self.preview_options)
+
+    def to_capture_result(self) -> CaptureResult:
+        """Eager ``CaptureResult`` with a full preview and a copy of ``flat``."""
+        return CaptureResult(
+            flat=self.flat.copy(),
+            warp_matrix=self.warp_matrix,
+            alignment_score=self.alignment_score,
+            preview_png=self.preview_png,
+            preview_media_type=self.preview_options.media_type,
+            timings=self.timings
+        )
+
+
+class RecaptureSession:
+    """Capture state of one drawing session, for incremental re-captures.
+
+    The first update (and any update where much of the sheet changed) runs
+    the full pipeline. Later updates only recompute the regions that
+    changed, reusing the previous flat and composite images elsewhere.
+    Not thread-safe: updates of one session must not overlap.
+    """
+
+    def __init__(self, ghost_svg: Optional[str] = None,
+                 ghost_overlay: Optional[np.ndarray] = None,
+                 preview: Optional[PreviewOptions] = None,
+                 tile_size: int = TILE_SIZE,
+                 change_threshold: float = CHANGE_THRESHOLD,
+                 full_fraction: float = FULL_FRACTION,
+                 lut_tolerance: int = LUT_TOLERANCE,
+                 reuse_min_confidence: float = REUSE_MIN_CONFIDENCE) -> None:
+        """Create a session.
+
+        Args:
+            ghost_svg: Optional SVG reference file for the overlay
+            ghost_overlay: Optional pre-rendered 1080×1080 BGRA overlay, e.g.
+                from a tutorial bundle; takes precedence over ``ghost_svg``
+            preview: Preview encoding options
+            tile_size: Change-detection tile side in frame pixels; a
+                multiple of DIFF_SCALE dividing 1080
+            change_threshold: Gray level change that marks a tile as changed
+            full_fraction: Fraction of changed tiles above which the capture
+                is redone in full
+            lut_tolerance: Lighting lookup table drift tolerated before the
+                whole image is relit
+            reuse_min_confidence: ``quad_confidence`` the previous quad needs
+                on a new photo to skip detection (above 1 to always detect)
+
+        Raises:
+            ValueError: If the tile size does not fit the frame
+        """
+        if tile_size % DIFF_SCALE or OUT_SIZE % tile_size:
+            raise ValueError(f"tile_size must be a multiple of {DIFF_SCALE} dividing "
+                             f"{OUT_SIZE}, got {tile_size}")
+        self.ghost_svg = ghost_svg
+        self.preview_options = preview or PreviewOptions()
+        self.tile_size = tile_size
+        self.change_threshold = change_threshold
+        self.full_fraction = full_fraction
+        self.lut_tolerance = lut_tolerance
+        self.reuse_min_confidence = reuse_min_confidence
+        self.updates = 0
+        self.full_updates = 0
+        self.detections = 0
+
+        self._overlay: Optional[np.ndarray] = None
+        self._prepared: Optional[PreparedOverlay] = None
+        if ghost_overlay is not None:
+            if ghost_overlay.shape[:2] != (OUT_SIZE, OUT_SIZE):
+                ghost_overlay = cv2.resize(ghost_overlay, (OUT_SIZE, OUT_SIZE),
+                                           interpolation=cv2.INTER_LINEAR)
+            self._prepared = prepare_overlay(ghost_overlay, 0.3)
+        elif ghost_svg:
+            rendered = render_svg_cached(ghost_svg, (OUT_SIZE, OUT_SIZE))
+            self._overlay = (cv2.cvtColor(rendered, cv2.COLOR_BGRA2BGR)
+                             if rendered.shape[2] == 4 else rendered)
+
+        # Previous photo's paper quad and image size
+        self._quad: Optional[np.ndarray] = None
+        self._image_shape: Tuple[int, ...] = ()
+
+        # Previous capture's state, all in the 1080×1080 frame
+        self._small: Optional[np.ndarray] = None
+        self._lab = np.empty((OUT_SIZE, OUT_SIZE, 3), dtype=np.uint8)
+        self._lightness = np.empty((OUT_SIZE, OUT_SIZE), dtype=np.uint8)
+        self._enhanced = np.empty((OUT_SIZE, OUT_SIZE), dtype=np.uint8)
+        self._flat = np.empty((OUT_SIZE, OUT_SIZE, 3), dtype=np.uint8)
+        self._composite = np.empty((OUT_SIZE, OUT_SIZE, 3), dtype=np.uint8)
+        self._profile = ""
+        self._lut: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget the previous capture, so the next update runs in full."""
+        self._small = None
+        self._quad = None
+
+    def update(self, img_bgr: np.ndarray, quad: Optional[np.ndarray] = None,
+               source_transform: Optional[np.ndarray] = None,
+               timings: Optional[StageTimings] = None) -> RecaptureResult:
+        """Capture a new photo of the session's sheet.
+
+        Args:
+            img_bgr: Input image in BGR format
+            quad: Optional paper corners already found in ``img_bgr``;
+                otherwise the previous photo's quad is reused if it still
+                fits, and the paper is detected if not
+            source_transform: As for ``run_capture``
+            timings: Optional timings to add the stage times to
+
+        Returns:
+            RecaptureResult with the updated images and the recomputed regions
+
+        Raises:
+            PaperNotFoundError: If paper detection fails
+            ValueError: If the image is invalid
+        """
+        reused = False
+        if quad is None and source_transform is None:
+            quad = self._reusable_quad(img_bgr)
+            reused = quad is not None
+        capture = run_capture(img_bgr, outputs=("warped",), quad=quad,
+                              source_transform=source_transform, timings=timings)
+        assert isinstance(capture, LazyCaptureResult)
+        timings = capture.timings
+        warped = capture.warped
+        if quad is None:
+            self.detections += 1
+        if source_transform is None:
+            self._quad = capture.quad
+            self._image_shape = img_bgr.shape
+
+        # Step 1: Find the tiles that changed, on downscaled grays
+        small, changed = self._diff(warped, timings)
+        if reused and changed.sum() > self.full_fraction * changed.size:
+            # The sheet or the phone moved under the reused quad: detect it again
+            capture = run_capture(img_bgr, outputs=("warped",), timings=timings)
+            assert isinstance(capture, LazyCaptureResult)
+            self.detections += 1
+            self._quad = capture.quad
+            warped = capture.warped
+            small, changed = self._diff(warped, timings)
+        if self._small is not None:
+            # Later photos are compared with what the outputs show
+            cells = self.tile_size // DIFF_SCALE
+            mask = np.repeat(np.repeat(changed, cells, axis=0), cells, axis=1)
+            np.copyto(self._small, small, where=mask)
+
+        # Step 2: Recompute everything, the regions around the changes, or nothing
+        self.updates += 1
+        count = int(changed.sum())
+        if self._small is None or count > self.full_fraction * changed.size:
+            self._small = small
+            regions = self._recapture_all(warped, timings)
+        elif count:
+            regions = self._recapture_tiles(warped, changed, timings)
+        else:
+            regions = []
+        full = regions == [full_rect()]
+        if full:
+            self.full_updates += 1
+
+        return RecaptureResult(capture, self._flat, self._composite, regions=regions,
+                               changed_tiles=count, full=full,
+                               preview_options=self.preview_options, timings=timings)
+
+    def _diff(self, warped: np.ndarray,
+              timings: StageTimings) -> Tuple[np.ndarray, np.ndarray]:
+        """Downscaled gray frame and its changed tiles (all of them on a first capture)."""
+        with timings.time("diff"):
+            side = OUT_SIZE // DIFF_SCALE
+            small = cv2.cvtColor(cv2.resize(warped, (side, side), interpolation=cv2.INTER_AREA),
+                                 cv2.COLOR_BGR2GRAY)
+            if self._small is None:
+                return small, np.ones((OUT_SIZE // self.tile_size,) * 2, dtype=bool)
+            return small, self._changed_tiles(small)
+
+    def _reusable_quad(self, img_bgr: np.ndarray) -> Optional[np.ndarray]:
+        """The previous quad, if ``img_bgr`` is the same size and still shows its outline."""
+        if self._quad is None or img_bgr.shape != self._image_shape:
+            return None
+        if quad_confidence(self._quad, img_bgr) < self.reuse_min_confidence:
+            return None
+        return self._quad
+
+    def _changed_tiles(self, small: np.ndarray) -> np.ndarray:
+        """Boolean tile grid of where ``small`` differs from the previous frame."""
+        assert self._small is not None
+        diff = cv2.absdiff(small, self._small)
+        cells = self.tile_size // DIFF_SCALE
+        tiles = OUT_SIZE // self.tile_size
+        return diff.reshape(tiles, cells, tiles, cells).max(axis=(1, 3)) > self.change_threshold
+
+    def _recapture_all(self, warped: np.ndarray, timings: StageTimings) -> List[Rect]:
+        """Run lighting and overlay on the whole frame."""
+        with timings.time("lighting"):
+            cv2.cvtColor(warped, cv2.COLOR_BGR2LAB, self._lab)
+            cv2.extractChannel(self._lab, 0, self._lightness)
+        return self._relight_all(timings)
+
+    def _relight_all(self, timings: StageTimings) -> List[Rect]:
+        """Normalize the lighting of the whole frame, as ``enhance_color_image`` does."""
+        with timings.time("lighting"):
+            self._profile, mean_brightness = lighting_profile(_histogram(self._lightness))
+            get_processing_context().clahe(self._profile).apply(self._lightness, self._enhanced)
+            self._lut = None
+            if self._profile == "strong":
+                self._lut = lighting_lut(mean_brightness, _histogram(self._enhanced))
+        regions = [full_rect()]
+        self._render(regions, timings)
+        return regions
+
+    def _recapture_tiles(self, warped: np.ndarray, changed: np.ndarray,
+                         timings: StageTimings) -> List[Rect]:
+        """Update the changed tiles and relight the regions around them."""
+        with timings.time("lighting"):
+            for x, y, w, h in _tile_runs(changed, self.tile_size):
+                self._lab[y:y + h, x:x + w] = cv2.cvtColor(warped[y:y + h, x:x + w],
+                                                           cv2.COLOR_BGR2LAB)
+                self._lightness[y:y + h, x:x + w] = self._lab[y:y + h, x:x + w, 0]
+
+            # A different lighting profile changes every pixel
+            profile, mean_brightness = lighting_profile(_histogram(self._lightness))
+            if profile != self._profile:
+                relight = True
+            else:
+                regions = self._update_clahe(changed)
+                relight = False
+                if self._lut is not None:
+                    lut = lighting_lut(mean_brightness, _histogram(self._enhanced))
+                    drift = np.abs(lut.astype(np.int16) - self._lut).max()
+                    relight = bool(drift > self.lut_tolerance)
+        if relight:
+            return self._relight_all(timings)
+        self._render(regions, timings)
+        return regions
+
+    def _update_clahe(self, changed: np.ndarray) -> List[Rect]:
+        """Recompute the CLAHE output around changed tiles.
+
+        Each group of touching CLAHE tiles with changes is recomputed from a
+        crop grown by one CLAHE tile, aligned to the CLAHE grid so its tiles
+        (and their lookup tables) are the full image's. Pixels up to half a
+        tile past the group interpolate those lookup tables and are copied
+        back.
+
+        Returns:
+            Rectangles of the CLAHE output that were updated
+        """
+        clip_limit, (grid_x, grid_y) = CLAHE_PROFILES[self._profile]
+        cell_w, cell_h = OUT_SIZE // grid_x, OUT_SIZE // grid_y
+
+        # Changed tiles mapped onto the CLAHE grid
+        ys, xs = np.nonzero(changed)
+        touched = np.zeros((grid_y, grid_x), dtype=np.uint8)
+        for y, x in zip(ys * self.tile_size, xs * self.tile_size):
+            touched[y // cell_h:(y + self.tile_size - 1) // cell_h + 1,
+                    x // cell_w:(x + self.tile_size - 1) // cell_w + 1] = 1
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(touched, connectivity=8)
+        regions = []
+        for tx, ty, tw, th, _ in stats[1:count]:
+            # Crop with one CLAHE tile of context on each side
+            cx0, cy0 = max(tx - 1, 0), max(ty - 1, 0)
+            cx1, cy1 = min(tx + tw + 1, grid_x), min(ty + th + 1, grid_y)
+            clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(cx1 - cx0, cy1 - cy0))
+            crop = clahe.apply(self._lightness[cy0 * cell_h:cy1 * cell_h,
+                                               cx0 * cell_w:cx1 * cell_w])
+
+            # The group's tiles plus the half tiles interpolating with them
+            x0 = max(tx * cell_w - cell_w // 2 - 1, 0)
+            y0 = max(ty * cell_h - cell_h // 2 - 1, 0)
+            x1 = min((tx + tw) * cell_w + cell_w // 2 + 1, OUT_SIZE)
+            y1 = min((ty + th) * cell_h + cell_h // 2 + 1, OUT_SIZE)
+            self._enhanced[y0:y1, x0:x1] = crop[y0 - cy0 * cell_h:y1 - cy0 * cell_h,
+                                                x0 - cx0 * cell_w:x1 - cx0 * cell_w]
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+        return regions
+
+    def _render(self, regions: List[Rect], timings: StageTimings) -> None:
+        """Recompute ``flat`` and ``composite`` in ``regions`` from the CLAHE output."""
+        with timings.time("lighting"):
+            for x, y, w, h in regions:
+                lab = self._lab[y:y + h, x:x + w].copy()
+                enhanced = self._enhanced[y:y + h, x:x + w]
+                lab[:, :, 0] = enhanced if self._lut is None else cv2.LUT(enhanced, self._lut)
+                self._flat[y:y + h, x:x + w] = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+        with timings.time("overlay"):
+            for x, y, w, h in regions:
+                flat = self._flat[y:y + h, x:x + w]
+                out = self._composite[y:y + h, x:x + w]
+                if self._prepared is not None:
+                    blend_overlay(flat, self._prepared.region(x, y, w, h), out=out)
+                elif self._overlay is not None:
+                    blend_overlay(flat, self._overlay[y:y + h, x:x + w], 0.3, out=out)
+                else:
+                    np.copyto(out, flat)
+
+
+def full_rect() -> Rect:
+    """The whole 1080×1080 frame."""
+    return (0, 0, OUT_SIZE, OUT_SIZE)
+
+
+def _tile_runs(changed: np.ndarray, tile: int) -> List[Rect]:
+    """Rectangles covering the changed tiles, one per horizontal run."""
+    runs = []
+    for row in range(changed.shape[0]):
+        # Run starts and ends from the edges of the padded row
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], changed[row].astype(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            runs.append((int(start) * tile, row * tile, int(end - start) * tile, tile))
+    return runs
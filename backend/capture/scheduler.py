@@ -0,0 +1,126 @@
+"""Adaptive ordering and bookkeeping for paper-detection strategies."""
+
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+
+
+# Rough per-call cost (seconds) used to order strategies before any timings exist
+DEFAULT_COST_PRIORS: Dict[str, float] = {
+    "threshold": 0.004,
+    "color": 0.006,
+    "morphology": 0.008,
+    "edges": 0.020,
+}
+
+
+@dataclass
+class StrategyStats:
+    """Running statistics for one detection strategy.
+
+    Attributes:
+        name: Strategy name
+        attempts: Number of times the strategy was run
+        hits: Number of runs that produced a valid candidate quad
+        wins: Number of runs whose candidate was selected
+        failures: Number of runs that raised an exception
+        total_time: Cumulative run time in seconds
+        recent_win_rate: Exponentially weighted win rate over recent runs
+    """
+    name: str
+    attempts: int = 0
+    hits: int = 0
+    wins: int = 0
+    failures: int = 0
+    total_time: float = 0.0
+    recent_win_rate: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        """Mean run time in seconds (0 if never run)."""
+        return self.total_time / self.attempts if self.attempts else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of runs that produced a valid candidate."""
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+class StrategyScheduler:
+    """Orders detection strategies by expected payoff and records their outcomes.
+
+    Strategies are ranked by ``(recent_win_rate + prior_weight) / expected_cost``,
+    so cheap strategies that have been winning recently run first. Until a
+    strategy has been timed, its cost comes from ``cost_priors``.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, cost_priors: Optional[Dict[str, float]] = None,
+                 decay: float = 0.1, prior_weight: float = 0.05) -> None:
+        if not 0 < decay <= 1:
+            raise ValueError(f"Decay must be in range (0, 1], got {decay}")
+        self.cost_priors = dict(DEFAULT_COST_PRIORS if cost_priors is None else cost_priors)
+        self.decay = decay
+        self.prior_weight = prior_weight
+        self._stats: Dict[str, StrategyStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> StrategyStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = StrategyStats(name=name)
+        return stats
+
+    def _expected_cost(self, stats: StrategyStats) -> float:
+        if stats.attempts:
+            return max(stats.mean_time, 1e-6)
+        return self.cost_priors.get(stats.name, max(self.cost_priors.values(), default=0.01))
+
+    def order(self, names: Iterable[str]) -> List[str]:
+        """Return ``names`` sorted from most to least promising."""
+        names = list(names)
+        with self._lock:
+            priority = {
+                name: (self._get(name).recent_win_rate + self.prior_weight)
+                / self._expected_cost(self._get(name))
+                for name in names
+            }
+        # sorted() is stable, so ties keep the caller's order
+        return sorted(names, key=lambda name: -priority[name])
+
+    def record(self, name: str, elapsed: float, hit: bool = False,
+               failed: bool = False) -> None:
+        """Record a single strategy run."""
+        with self._lock:
+            stats = self._get(name)
+            stats.attempts += 1
+            stats.total_time += elapsed
+            stats.hits += int(hit)
+            stats.failures += int(failed)
+
+    def record_outcome(self, attempted: Iterable[str], winner: Optional[str]) -> None:
+        """Update recent win rates for every strategy attempted in one detection."""
+        with self._lock:
+            for name in attempted:
+                stats = self._get(name)
+                won = name == winner
+                stats.wins += int(won)
+                stats.recent_win_rate += self.decay * (float(won) - stats.recent_win_rate)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Snapshot of per-strategy statistics, including derived rates."""
+        with self._lock:
+            snapshot = {}
+            for name, stats in self._stats.items():
+                entry = asdict(stats)
+                entry.pop("name")
+                entry["mean_time"] = stats.mean_time
+                entry["hit_rate"] = stats.hit_rate
+                snapshot[name] = entry
+            return snapshot
+
+    def reset(self) -> None:
+        """Forget all recorded statistics."""
+        with self._lock:
+            self._stats.clear()
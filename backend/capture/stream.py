@@ -0,0 +1,202 @@
+"""Per-connection state and wire format for streaming capture sessions."""
+
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .context import get_processing_context
+from .encoding import PreviewOptions, encode_preview
+from .geometry import WarpMapCache
+from .lighting import enhance_color_image
+from .models import TrackingResult
+from .pipeline import NO_PAPER_FEEDBACK, feedback_for_score
+from .svg_overlay import blend_overlay, render_svg_cached
+from .tracking import PaperTracker
+
+
+# Message types (first byte of every server message)
+MSG_FRAME = 1
+MSG_PREVIEW = 2
+
+# Flags in frame messages
+FLAG_QUAD = 0x01       # A quad was found
+FLAG_KEYFRAME = 0x02   # Full detection ran on this frame
+FLAG_VALID = 0x04      # Alignment is good enough to capture
+FLAG_STABLE = 0x08     # Quad has been still for ``stable_frames`` frames
+
+# type, seq, flags, alignment score, confidence, 4 corners, feedback length
+_FRAME_HEADER = struct.Struct("<BIBff8fH")
+_PREVIEW_HEADER = struct.Struct("<BI")
+
+
+@dataclass
+class FrameMessage:
+    """Decoded per-frame result message.
+
+    Attributes:
+        seq: Client sequence number of the frame this message answers
+        flags: Bitwise OR of the FLAG_* constants
+        alignment_score: Paper area ÷ frame area (0-1)
+        confidence: Detection or tracking confidence (0-1)
+        quad: 4×2 float32 corners in frame coordinates (zeros if no quad)
+        feedback: Human-readable quality feedback
+    """
+    seq: int
+    flags: int
+    alignment_score: float
+    confidence: float
+    quad: np.ndarray
+    feedback: str
+
+
+def encode_frame_message(seq: int, result: TrackingResult, feedback: str,
+                         valid: bool, stable: bool) -> bytes:
+    """Pack a per-frame result into a compact binary message."""
+    flags = 0
+    if result.quad is not None:
+        flags |= FLAG_QUAD
+    if result.keyframe:
+        flags |= FLAG_KEYFRAME
+    if valid:
+        flags |= FLAG_VALID
+    if stable:
+        flags |= FLAG_STABLE
+
+    quad = result.quad if result.quad is not None else np.zeros((4, 2), dtype=np.float32)
+    text = feedback.encode("utf-8")
+    header = _FRAME_HEADER.pack(MSG_FRAME, seq, flags, result.alignment_score,
+                                result.confidence, *quad.astype(np.float32).ravel(), len(text))
+    return header + text
+
+
+def decode_frame_message(data: bytes) -> FrameMessage:
+    """Unpack a message produced by ``encode_frame_message``."""
+    fields = _FRAME_HEADER.unpack_from(data)
+    if fields[0] != MSG_FRAME:
+        raise ValueError(f"Not a frame message (type {fields[0]})")
+    text_len = fields[-1]
+    feedback = data[_FRAME_HEADER.size:_FRAME_HEADER.size + text_len].decode("utf-8")
+    return FrameMessage(
+        seq=fields[1],
+        flags=fields[2],
+        alignment_score=fields[3],
+        confidence=fields[4],
+        quad=np.array(fields[5:13], dtype=np.float32).reshape(4, 2),
+        feedback=feedback,
+    )
+
+
+def encode_preview_message(seq: int, image: bytes) -> bytes:
+    """Prefix an encoded preview image with its message header."""
+    return _PREVIEW_HEADER.pack(MSG_PREVIEW, seq) + image
+
+
+class StreamSession:
+    """Pipeline state for one streaming capture connection.
+
+    Holds a ``PaperTracker`` so most frames skip full detection, and renders
+    the ghost overlay once per session instead of once per preview. Each
+    processed frame yields a small frame message; a preview is rendered only
+    when requested or when the quad has just become stable.
+    """
+
+    def __init__(self, ghost_svg: Optional[str] = None, preview_size: int = 540,
+                 stable_frames: int = 15, stable_tolerance: float = 0.005,
+                 preview_quality: int = 80) -> None:
+        """Create a session.
+
+        Args:
+            ghost_svg: Optional SVG reference file for the preview overlay
+            preview_size: Side length of the square preview in pixels
+            stable_frames: Frames the quad must stay put to count as stable
+            stable_tolerance: Max corner movement per frame, as a fraction of
+                the frame diagonal, that still counts as still
+            preview_quality: JPEG quality of previews
+        """
+        self.ghost_svg = ghost_svg
+        self.preview_size = preview_size
+        self.stable_frames = stable_frames
+        self.stable_tolerance = stable_tolerance
+        self.preview_options = PreviewOptions(format="jpeg", quality=preview_quality)
+        self.tracker = PaperTracker(out_size=preview_size)
+
+        self._overlay: Optional[np.ndarray] = None
+        # The tracker's smoothed quad barely moves while the paper is held still
+        self._warp_maps = WarpMapCache()
+        self._last_quad: Optional[np.ndarray] = None
+        self._still_frames = 0
+        self._stable_sent = False
+
+    def process(self, data: bytes, seq: int,
+                want_preview: bool = False) -> Tuple[bytes, Optional[bytes]]:
+        """Process one compressed frame.
+
+        Args:
+            data: Encoded image bytes (JPEG/PNG)
+            seq: Client sequence number, echoed in the replies
+            want_preview: Render a preview for this frame if a quad is found
+
+        Returns:
+            Tuple of (frame_message, preview_message or None)
+
+        Raises:
+            ValueError: If the frame cannot be decoded
+        """
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Failed to decode frame")
+
+        result = self.tracker.update(frame)
+        stable = self._update_stability(result, frame.shape[:2])
+        valid, feedback = feedback_for_score(result.alignment_score)
+        if result.quad is None:
+            valid, feedback = False, NO_PAPER_FEEDBACK
+
+        message = encode_frame_message(seq, result, feedback, valid, stable)
+
+        preview = None
+        newly_stable = stable and not self._stable_sent
+        if result.homography is not None and (want_preview or newly_stable):
+            preview = encode_preview_message(seq, self.render_preview(frame, result.homography))
+            self._stable_sent = self._stable_sent or stable
+        return message, preview
+
+    def render_preview(self, frame: np.ndarray, homography: np.ndarray) -> bytes:
+        """Warp, normalize, overlay and JPEG-encode a preview of ``frame``."""
+        size = self.preview_size
+        context = get_processing_context()
+        warped = self._warp_maps.warp(frame, homography, (size, size),
+                                      context.buffer("preview_warp", (size, size, 3)))
+        preview = enhance_color_image(warped, out=context.buffer("preview", (size, size, 3)))
+        if self.ghost_svg:
+            blend_overlay(preview, self._ghost(), alpha=0.3, out=preview)
+
+        return encode_preview(preview, self.preview_options)
+
+    def _ghost(self) -> np.ndarray:
+        """Session's overlay, rendered on first use."""
+        if self._overlay is None:
+            assert self.ghost_svg is not None
+            rendered = render_svg_cached(self.ghost_svg, (self.preview_size, self.preview_size))
+            self._overlay = cv2.cvtColor(rendered, cv2.COLOR_BGRA2BGR)
+        return self._overlay
+
+    def _update_stability(self, result: TrackingResult, frame_shape: Tuple[int, ...]) -> bool:
+        """Track how long the quad has stayed still; True once it counts as stable."""
+        if result.quad is None:
+            self._last_quad = None
+            self._still_frames = 0
+            self._stable_sent = False
+            return False
+
+        tolerance = self.stable_tolerance * float(np.hypot(frame_shape[0], frame_shape[1]))
+        if self._last_quad is not None and np.abs(result.quad - self._last_quad).max() <= tolerance:
+            self._still_frames += 1
+        else:
+            self._still_frames = 0
+            self._stable_sent = False
+        self._last_quad = result.quad
+        return self._still_frames >= self.stable_frames
@@ -1,15 +1,28 @@
 """SVG rendering and overlay blending utilities."""
 
-import cairosvg
+import sys
+
 import cv2
 import numpy as np
-from io import BytesIO
-from typing import Tuple, Optional
+from cairosvg.parser import Tree
+from cairosvg.surface import PNGSurface
+from typing import Any, Tuple, Optional, Union
+
+from .cache import LRUCache, OverlayCache, is_immutable
+from .context import get_processing_context
+
+
+# Shared cache of rendered overlays (see configure_overlay_cache)
+_overlay_cache = OverlayCache()
 
 
 def render_svg_to_png(svg_path: str, size_px: Tuple[int, int]) -> np.ndarray:
     """Render SVG file to PNG array at specified size.
     
+    Despite the name, no PNG is produced: cairosvg draws into a cairo image
+    surface whose buffer is converted straight to BGRA, which is what
+    decoding cairosvg's PNG output used to return.
+    
     Args:
         svg_path: Path to SVG file
         size_px: Output size as (width, height) in pixels
@@ -22,27 +35,18 @@ def render_svg_to_png(svg_path: str, size_px: Tuple[int, int]) -> np.ndarray:
         ValueError: If rendering fails
     """
     try:
-        # Render SVG to PNG bytes
-        png_bytes = cairosvg.svg2png(
-            url=svg_path,
-            output_width=size_px[0],
-            output_height=size_px[1]
-        )
-        
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(png_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
-        
-        if img is None:
-            raise ValueError("Failed to decode rendered PNG")
+        # Draw into an in-memory ARGB32 surface (output=None: nothing is written)
+        tree = Tree(url=svg_path)
+        surface = PNGSurface(tree, None, 96, output_width=size_px[0],
+                             output_height=size_px[1])
+        surface.cairo.flush()
         
-        # Ensure BGRA format
-        if img.shape[2] == 3:
-            # Add alpha channel if missing
-            alpha = np.ones((img.shape[0], img.shape[1], 1), dtype=np.uint8) * 255
-            img = np.concatenate([img, alpha], axis=2)
-        
-        return img
+        return argb32_to_bgra(
+            surface.cairo.get_data(),
+            surface.cairo.get_width(),
+            surface.cairo.get_height(),
+            surface.cairo.get_stride()
+        )
         
     except FileNotFoundError:
         raise FileNotFoundError(f"SVG file not found: {svg_path}")
@@ -50,17 +54,195 @@ def render_svg_to_png(svg_path: str, size_px: Tuple[int, int]) -> np.ndarray:
         raise ValueError(f"Failed to render SVG: {str(e)}")
 
 
-def blend_overlay(base_bgr: np.ndarray, overlay_bgr: np.ndarray, 
-                 alpha: float = 0.3) -> np.ndarray:
+def argb32_to_bgra(data: Any, width: int, height: int, stride: int) -> np.ndarray:
+    """Convert a cairo ARGB32 buffer to straight-alpha BGRA.
+    
+    Cairo stores native-endian 32-bit words with premultiplied alpha. Colour
+    is un-premultiplied with the same integer rounding cairo's PNG writer
+    uses, ``(c * 255 + a / 2) / a``, so the result matches decoding the PNG
+    exactly. Only partially transparent pixels need the division.
+    
+    Args:
+        data: Surface buffer (anything supporting the buffer protocol)
+        width: Surface width in pixels
+        height: Surface height in pixels
+        stride: Bytes per row in ``data``
+        
+    Returns:
+        New height×width×4 uint8 BGRA array
+    """
+    rows = np.frombuffer(data, dtype=np.uint8, count=height * stride).reshape(height, stride)
+    pixels = rows[:, :width * 4].reshape(height, width, 4)
+    if sys.byteorder == "little":
+        bgra = pixels.copy()  # Bytes are already B, G, R, A
+    else:
+        bgra = pixels[:, :, ::-1].copy()  # A, R, G, B
+    
+    alpha = bgra[:, :, 3]
+    partial = (alpha > 0) & (alpha < 255)
+    if partial.any():
+        a = alpha[partial].astype(np.uint16)[:, np.newaxis]
+        colour = bgra[:, :, :3][partial].astype(np.uint16)
+        bgra[:, :, :3][partial] = ((colour * 255 + a // 2) // a).astype(np.uint8)
+    
+    return bgra
+
+
+def render_svg_cached(svg_path: str, size_px: Tuple[int, int]) -> np.ndarray:
+    """Render SVG file through the shared overlay cache.
+    
+    Args:
+        svg_path: Path to SVG file
+        size_px: Output size as (width, height) in pixels
+        
+    Returns:
+        Read-only BGRA numpy array of rendered SVG
+        
+    Raises:
+        FileNotFoundError: If SVG file not found
+        ValueError: If rendering fails
+    """
+    return _overlay_cache.get_or_render(svg_path, size_px, render_svg_to_png)
+
+
+def configure_overlay_cache(max_bytes: int = 256 * 1024 * 1024,
+                            disk_dir: Optional[str] = None,
+                            key_by_content: bool = False) -> OverlayCache:
+    """Replace the shared overlay cache.
+    
+    Args:
+        max_bytes: Memory tier budget in bytes
+        disk_dir: Optional directory of raw .npy renders shared across processes
+        key_by_content: Key on SVG content hash instead of path
+        
+    Returns:
+        The new shared cache
+    """
+    global _overlay_cache
+    _overlay_cache = OverlayCache(max_bytes=max_bytes, disk_dir=disk_dir,
+                                  key_by_content=key_by_content)
+    return _overlay_cache
+
+
+def get_overlay_cache() -> OverlayCache:
+    """Return the shared overlay cache (e.g. to read its hit/miss counters)."""
+    return _overlay_cache
+
+
+# Fixed-point blend weights are in 1/256ths, so products fit in uint16
+_BLEND_SHIFT = 8
+_BLEND_ONE = 1 << _BLEND_SHIFT
+
+# Prepared forms of reused read-only overlays (see prepare_overlay). Entries
+# pin their source array, so it counts towards the budget too.
+_prepared_cache = LRUCache(64 * 1024 * 1024,
+                           sizeof=lambda entry: entry[0].nbytes + entry[1].nbytes)
+
+
+class PreparedOverlay:
+    """BGRA overlay premultiplied by its alpha for repeated fixed-point blends.
+    
+    Blending a prepared overlay onto a base costs one multiply-add per
+    channel, with weights in 1/256ths:
+    
+        out = (base * inv_weight + premultiplied) >> 8
+    
+    Attributes:
+        alpha: Overall overlay transparency the weights were built with
+        inv_weight: H×W×1 uint16 weight of the base (256 - overlay weight)
+        premultiplied: H×W×3 uint16 overlay × weight, plus the rounding bias
+    """
+    
+    def __init__(self, overlay_bgra: np.ndarray, alpha: float = 0.3) -> None:
+        """Premultiply ``overlay_bgra``.
+        
+        Args:
+            overlay_bgra: Overlay image in BGRA format
+            alpha: Overlay transparency (0=invisible, 1=opaque)
+            
+        Raises:
+            ValueError: If the overlay is not BGRA or alpha is out of range
+        """
+        if overlay_bgra.ndim != 3 or overlay_bgra.shape[2] != 4:
+            raise ValueError(f"Expected a BGRA overlay, got shape {overlay_bgra.shape}")
+        if alpha < 0 or alpha > 1:
+            raise ValueError(f"Alpha must be in range [0, 1], got {alpha}")
+        
+        self.alpha = alpha
+        # Per-pixel overlay weight: round(alpha * a / 255 * 256), computed once
+        weight = np.rint(overlay_bgra[:, :, 3] * np.float32(alpha * _BLEND_ONE / 255.0))
+        weight16 = weight.astype(np.uint16)[:, :, np.newaxis]
+        
+        self.inv_weight = _BLEND_ONE - weight16
+        self.premultiplied = overlay_bgra[:, :, :3] * weight16
+        self.premultiplied += _BLEND_ONE // 2
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the source overlay."""
+        return self.premultiplied.shape[:2] + (4,)
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the prepared weights."""
+        return int(self.inv_weight.nbytes + self.premultiplied.nbytes)
+    
+    def region(self, x: int, y: int, width: int, height: int) -> "PreparedOverlay":
+        """Prepared weights of a rectangle of the overlay (views, no copy)."""
+        region = PreparedOverlay.__new__(PreparedOverlay)
+        region.alpha = self.alpha
+        region.inv_weight = self.inv_weight[y:y + height, x:x + width]
+        region.premultiplied = self.premultiplied[y:y + height, x:x + width]
+        return region
+
+
+def prepare_overlay(overlay_bgra: np.ndarray, alpha: float = 0.3) -> PreparedOverlay:
+    """Premultiply a BGRA overlay, reusing earlier work for immutable overlays.
+    
+    Immutable arrays (cached SVG renders, tutorial bundle views; see
+    ``is_immutable``) cannot change, so their prepared form is cached per
+    memory region and alpha: fresh views of the same pixels share one entry.
+    
+    Args:
+        overlay_bgra: Overlay image in BGRA format
+        alpha: Overlay transparency (0=invisible, 1=opaque)
+        
+    Returns:
+        PreparedOverlay for ``blend_overlay``
+    """
+    if not is_immutable(overlay_bgra):
+        return PreparedOverlay(overlay_bgra, alpha)
+    
+    # Cached entries hold a reference to their source, which keeps its memory
+    # (and so the address in the key) from being reused by another array
+    key = (overlay_bgra.__array_interface__["data"][0], overlay_bgra.shape,
+           overlay_bgra.strides, overlay_bgra.dtype.str, alpha)
+    cached = _prepared_cache.get(key)
+    if cached is not None:
+        return cached[1]
+    prepared = PreparedOverlay(overlay_bgra, alpha)
+    _prepared_cache.put(key, (overlay_bgra, prepared))
+    return prepared
+
+
+def blend_overlay(base_bgr: np.ndarray, overlay_bgr: Union[np.ndarray, PreparedOverlay],
+                  alpha: float = 0.3, out: Optional[np.ndarray] = None) -> np.ndarray:
     """Blend overlay image onto base with specified transparency.
     
+    A BGR overlay has uniform alpha and is blended with ``cv2.addWeighted``.
+    A BGRA overlay is premultiplied (see ``prepare_overlay``) and blended in
+    8-bit fixed point. Results are within ±1 of a float blend.
+    
     Args:
         base_bgr: Base image in BGR format
-        overlay_bgr: Overlay image in BGR or BGRA format
+        overlay_bgr: Overlay image in BGR or BGRA format, or a PreparedOverlay
+            (which carries its own alpha)
         alpha: Overlay transparency (0=invisible, 1=opaque)
+        out: Optional uint8 array shaped like ``base_bgr`` to write into;
+            may be ``base_bgr`` itself to blend in place
         
     Returns:
-        Blended BGR image
+        Blended BGR image (``out`` if given)
         
     Raises:
         ValueError: If image dimensions don't match
@@ -71,51 +253,66 @@ def blend_overlay(base_bgr: np.ndarray, overlay_bgr: np.ndarray,
     if alpha < 0 or alpha > 1:
         raise ValueError(f"Alpha must be in range [0, 1], got {alpha}")
     
-    # Handle BGRA overlay (extract alpha channel)
-    if overlay_bgr.shape[2] == 4:
-        overlay_alpha = overlay_bgr[:, :, 3] / 255.0
-        overlay_bgr = overlay_bgr[:, :, :3]
-        # Combine provided alpha with image alpha
-        alpha = alpha * overlay_alpha[:, :, np.newaxis]
-    
-    # Ensure float32 for blending
-    base_float = base_bgr.astype(np.float32)
-    overlay_float = overlay_bgr.astype(np.float32)
+    if out is None:
+        out = np.empty_like(base_bgr)
+    elif out.shape != base_bgr.shape or out.dtype != np.uint8:
+        raise ValueError(f"out must be uint8 with shape {base_bgr.shape}, "
+                         f"got {out.dtype} {out.shape}")
     
-    # Alpha blend
-    if isinstance(alpha, float):
-        blended = (1 - alpha) * base_float + alpha * overlay_float
-    else:
-        # Per-pixel alpha
-        blended = (1 - alpha) * base_float + alpha * overlay_float
+    if isinstance(overlay_bgr, np.ndarray) and overlay_bgr.shape[2] == 3:
+        # Uniform alpha
+        return cv2.addWeighted(base_bgr, 1 - alpha, overlay_bgr, alpha, 0, dst=out)
     
-    return np.clip(blended, 0, 255).astype(np.uint8)
+    # Per-pixel alpha from the overlay's alpha channel
+    prepared = overlay_bgr if isinstance(overlay_bgr, PreparedOverlay) \
+        else prepare_overlay(overlay_bgr, alpha)
+    acc = get_processing_context().buffer("blend_acc", base_bgr.shape, np.uint16)
+    np.multiply(base_bgr, prepared.inv_weight, out=acc)
+    acc += prepared.premultiplied
+    acc >>= _BLEND_SHIFT
+    np.copyto(out, acc, casting="unsafe")
+    return out
 
 
 def create_ghost_overlay(base_bgr: np.ndarray, svg_path: Optional[str] = None,
-                        alpha: float = 0.3) -> np.ndarray:
+                         alpha: float = 0.3,
+                         overlay: Optional[np.ndarray] = None,
+                         out: Optional[np.ndarray] = None) -> np.ndarray:
     """Create ghost overlay effect for guided capture.
     
     Args:
         base_bgr: Base captured image
         svg_path: Optional SVG reference path
         alpha: Ghost transparency
+        overlay: Optional pre-rendered BGRA overlay (e.g. from a tutorial
+            bundle) used instead of ``svg_path``; its alpha channel is honoured
+        out: Optional array shaped like ``base_bgr`` to write the result into
         
     Returns:
         Image with ghost overlay applied
     """
+    if overlay is not None:
+        h, w = base_bgr.shape[:2]
+        if overlay.shape[:2] != (h, w):
+            overlay = cv2.resize(overlay, (w, h), interpolation=cv2.INTER_LINEAR)
+        return blend_overlay(base_bgr, overlay, alpha, out=out)
+    
     if svg_path is None:
-        return base_bgr.copy()
+        if out is None:
+            return base_bgr.copy()
+        np.copyto(out, base_bgr)
+        return out
     
-    # Render SVG at base image size
+    # Render SVG at base image size (cached across calls)
     h, w = base_bgr.shape[:2]
-    svg_rendered = render_svg_to_png(svg_path, (w, h))
+    svg_rendered = render_svg_cached(svg_path, (w, h))
     
     # Convert BGRA to BGR if needed
     if svg_rendered.shape[2] == 4:
-        svg_bgr = cv2.cvtColor(svg_rendered, cv2.COLOR_BGRA2BGR)
+        svg_bgr = cv2.cvtColor(svg_rendered, cv2.COLOR_BGRA2BGR,
+                               get_processing_context().buffer("ghost_bgr", base_bgr.shape))
     else:
         svg_bgr = svg_rendered
     
     # Apply blend
-    return blend_overlay(base_bgr, svg_bgr, alpha)
\ No newline at end of file
+    return blend_overlay(base_bgr, svg_bgr, alpha, out=out)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Tests for batch capture."""
+
+import pytest
+import numpy as np
+import cv2
+from ..batch import run_capture_batch
+from ..executor import CaptureExecutor
+from ..models import CaptureResult
+from .test_context import paper_photo
+
+
+@pytest.fixture
+def images():
+    """A decoded photo, the same photo encoded, and an undecodable upload."""
+    img = paper_photo()
+    _, encoded = cv2.imencode(".jpg", img)
+    return [img, encoded.tobytes(), b"not an image"]
+
+
+class TestCaptureBatch:
+    """Test parallel batch capture with per-item errors."""
+    
+    def test_mixed_batch(self, images):
+        items = sorted(run_capture_batch(images, workers=2), key=lambda item: item.index)
+        
+        assert [item.index for item in items] == [0, 1, 2]
+        assert items[0].ok and isinstance(items[0].result, CaptureResult)
+        assert items[1].ok
+        assert not items[2].ok
+        assert items[2].error == "Failed to decode image"
+    
+    def test_pixel_limit_applies_to_encoded_images(self, images):
+        items = list(run_capture_batch(images[1:2], workers=1, max_pixels=1000))
+        
+        assert not items[0].ok
+        assert items[0].reason == "too_large"
+    
+    def test_shared_overlay_and_executor(self, images):
+        overlay = np.zeros((1080, 1080, 3), dtype=np.uint8)
+        executor = CaptureExecutor(backend="thread", workers=2, max_queue=0)
+        try:
+            items = list(run_capture_batch(images[:2] * 3, ghost_overlay=overlay,
+                                           outputs=("preview",), executor=executor))
+        finally:
+            executor.shutdown()
+        
+        assert sorted(item.index for item in items) == list(range(6))
+        assert all(item.ok for item in items)
+        # Decoded inputs (even indices) are identical, so are their previews
+        assert len({item.result.preview_png for item in items if item.index % 2 == 0}) == 1
+    
+    def test_missing_svg_fails_before_processing(self, images):
+        with pytest.raises(FileNotFoundError):
+            run_capture_batch(images, ghost_svg="/nonexistent/step.svg")
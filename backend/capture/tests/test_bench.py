@@ -0,0 +1,58 @@
+"""Tests for the benchmark harness."""
+
+import json
+
+import pytest
+import numpy as np
+from ..bench import compare, load_inputs, main, run_benchmarks, synthetic_photo
+from ..geometry import detect_paper_quad
+
+
+class TestBench:
+    """Test inputs, reports and baseline comparison."""
+    
+    def test_synthetic_photo_is_reproducible(self):
+        img = synthetic_photo(640, 480, seed=3)
+        
+        np.testing.assert_array_equal(img, synthetic_photo(640, 480, seed=3))
+        assert detect_paper_quad(img) is not None
+    
+    def test_report(self):
+        inputs = load_inputs(dirs=(), sizes=[(640, 480)])
+        report = run_benchmarks(inputs, cases=["detect", "warp"], repeats=2, warmup=0)
+        
+        assert set(report["cases"]) == {"detect", "detect.edges", "detect.threshold",
+                                        "detect.color", "detect.morphology", "warp"}
+        warp = report["cases"]["warp"]
+        assert warp["samples"] == 2 and warp["failures"] == 0
+        assert 0 < warp["p50_ms"] <= warp["p95_ms"] <= warp["p99_ms"]
+        assert list(warp["input_p50_ms"]) == ["synthetic-640x480"]
+        json.dumps(report)
+    
+    def test_unknown_case(self):
+        with pytest.raises(ValueError):
+            run_benchmarks([], cases=["nonexistent"])
+    
+    def test_compare_flags_regressions(self):
+        def case(p50, failures=0):
+            return {"p50_ms": p50, "p95_ms": p50, "failures": failures}
+        baseline = {"cases": {"warp": case(10.0), "detect": case(5.0), "encode.png": case(1.0)}}
+        report = {"cases": {"warp": case(12.0), "detect": case(7.0), "encode.png": case(1.0, 1),
+                            "lighting": case(99.0)}}
+        
+        regressions = compare(report, baseline, tolerance=0.25)
+        
+        assert {(r.case, r.metric) for r in regressions} == {
+            ("detect", "p50_ms"), ("detect", "p95_ms"), ("encode.png", "failures")}
+    
+    def test_cli_exit_code(self, tmp_path):
+        out = tmp_path / "bench.json"
+        args = ["--no-samples", "--sizes", "320x240", "--cases", "warp", "--repeats", "1",
+                "--out", str(out)]
+        
+        assert main(args) == 0
+        baseline = json.loads(out.read_text())
+        baseline["cases"]["warp"]["p50_ms"] = 1e-6
+        baseline["cases"]["warp"]["p95_ms"] = 1e-6
+        (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+        assert main(args + ["--baseline", str(tmp_path / "baseline.json")]) == 1
@@ -0,0 +1,84 @@
+"""Tests for tutorial asset bundles."""
+
+import pytest
+import numpy as np
+import cv2
+from ..bundles import (
+    TutorialBundle,
+    build_bundles,
+    group_tutorial_images,
+    load_bundles,
+    prepare_step_assets,
+)
+
+
+@pytest.fixture
+def reference_dir(tmp_path):
+    """Directory with two tiny tutorials named like backend/data/reference_stages."""
+    src = tmp_path / "reference_stages"
+    src.mkdir()
+    for name in ["bird-1", "bird-2", "how-to-draw-eyes-step-2", "how-to-draw-eyes-step-3"]:
+        img = np.full((120, 160, 3), 255, dtype=np.uint8)
+        cv2.circle(img, (80, 60), 30, (0, 0, 0), 2)
+        cv2.imwrite(str(src / f"{name}.jpg"), img)
+    (src / "notes.txt").write_text("not an image")
+    return src
+
+
+class TestBundles:
+    """Test grouping, building and memory-mapped loading."""
+    
+    def test_group_tutorial_images(self, reference_dir):
+        groups = group_tutorial_images(str(reference_dir))
+        
+        assert sorted(groups) == ["bird", "how-to-draw-eyes"]
+        assert [step for step, _ in groups["how-to-draw-eyes"]] == [2, 3]
+    
+    def test_prepare_step_assets(self):
+        img = np.full((100, 200, 3), 255, dtype=np.uint8)
+        cv2.line(img, (20, 50), (180, 50), (0, 0, 0), 3)
+        assets = prepare_step_assets(img, size=108)
+        
+        assert assets["overlay"].shape == (108, 108, 4)
+        np.testing.assert_array_equal(assets["overlay"][:, :, 3], assets["alpha"])
+        # Blank paper is transparent, ink is opaque
+        assert assets["alpha"][5, 5] == 0
+        assert assets["alpha"][54, 54] > 200
+        assert assets["edges"].any()
+    
+    def test_build_and_load(self, reference_dir, tmp_path):
+        out_dir = tmp_path / "bundles"
+        paths = build_bundles(str(reference_dir), str(out_dir), size=108)
+        assert len(paths) == 2
+        
+        bundles = load_bundles(str(out_dir))
+        bird = bundles["bird"]
+        assert bird.steps == [1, 2]
+        
+        step = bird.step(2)
+        assert step.overlay.shape == (108, 108, 4)
+        assert step.edges.shape == step.values.shape == (108, 108)
+        assert not step.overlay.flags.writeable
+        assert isinstance(step.overlay.base, np.memmap)
+        assert step.reference.tobytes() == (reference_dir / "bird-2.jpg").read_bytes()
+        
+        with pytest.raises(KeyError):
+            bird.step(7)
+    
+    def test_rejects_non_bundle(self, tmp_path):
+        path = tmp_path / "bogus.msb"
+        path.write_bytes(b"x" * 64)
+        with pytest.raises(ValueError):
+            TutorialBundle(str(path))
+
+    def test_capture_with_bundle_overlay(self, reference_dir, tmp_path):
+        from ..pipeline import run_capture
+        
+        build_bundles(str(reference_dir), str(tmp_path), size=108)
+        overlay = load_bundles(str(tmp_path))["bird"].step(1).overlay
+        
+        img = np.full((800, 600, 3), 60, dtype=np.uint8)
+        cv2.rectangle(img, (100, 100), (500, 700), (240, 240, 240), -1)
+        result = run_capture(img, ghost_overlay=overlay)
+        
+        assert result.preview_png[:8] == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,187 @@
+"""Tests for the LRU, overlay and response caches."""
+
+import os
+import time
+import pytest
+import numpy as np
+from ..cache import CachedResponse, LRUCache, OverlayCache, ResponseCache, is_immutable
+
+
+def fake_render(calls):
+    """Renderer that records calls and returns a BGRA array of the requested size."""
+    def render(svg_path, size_px):
+        calls.append((svg_path, size_px))
+        return np.full((size_px[1], size_px[0], 4), len(calls), dtype=np.uint8)
+    return render
+
+
+@pytest.fixture
+def svg_file(tmp_path):
+    path = tmp_path / "step.svg"
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
+    return path
+
+
+class TestLRUCache:
+    """Test size-bounded LRU behaviour."""
+    
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_bytes=200)
+        cache.put("a", np.zeros(100, dtype=np.uint8))
+        cache.put("b", np.zeros(100, dtype=np.uint8))
+        cache.get("a")
+        cache.put("c", np.zeros(100, dtype=np.uint8))
+        
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.current_bytes == 200
+    
+    def test_oversized_value_not_cached(self):
+        cache = LRUCache(max_bytes=10)
+        cache.put("big", np.zeros(100, dtype=np.uint8))
+        assert len(cache) == 0
+    
+    def test_discard(self):
+        cache = LRUCache(max_bytes=200)
+        cache.put("a", np.zeros(100, dtype=np.uint8))
+        cache.discard("a")
+        cache.discard("missing")
+        
+        assert len(cache) == 0 and cache.current_bytes == 0
+
+
+class TestOverlayCache:
+    """Test overlay keying and the disk tier."""
+    
+    def test_hit_returns_same_read_only_array(self, svg_file):
+        cache, calls = OverlayCache(), []
+        first = cache.get_or_render(str(svg_file), (20, 10), fake_render(calls))
+        second = cache.get_or_render(str(svg_file), (20, 10), fake_render(calls))
+        
+        assert first is second
+        assert first.shape == (10, 20, 4)
+        assert not first.flags.writeable
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+    
+    def test_size_and_mtime_are_part_of_key(self, svg_file):
+        cache, calls = OverlayCache(), []
+        cache.get_or_render(str(svg_file), (20, 10), fake_render(calls))
+        cache.get_or_render(str(svg_file), (10, 10), fake_render(calls))
+        
+        st = os.stat(svg_file)
+        os.utime(svg_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        cache.get_or_render(str(svg_file), (20, 10), fake_render(calls))
+        
+        assert len(calls) == 3
+    
+    def test_disk_tier_shared_between_caches(self, svg_file, tmp_path):
+        disk_dir = str(tmp_path / "overlays")
+        calls = []
+        first = OverlayCache(disk_dir=disk_dir).get_or_render(
+            str(svg_file), (20, 10), fake_render(calls))
+        
+        other = OverlayCache(disk_dir=disk_dir)
+        second = other.get_or_render(str(svg_file), (20, 10), fake_render(calls))
+        
+        assert len(calls) == 1
+        np.testing.assert_array_equal(first, second)
+        assert other.stats()["disk_hits"] == 1
+    
+    def test_missing_svg(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            OverlayCache().get_or_render(str(tmp_path / "nope.svg"), (10, 10),
+                                         fake_render([]))
+
+
+def test_is_immutable(tmp_path):
+    owned = np.zeros(8, dtype=np.uint8)
+    assert not is_immutable(owned)
+    owned.flags.writeable = False
+    assert is_immutable(owned) and is_immutable(owned[2:])
+    
+    view = np.zeros(8, dtype=np.uint8)[:]
+    view.flags.writeable = False
+    assert not is_immutable(view)
+    
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(8))
+    assert is_immutable(np.memmap(path, dtype=np.uint8, mode="r")[2:])
+    assert not is_immutable(np.frombuffer(bytearray(8), dtype=np.uint8))
+
+
+def response(body=b"preview", score=0.5):
+    return CachedResponse(body, {"alignment_score": score, "quality_valid": True})
+
+
+class TestResponseCache:
+    """Test response keying, expiry and the disk tier."""
+    
+    def test_key_covers_content_and_params(self):
+        key = ResponseCache.key(b"photo", {"step_svg": "a.svg", "preview": ["png", 9]})
+        
+        assert key == ResponseCache.key(b"photo", {"preview": ["png", 9], "step_svg": "a.svg"})
+        assert key != ResponseCache.key(b"photo!", {"step_svg": "a.svg", "preview": ["png", 9]})
+        assert key != ResponseCache.key(b"photo", {"step_svg": "b.svg", "preview": ["png", 9]})
+    
+    def test_hit_and_miss(self):
+        cache = ResponseCache()
+        assert cache.get("k") is None
+        cache.put("k", response())
+        
+        assert cache.get("k").body == b"preview"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    
+    def test_ttl_expires_entries(self, tmp_path):
+        cache = ResponseCache(disk_dir=str(tmp_path), ttl=60)
+        cache.put("k", CachedResponse(b"old", {}, created=time.time() - 120))
+        
+        assert cache.get("k") is None
+        assert cache.stats()["expired"] == 2
+        assert cache.stats()["disk_entries"] == 0
+        assert os.listdir(tmp_path) == []
+    
+    def test_disk_tier_shared_between_caches(self, tmp_path):
+        ResponseCache(disk_dir=str(tmp_path)).put("k", response(b"\x89PNG data", 0.75))
+        
+        other = ResponseCache(disk_dir=str(tmp_path))
+        entry = other.get("k")
+        
+        assert entry.body == b"\x89PNG data"
+        assert entry.metadata == {"alignment_score": 0.75, "quality_valid": True}
+        assert other.stats()["disk_hits"] == 1
+        assert other.stats()["disk_entries"] == 1
+        # Promoted to the memory tier
+        other.get("k")
+        assert other.stats()["hits"] == 1
+    
+    def test_disk_budget_evicts_oldest(self, tmp_path):
+        cache = ResponseCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=600)
+        for i in range(3):
+            cache.put(f"k{i}", CachedResponse(bytes(200), {}, created=time.time() + i))
+        
+        assert cache.get("k0") is None
+        assert cache.get("k2") is not None
+        stats = cache.stats()
+        assert stats["disk_evictions"] == 1
+        assert stats["disk_bytes"] <= 600
+        assert len(os.listdir(tmp_path)) == 2
+    
+    @pytest.mark.parametrize("data", [
+        b"\x00\x00",
+        b"\x00\x00\x00\x02{}body",
+        b"\x00\x00\x00\x02[]body",
+        b'\x00\x00\x00\x20{"metadata": 1, "created": null}body',
+    ])
+    def test_corrupt_disk_entry_is_a_miss(self, tmp_path, data):
+        (tmp_path / "k.resp").write_bytes(data)
+        
+        assert ResponseCache(disk_dir=str(tmp_path)).get("k") is None
+        assert os.listdir(tmp_path) == []
+    
+    @pytest.mark.parametrize("kwargs", [{"ttl": 0}, {"disk_max_bytes": -1}, {"max_bytes": -1}])
+    def test_invalid_limits(self, kwargs):
+        with pytest.raises(ValueError):
+            ResponseCache(**kwargs)
@@ -0,0 +1,62 @@
+"""Tests for per-thread processing contexts."""
+
+import threading
+import pytest
+import numpy as np
+import cv2
+from ..context import ProcessingContext, get_processing_context
+from ..pipeline import run_capture
+
+
+def paper_photo():
+    """Dim photo of a sheet of paper with a drawing on it."""
+    img = np.full((1200, 900, 3), 60, dtype=np.uint8)
+    cv2.rectangle(img, (150, 150), (750, 1050), (230, 230, 230), -1)
+    cv2.circle(img, (450, 600), 120, (20, 20, 20), 4)
+    return img
+
+
+class TestProcessingContext:
+    """Test CLAHE pooling, buffer reuse and thread isolation."""
+    
+    def test_clahe_instances_are_reused(self):
+        context = ProcessingContext()
+        
+        assert context.clahe("mild") is context.clahe("mild")
+        assert context.clahe("mild") is not context.clahe("strong")
+        assert context.clahe("strong").getClipLimit() == 3.0
+        with pytest.raises(ValueError):
+            context.clahe("extreme")
+    
+    def test_buffers_are_reused_until_shape_changes(self):
+        context = ProcessingContext()
+        
+        first = context.buffer("warp", (8, 8, 3))
+        assert context.buffer("warp", (8, 8, 3)) is first
+        assert context.buffer("warp", (8, 8, 3), np.uint16) is not first
+        assert context.stats()["allocations"] == 2
+        assert context.stats()["reuses"] == 1
+    
+    def test_context_is_per_thread(self):
+        contexts = []
+        thread = threading.Thread(target=lambda: contexts.append(get_processing_context()))
+        thread.start()
+        thread.join()
+        
+        assert get_processing_context() is get_processing_context()
+        assert contexts[0] is not get_processing_context()
+    
+    def test_steady_state_capture_allocates_no_buffers(self):
+        img = paper_photo()
+        overlay = np.zeros((1080, 1080, 4), dtype=np.uint8)
+        overlay[:, :, 3] = 128
+        overlay.flags.writeable = False
+        
+        first = run_capture(img, ghost_overlay=overlay)
+        allocations = get_processing_context().allocations
+        second = run_capture(img, ghost_overlay=overlay)
+        
+        assert get_processing_context().allocations == allocations
+        # Results are not backed by the reused buffers
+        assert not np.shares_memory(first.flat, second.flat)
+        np.testing.assert_array_equal(first.flat, second.flat)
@@ -0,0 +1,60 @@
+"""Tests for preview encoding."""
+
+import pytest
+import numpy as np
+import cv2
+from ..encoding import PreviewOptions, encode_preview
+from ..pipeline import run_capture
+from .test_context import paper_photo
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    return cv2.GaussianBlur(rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8), (0, 0), 2)
+
+
+class TestEncodePreview:
+    """Test codecs, options and downscaling."""
+    
+    @pytest.mark.parametrize("fmt,signature", [
+        ("png", b"\x89PNG"),
+        ("jpeg", b"\xff\xd8\xff"),
+        ("webp", b"RIFF"),
+    ])
+    def test_formats(self, image, fmt, signature):
+        options = PreviewOptions(format=fmt, png_level=1, quality=70)
+        data = encode_preview(image, options)
+        
+        assert data.startswith(signature)
+        decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == image.shape
+    
+    def test_png_is_lossless_at_any_level(self, image):
+        data = encode_preview(image, PreviewOptions(png_level=0))
+        decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        
+        np.testing.assert_array_equal(decoded, image)
+    
+    def test_max_size_downscales(self, image):
+        data = encode_preview(image, PreviewOptions(format="jpeg", max_size=80))
+        decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        
+        assert decoded.shape == (60, 80, 3)
+    
+    @pytest.mark.parametrize("kwargs", [
+        {"format": "gif"},
+        {"png_level": 10},
+        {"quality": 0},
+        {"max_size": 0},
+    ])
+    def test_invalid_options(self, kwargs):
+        with pytest.raises(ValueError):
+            PreviewOptions(**kwargs)
+    
+    def test_run_capture_preview_options(self):
+        result = run_capture(paper_photo(), preview=PreviewOptions(format="jpeg", max_size=540))
+        
+        assert result.preview_media_type == "image/jpeg"
+        decoded = cv2.imdecode(np.frombuffer(result.preview_png, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == (540, 540, 3)
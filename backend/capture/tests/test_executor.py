@@ -0,0 +1,149 @@
+"""Tests for the capture execution backends."""
+
+import threading
+import pytest
+import numpy as np
+import cv2
+from ..executor import CaptureExecutor, ExecutorBusyError
+from ..models import CaptureResult
+
+
+def mean_intensity(img, offset=0.0):
+    """Module-level job so it can be pickled for the process backend."""
+    return float(img.mean()) + offset
+
+
+def fail(img):
+    raise ValueError("bad image")
+
+
+@pytest.fixture
+def paper_image():
+    """Synthetic image with a white sheet on a gray background."""
+    img = np.ones((800, 600, 3), dtype=np.uint8) * 100
+    cv2.rectangle(img, (100, 120), (500, 680), (250, 250, 250), -1)
+    return img
+
+
+@pytest.fixture(params=["thread", "process"])
+def executor(request):
+    executor = CaptureExecutor(backend=request.param, workers=2)
+    yield executor
+    executor.shutdown()
+
+
+class TestCaptureExecutor:
+    """Test job execution, admission control and stats."""
+    
+    def test_runs_job(self, executor):
+        img = np.full((100, 100, 3), 7, dtype=np.uint8)
+        assert executor.submit(img, func=mean_intensity, offset=1.0).result(timeout=20) == 8.0
+    
+    def test_runs_capture(self, executor, paper_image):
+        result = executor.submit(paper_image).result(timeout=20)
+        assert isinstance(result, CaptureResult)
+    
+    def test_runs_lazy_capture(self, executor, paper_image):
+        result = executor.submit(paper_image, outputs=("preview",)).result(timeout=20)
+        
+        assert result.preview_png.startswith(b"\x89PNG")
+        if executor.backend == "process":
+            with pytest.raises(ValueError):
+                result.warped  # Not requested; the source image stayed with the worker
+    
+    def test_overlay_shared_once(self, paper_image):
+        executor = CaptureExecutor(backend="process", workers=2)
+        overlay = np.zeros((1080, 1080, 4), dtype=np.uint8)
+        overlay[500:580, :, 2:] = 255
+        overlay.flags.writeable = False
+        kwargs = {"quad": np.float32([[100, 120], [500, 120], [500, 680], [100, 680]]),
+                  "outputs": ("composite",)}
+        try:
+            # A writable overlay is pickled into the job as before
+            expected = executor.submit(paper_image, ghost_overlay=overlay.copy(),
+                                       **kwargs).result(timeout=20)
+            assert executor._shared == {}
+            
+            futures = [executor.submit(paper_image, ghost_overlay=overlay, **kwargs)
+                       for _ in range(3)]
+            results = [future.result(timeout=20) for future in futures]
+            
+            assert len(executor._shared) == 1
+            for result in results:
+                np.testing.assert_array_equal(result.composite, expected.composite)
+        finally:
+            executor.shutdown()
+        assert executor._shared == {}
+    
+    def test_job_errors_propagate(self, executor):
+        with pytest.raises(ValueError, match="bad image"):
+            executor.submit(np.zeros((4, 4, 3), dtype=np.uint8), func=fail).result(timeout=20)
+        
+        stats = executor.stats()
+        assert sum(w["errors"] for w in stats["per_worker"].values()) == 1
+        assert stats["in_flight"] == 0
+    
+    def test_admission_limit(self):
+        executor = CaptureExecutor(backend="thread", workers=1, max_queue=0)
+        release = threading.Event()
+        img = np.zeros((4, 4, 3), dtype=np.uint8)
+        try:
+            first = executor.submit(img, func=lambda img: release.wait(5))
+            with pytest.raises(ExecutorBusyError) as excinfo:
+                executor.submit(img, func=mean_intensity)
+            assert excinfo.value.retry_after >= 1
+            
+            release.set()
+            assert first.result(timeout=5)
+            assert executor.stats()["rejected"] == 1
+        finally:
+            release.set()
+            executor.shutdown()
+    
+    def test_cancelled_queued_job_does_not_run(self):
+        executor = CaptureExecutor(backend="thread", workers=1)
+        release = threading.Event()
+        ran = []
+        img = np.zeros((4, 4, 3), dtype=np.uint8)
+        try:
+            first = executor.submit(img, func=lambda img: release.wait(5))
+            second = executor.submit(img, func=lambda img: ran.append(img))
+            
+            assert second.cancel()
+            release.set()
+            assert first.result(timeout=5)
+            executor.shutdown()
+            
+            assert ran == []
+            assert second.cancelled()
+            stats = executor.stats()
+            assert sum(w["jobs"] for w in stats["per_worker"].values()) == 1
+            assert stats["in_flight"] == 0
+        finally:
+            release.set()
+            executor.shutdown()
+    
+    def test_cancel_while_running_is_ignored(self):
+        executor = CaptureExecutor(backend="thread", workers=1)
+        started, release = threading.Event(), threading.Event()
+        
+        def block(img):
+            started.set()
+            return release.wait(5)
+        
+        try:
+            future = executor.submit(np.zeros((4, 4, 3), dtype=np.uint8), func=block)
+            assert started.wait(5)
+            future.cancel()
+            release.set()
+            executor.shutdown()
+            
+            assert future.cancelled()
+            assert executor.stats()["in_flight"] == 0
+        finally:
+            release.set()
+            executor.shutdown()
+    
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            CaptureExecutor(backend="gpu")
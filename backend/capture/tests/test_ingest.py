@@ -0,0 +1,189 @@
+"""Tests for upload ingest and reduced-resolution decoding."""
+
+import asyncio
+import struct
+
+import pytest
+import numpy as np
+import cv2
+from ..ingest import (
+    UploadTooLargeError, apply_orientation, choose_reduction, decode_image,
+    orientation_transform, probe_image, read_upload, run_capture_encoded, ImageHeader
+)
+from .. import ingest
+from ..pipeline import LazyCaptureResult, run_capture
+from .test_context import paper_photo
+
+
+def encode(img, ext=".jpg"):
+    success, buf = cv2.imencode(ext, img)
+    assert success
+    return buf.tobytes()
+
+
+def with_orientation(jpeg, orientation):
+    """Insert an EXIF APP1 segment carrying ``orientation`` after the SOI."""
+    tiff = (b"MM\x00\x2a" + struct.pack(">I", 8) + struct.pack(">H", 1)
+            + struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0))
+    payload = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+
+@pytest.fixture
+def asymmetric():
+    img = np.zeros((48, 64, 3), dtype=np.uint8)
+    img[:16, :32] = (0, 0, 255)
+    img[32:, 40:] = (255, 0, 0)
+    return img
+
+
+class TestProbe:
+    """Test header parsing without decoding."""
+    
+    def test_jpeg_size(self, asymmetric):
+        header = probe_image(encode(asymmetric))
+        
+        assert (header.format, header.width, header.height,
+                header.orientation) == ("jpeg", 64, 48, 1)
+    
+    def test_png_size(self, asymmetric):
+        header = probe_image(encode(asymmetric, ".png"))
+        
+        assert (header.format, header.width, header.height) == ("png", 64, 48)
+    
+    def test_exif_orientation(self, asymmetric):
+        header = probe_image(with_orientation(encode(asymmetric), 6))
+        
+        assert header.orientation == 6
+        assert header.oriented_size == (48, 64)
+    
+    def test_unknown_and_truncated(self, asymmetric):
+        assert probe_image(b"GIF89a").format == "unknown"
+        with pytest.raises(ValueError):
+            probe_image(encode(asymmetric)[:10])
+
+
+class TestDecode:
+    """Test orientation, reduction and limits."""
+    
+    @pytest.mark.parametrize("orientation", range(1, 9))
+    def test_orientation_matches_opencv(self, asymmetric, orientation):
+        data = with_orientation(encode(asymmetric), orientation)
+        expected = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        
+        np.testing.assert_array_equal(decode_image(data), expected)
+    
+    @pytest.mark.parametrize("orientation", range(1, 9))
+    def test_orientation_transform_matches(self, asymmetric, orientation):
+        header = ImageHeader("jpeg", 64, 48, orientation)
+        warped = cv2.warpPerspective(asymmetric, orientation_transform(header),
+                                     header.oriented_size, flags=cv2.INTER_NEAREST)
+        
+        np.testing.assert_array_equal(warped, apply_orientation(asymmetric, orientation))
+    
+    def test_apply_orientation_identity(self, asymmetric):
+        assert apply_orientation(asymmetric, 1) is asymmetric
+    
+    def test_choose_reduction(self):
+        assert choose_reduction(ImageHeader("jpeg", 4032, 3024), 1080) == 2
+        assert choose_reduction(ImageHeader("jpeg", 4032, 3024), 360) == 8
+        assert choose_reduction(ImageHeader("jpeg", 1600, 1200), 1080) == 1
+        assert choose_reduction(ImageHeader("png", 4032, 3024), 360) == 1
+    
+    def test_reduced_decode(self):
+        data = encode(np.full((480, 640, 3), 128, dtype=np.uint8))
+        
+        assert decode_image(data, reduction=4).shape == (120, 160, 3)
+        # Non-JPEG formats ignore the reduction
+        png = encode(np.zeros((40, 40, 3), np.uint8), ".png")
+        assert decode_image(png, reduction=4).shape == (40, 40, 3)
+    
+    def test_pixel_limit(self, monkeypatch):
+        monkeypatch.setattr(ingest, "MAX_IMAGE_PIXELS", 100)
+        
+        with pytest.raises(UploadTooLargeError):
+            decode_image(encode(np.zeros((20, 20, 3), np.uint8)))
+    
+    def test_corrupt_body(self, asymmetric):
+        data = encode(asymmetric)
+        
+        with pytest.raises(ValueError):
+            decode_image(data[:len(data) // 3] + b"\x00" * 16, probe_image(data))
+
+
+class TestReadUpload:
+    """Test bounded chunked reads."""
+    
+    @staticmethod
+    def reader(data):
+        view = memoryview(data)
+        
+        async def read(size):
+            nonlocal view
+            chunk, view = view[:size], view[size:]
+            return bytes(chunk)
+        return read
+    
+    def test_reads_all_chunks(self):
+        data = bytes(range(256)) * 10
+        
+        read = read_upload(self.reader(data), max_bytes=len(data), chunk_size=100)
+        assert asyncio.run(read) == data
+    
+    def test_stops_at_limit(self):
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(read_upload(self.reader(b"x" * 1000), max_bytes=999, chunk_size=100))
+
+
+class TestRunCaptureEncoded:
+    """Test capture from encoded bytes."""
+    
+    def test_matches_full_decode(self):
+        data = encode(paper_photo())
+        expected = run_capture(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+        result = run_capture_encoded(data)
+        
+        np.testing.assert_allclose(result.warp_matrix, expected.warp_matrix, atol=1e-4)
+        assert result.alignment_score == pytest.approx(expected.alignment_score)
+    
+    def test_reduced_decode_reports_full_resolution_geometry(self):
+        photo = cv2.resize(paper_photo(), None, fx=4, fy=4, interpolation=cv2.INTER_NEAREST)
+        data = encode(photo)
+        expected = run_capture(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR),
+                               outputs=("quad",))
+        result = run_capture_encoded(data, outputs=("quad", "flat"))
+        
+        assert isinstance(result, LazyCaptureResult) and isinstance(expected, LazyCaptureResult)
+        assert result.flat.shape == (1080, 1080, 3)
+        np.testing.assert_allclose(result.quad, expected.quad, atol=8)
+        # Same quad scale as a full decode, so the matrices agree closely
+        np.testing.assert_allclose(result.warp_matrix, expected.warp_matrix, rtol=0.05, atol=0.05)
+    
+    def test_small_paper_is_warped_from_a_finer_decode(self, monkeypatch):
+        # Shorter side 2700px decodes at 1/2, where the paper's shorter side
+        # covers 900 of the 1080 output pixels
+        data = encode(cv2.resize(paper_photo(), None, fx=3, fy=3,
+                                 interpolation=cv2.INTER_NEAREST))
+        reductions = []
+        decode = ingest.decode_image
+        
+        def record(data, header=None, reduction=1, **kwargs):
+            reductions.append(reduction)
+            return decode(data, header, reduction, **kwargs)
+        
+        monkeypatch.setattr(ingest, "decode_image", record)
+        result = run_capture_encoded(data, outputs=("flat",))
+        
+        assert reductions == [2, 1]
+        assert result.flat.shape == (1080, 1080, 3)
+    
+    def test_rotated_photo_is_warped_without_rotating(self):
+        photo = cv2.resize(paper_photo(), None, fx=3, fy=3, interpolation=cv2.INTER_NEAREST)
+        # Stored sideways; orientation 6 rotates it back upright
+        data = with_orientation(encode(cv2.rotate(photo, cv2.ROTATE_90_COUNTERCLOCKWISE)), 6)
+        expected = run_capture(photo, outputs=("flat",))
+        result = run_capture_encoded(data, outputs=("flat",))
+        
+        assert result.alignment_score == pytest.approx(expected.alignment_score, rel=0.01)
+        np.testing.assert_allclose(result.warp_matrix, expected.warp_matrix, rtol=0.05, atol=0.05)
+        assert np.abs(result.flat.astype(int) - expected.flat).mean() < 4
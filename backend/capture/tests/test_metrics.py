@@ -0,0 +1,85 @@
+"""Tests for stage timings and metrics."""
+
+import pickle
+
+import pytest
+import numpy as np
+from ..ingest import DecodeError, UploadTooLargeError, run_capture_encoded
+from ..metrics import CaptureMetrics, Counter, Histogram, failure_reason
+from ..models import StageTimings
+from ..pipeline import PaperNotFoundError, run_capture
+from .test_context import paper_photo
+from .test_ingest import encode
+
+
+class TestStageTimings:
+    """Test stage accumulation and the Server-Timing header."""
+    
+    def test_stages_accumulate(self):
+        timings = StageTimings()
+        timings.add("warp", 0.002)
+        timings.add("warp", 0.003)
+        with timings.time("encode"):
+            pass
+        
+        assert timings.stages["warp"] == pytest.approx(0.005)
+        assert list(timings.stages) == ["warp", "encode"]
+        assert timings.server_timing().startswith("warp;dur=5.0, encode;dur=")
+    
+    def test_run_capture_records_stages(self):
+        result = run_capture(paper_photo(), preview=None)
+        
+        assert {"detect", "warp", "lighting", "encode"} <= set(result.timings.stages)
+        assert result.timings.strategies
+    
+    def test_encoded_capture_records_decode(self):
+        result = run_capture_encoded(encode(paper_photo()), outputs=("quad",))
+        
+        assert list(result.timings.stages) == ["decode", "detect"]
+    
+    def test_detection_failure_carries_timings(self):
+        with pytest.raises(PaperNotFoundError) as info:
+            run_capture(np.full((400, 400, 3), 128, dtype=np.uint8))
+        
+        error = pickle.loads(pickle.dumps(info.value))
+        assert str(error) == "Failed to detect paper in image"
+        assert "detect" in error.timings.stages
+
+
+class TestMetrics:
+    """Test histograms, counters and the text format."""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.5):
+            histogram.observe(value, "warp")
+        
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{stage="warp",le="0.01"} 1' in lines
+        assert 'latency_seconds_bucket{stage="warp",le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{stage="warp",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{stage="warp"} 3' in lines
+        assert histogram.snapshot()[("warp",)]["sum"] == pytest.approx(0.555)
+    
+    def test_labels_are_checked(self):
+        with pytest.raises(ValueError):
+            Counter("failures_total", "Failures.", ("reason",)).inc()
+    
+    def test_failure_reasons(self):
+        assert failure_reason(PaperNotFoundError()) == "no_paper"
+        assert failure_reason(DecodeError("bad")) == "decode"
+        assert failure_reason(UploadTooLargeError("big")) == "too_large"
+        assert failure_reason(ValueError("bad option")) == "invalid_input"
+        assert failure_reason(RuntimeError("boom")) == "error"
+    
+    def test_record(self):
+        metrics = CaptureMetrics()
+        timings = StageTimings(stages={"detect": 0.01}, strategies={"edges": 0.004},
+                               strategy_errors=["color"])
+        metrics.record(timings)
+        metrics.record_failure(PaperNotFoundError(timings=timings))
+        
+        text = metrics.render()
+        assert 'capture_stage_seconds_count{stage="detect"} 2' in text
+        assert 'capture_detect_strategy_errors_total{strategy="color"} 2' in text
+        assert 'capture_failures_total{reason="no_paper"} 1' in text
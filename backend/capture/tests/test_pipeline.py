@@ -5,15 +5,57 @@ import numpy as np
 import cv2
 import os
 from pathlib import Path
-from ..pipeline import run_capture, validate_capture_quality
-from ..geometry import detect_paper_quad, warp_perspective
-from ..lighting import normalize_lighting
+from ..pipeline import LazyCaptureResult, run_capture, validate_capture_quality
+from ..geometry import (
+    detect_paper_quad, warp_perspective, DetectionContext, WarpMapCache,
+    paper_homography, scale_transform, transform_quad
+)
+from ..lighting import normalize_lighting, _histogram, _lut_mean, _lut_percentiles
 from ..models import CaptureResult
 
 
 # Test fixtures directory
 FIXTURE_DIR = Path(__file__).parent / "data"
 
+# Photos shipped with the app, and the quads full-resolution detection found
+# in them (it found none in how-to-draw-eyes-step-1.jpg and stage2.JPG)
+USER_SAMPLES_DIR = Path(__file__).parents[2] / "data" / "user_samples"
+USER_SAMPLE_BASELINE = {
+    "dots.JPG": [[303, 0], [4031, 115], [4031, 3023], [298, 3023]],
+    "stage1.JPG": [[0, 0], [2737, 0], [2737, 1654], [0, 977]],
+    "stage3.JPG": [[561, 366], [2178, 581], [1976, 1110], [1275, 1304]],
+    "stage4.JPG": [[569, 342], [2156, 525], [2040, 1002], [1180, 1150]],
+    "stage5.JPG": [[490, 370], [2241, 542], [2034, 1095], [1121, 1349]],
+}
+
+# Quads detected in every shipped photo with all strategies run. Strategies run
+# on a downscaled pyramid and the most confident quad wins, so these differ from
+# the full-resolution, largest-quad picks above on stage3.JPG, stage5.JPG,
+# bird-1.jpg and bird-4.jpg, and how-to-draw-eyes-step-4.jpg is no longer a miss
+SAMPLE_DETECTIONS = {
+    "bird-1.jpg": [[475, 73], [609, 282], [425, 442], [175, 415]],
+    "bird-2.jpg": None,
+    "bird-3.jpg": [[459, 85], [622, 115], [459, 411], [219, 349]],
+    "bird-4.jpg": [[153, 383], [465, 86], [621, 118], [422, 431]],
+    "bird-5.jpg": [[465, 86], [621, 118], [579, 525], [70, 498]],
+    "bird-6.jpg": [[464, 86], [621, 117], [582, 525], [70, 498]],
+    "dots.JPG": [[306, 0], [4024, 113], [4024, 3016], [298, 3016]],
+    "how-to-draw-eyes-step-1.jpg": None,
+    "how-to-draw-eyes-step-2.jpg": None,
+    "how-to-draw-eyes-step-3.jpg": None,
+    "how-to-draw-eyes-step-4.jpg": [[86, 129], [172, 79], [315, 154], [172, 203]],
+    "how-to-draw-eyes-step-5.jpg": [[54, 55], [279, 83], [310, 152], [131, 206]],
+    "stage1.JPG": [[0, 0], [2733, 0], [2733, 1648], [0, 942]],
+    "stage2.JPG": None,
+    "stage3.JPG": [[591, 368], [2139, 569], [1972, 891], [764, 928]],
+    "stage4.JPG": [[583, 346], [2151, 527], [2034, 999], [1171, 1132]],
+    "stage5.JPG": [[726, 924], [1465, 590], [2074, 1044], [1161, 1347]],
+}
+
+# Samples showing a whole sheet; the others are close-ups of a drawing, where
+# any quad found is a region of the drawing and its corners are arbitrary
+CLEAR_USER_SAMPLES = {"dots.JPG", "stage1.JPG"}
+
 
 @pytest.fixture
 def sample_image():
@@ -147,6 +189,98 @@ class TestGeometry:
         avg_border = np.mean([top_border, bottom_border, left_border, right_border])
         # Adjusted expectation - borders might include some background
         assert avg_border > 100  # Changed from 200 to 100
+    
+    def test_homography_with_source_transform(self, sample_image):
+        """Test warping a reduced image with the scale folded into the homography."""
+        quad = detect_paper_quad(sample_image)
+        small = cv2.resize(sample_image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+        
+        M = paper_homography(quad, 540, source_transform=scale_transform(2))
+        expected, _ = warp_perspective(sample_image, quad, out_size=540)
+        warped = cv2.warpPerspective(small, M, (540, 540))
+        
+        assert np.abs(warped.astype(int) - expected).mean() < 2
+        corners = transform_quad(np.float32([[0, 0], [1, 1]] * 2), scale_transform(2))
+        np.testing.assert_allclose(corners[:2], [[0.5, 0.5], [2.5, 2.5]])
+    
+    def test_warp_map_cache(self, sample_image):
+        """Test cached remap tables match warpPerspective and survive small drift."""
+        quad = detect_paper_quad(sample_image).astype(np.float32)
+        cache = WarpMapCache(tolerance=0.25)
+        M = paper_homography(quad, 540)
+        
+        warped = cache.warp(sample_image, M, (540, 540))
+        expected = cv2.warpPerspective(sample_image, M, (540, 540))
+        # Same fixed-point sampling; source coordinates may round differently
+        assert np.abs(warped.astype(int) - expected).mean() < 0.05
+        
+        cache.warp(sample_image, paper_homography(quad + 0.1, 540), (540, 540))
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.warp(sample_image, paper_homography(quad + 2, 540), (540, 540))
+        cache.warp(sample_image[:600], paper_homography(quad + 2, 540), (540, 540))
+        assert (cache.hits, cache.misses) == (1, 3)
+    
+    def test_detection_context_pyramid(self):
+        """Test that the detection context downsamples once and builds a pyramid."""
+        img = np.zeros((3000, 4000, 3), dtype=np.uint8)
+        ctx = DetectionContext(img)
+        
+        assert max(ctx.bgr(0).shape[:2]) == 1000
+        assert ctx.levels == 3
+        assert ctx.gray(1).shape == ctx.bgr(1).shape[:2]
+        assert ctx.gray(1) is ctx.gray(1)
+        assert ctx.level_for(480) == 1
+        
+        quad = np.array([[10, 10], [20, 10], [20, 20], [10, 20]], dtype=np.float32)
+        np.testing.assert_allclose(ctx.to_full(ctx.to_level0(quad, 1)), quad * 8)
+    
+    def test_detect_paper_quad_large_image_subpixel(self):
+        """Test that detection on a downscaled pyramid keeps full-res accuracy."""
+        img = np.full((3000, 4000, 3), 90, dtype=np.uint8)
+        corners = np.array([
+            [812.3, 403.7],
+            [3305.6, 520.2],
+            [3190.1, 2702.8],
+            [700.4, 2590.5]
+        ])
+        cv2.fillPoly(img, [np.rint(corners * 16).astype(np.int32)], (245, 245, 240),
+                     lineType=cv2.LINE_AA, shift=4)
+        
+        quad = detect_paper_quad(img)
+        assert quad is not None
+        assert np.abs(quad - corners).max() < 2.0
+    
+    @pytest.mark.parametrize("name", sorted(USER_SAMPLE_BASELINE))
+    def test_user_samples_match_full_resolution_detection(self, name):
+        """Test that the pyramid finds paper in every sample the full-resolution
+        strategies found it in, with corners close to theirs on clear sheets."""
+        img = cv2.imread(str(USER_SAMPLES_DIR / name))
+        expected = USER_SAMPLE_BASELINE[name]
+        
+        quad = detect_paper_quad(img, min_confidence=2.0)
+        
+        assert quad is not None
+        assert len({tuple(p) for p in np.rint(quad)}) == 4
+        area = cv2.contourArea(quad.astype(np.float32)) / (img.shape[0] * img.shape[1])
+        assert 0.1 < area < 0.95
+        if name in CLEAR_USER_SAMPLES:
+            diagonal = np.hypot(*img.shape[:2])
+            assert np.abs(quad - np.array(expected)).max() < 0.02 * diagonal
+    
+    @pytest.mark.parametrize("name", sorted(SAMPLE_DETECTIONS))
+    def test_sample_detections_are_pinned(self, name):
+        """Test that detection on the shipped photos does not drift."""
+        path, = Path(__file__).parents[2].glob(f"data/*/{name}")
+        img = cv2.imread(str(path))
+        expected = SAMPLE_DETECTIONS[name]
+        
+        quad = detect_paper_quad(img, min_confidence=2.0)
+        
+        if expected is None:
+            assert quad is None
+        else:
+            assert quad is not None
+            assert np.abs(quad - np.array(expected)).max() <= 2
 
 
 class TestLighting:
@@ -179,6 +313,17 @@ class TestLighting:
         
         # Should not change dramatically if already well-lit
         assert abs(normalized_mean - original_mean) < 50
+    
+    def test_histogram_statistics_match_image(self):
+        """Test LUT statistics against the same statistics of the mapped image."""
+        rng = np.random.default_rng(0)
+        gray = rng.integers(0, 256, size=(101, 67), dtype=np.uint8)
+        lut = np.clip(np.arange(256) * 1.7 - 40, 0, 255).astype(np.uint8)
+        mapped = cv2.LUT(gray, lut)
+        hist = _histogram(gray)
+        
+        assert _lut_mean(hist, lut) == pytest.approx(mapped.mean())
+        assert _lut_percentiles(hist, lut, (2, 50, 98)) == tuple(np.percentile(mapped, (2, 50, 98)))
 
 
 class TestPipeline:
@@ -246,6 +391,40 @@ class TestPipeline:
         assert isinstance(message, str)
 
 
+class TestLazyCapture:
+    """Test output selection and lazy evaluation."""
+    
+    def test_score_only_skips_processing(self, sample_image, monkeypatch):
+        from .. import pipeline
+        calls = []
+        monkeypatch.setattr(pipeline, "enhance_color_image",
+                            lambda img: calls.append(img) or img.copy())
+        
+        result = run_capture(sample_image, outputs={"score"})
+        
+        assert isinstance(result, LazyCaptureResult)
+        assert 0 < result.alignment_score < 1
+        assert result.quad.shape == (4, 2)
+        assert result.warp_matrix.shape == (3, 3)
+        assert calls == []
+        
+        # Computed on first access, then memoized
+        assert result.flat is result.flat
+        assert len(calls) == 1
+    
+    def test_lazy_matches_eager(self, sample_image):
+        eager = run_capture(sample_image)
+        lazy = run_capture(sample_image, outputs={"preview"})
+        
+        assert lazy.preview_png == eager.preview_png
+        np.testing.assert_array_equal(lazy.flat, eager.flat)
+        np.testing.assert_array_equal(lazy.warp_matrix, eager.warp_matrix)
+    
+    def test_unknown_output(self, sample_image):
+        with pytest.raises(ValueError, match="Unknown capture outputs"):
+            run_capture(sample_image, outputs={"thumbnail"})
+
+
 class TestEdgeCases:
     """Test edge cases and synthetic fixtures."""
     
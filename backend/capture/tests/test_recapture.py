@@ -0,0 +1,162 @@
+"""Tests for incremental re-capture."""
+
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ..encoding import PreviewOptions
+from ..lighting import enhance_color_image
+from ..pipeline import OUT_SIZE, run_capture
+from ..recapture import LUT_TOLERANCE, RecaptureSession, full_rect
+
+QUAD = np.array([[100, 100], [800, 110], [790, 1100], [110, 1090]], dtype=np.float32)
+
+
+def photo(strokes, gain=1.0):
+    """Photo of a sheet under uneven light with pencil strokes drawn on it."""
+    img = np.full((1200, 900, 3), 90, dtype=np.uint8)
+    cv2.fillPoly(img, [QUAD.astype(np.int32)], (235, 232, 228))
+    shade = np.linspace(0.8, 1.05, img.shape[1])[np.newaxis, :, np.newaxis]
+    img = np.clip(img * shade * gain, 0, 255).astype(np.uint8)
+    for start, end in strokes:
+        cv2.line(img, start, end, (60, 60, 60), 2)
+    return img
+
+
+def full_flat(img):
+    warped = run_capture(img, quad=QUAD, outputs=("warped",)).warped
+    return enhance_color_image(warped)
+
+
+FIRST = [((300, 300), (500, 400))]
+SECOND = FIRST + [((400, 700), (450, 760))]
+
+
+class TestRecaptureSession:
+    """Test that updates recompute only what changed."""
+    
+    def test_first_update_is_full_capture(self):
+        session = RecaptureSession()
+        
+        result = session.update(photo(FIRST), quad=QUAD)
+        
+        assert result.full
+        assert result.regions == [full_rect()]
+        np.testing.assert_array_equal(result.flat, full_flat(photo(FIRST)))
+        np.testing.assert_array_equal(result.composite, result.flat)
+    
+    def test_new_stroke_recomputes_its_surroundings(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST), quad=QUAD)
+        
+        result = session.update(photo(SECOND), quad=QUAD)
+        
+        assert not result.full
+        assert 0 < result.changed_tiles <= 6
+        assert sum(w * h for _, _, w, h in result.regions) < OUT_SIZE * OUT_SIZE / 4
+        # Outside the regions the previous output is kept; inside, the
+        # frozen lighting lookup table is within its tolerance
+        diff = np.abs(result.flat.astype(np.int16) - full_flat(photo(SECOND)))
+        assert diff.max() <= 2 * LUT_TOLERANCE + 2
+        assert (diff > LUT_TOLERANCE).sum() < 100
+    
+    def test_unchanged_photo_recomputes_nothing(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST), quad=QUAD)
+        
+        result = session.update(photo(FIRST), quad=QUAD)
+        
+        assert result.changed_tiles == 0
+        assert result.regions == []
+        assert result.preview_patches() == []
+    
+    def test_lighting_change_recaptures_everything(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST), quad=QUAD)
+        
+        result = session.update(photo(FIRST, gain=0.6), quad=QUAD)
+        
+        assert result.full
+        np.testing.assert_array_equal(result.flat, full_flat(photo(FIRST, gain=0.6)))
+        assert session.full_updates == 2
+    
+    def test_reset_forces_full_capture(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST), quad=QUAD)
+        session.reset()
+        
+        assert session.update(photo(FIRST), quad=QUAD).full
+    
+    def test_patches_decode_to_composite_regions(self):
+        session = RecaptureSession(preview=PreviewOptions(png_level=1))
+        session.update(photo(FIRST), quad=QUAD)
+        result = session.update(photo(SECOND), quad=QUAD)
+        
+        patches = result.preview_patches()
+        
+        assert len(patches) == len(result.regions)
+        for patch in patches:
+            decoded = cv2.imdecode(np.frombuffer(patch.data, np.uint8), cv2.IMREAD_COLOR)
+            np.testing.assert_array_equal(
+                decoded, result.composite[patch.y:patch.y + patch.height,
+                                          patch.x:patch.x + patch.width])
+    
+    def test_overlay_is_blended_in_regions(self):
+        overlay = np.zeros((OUT_SIZE, OUT_SIZE, 4), dtype=np.uint8)
+        cv2.circle(overlay, (540, 540), 300, (0, 0, 255, 255), 4)
+        session = RecaptureSession(ghost_overlay=overlay)
+        session.update(photo(FIRST), quad=QUAD)
+        
+        result = session.update(photo(SECOND), quad=QUAD)
+        
+        expected = run_capture(photo(SECOND), quad=QUAD, ghost_overlay=overlay,
+                               outputs=("composite",)).composite
+        diff = np.abs(result.composite.astype(np.int16) - expected)
+        assert diff.max() <= 2 * LUT_TOLERANCE + 3
+        capture = result.to_capture_result()
+        assert capture.preview_media_type == "image/png"
+        np.testing.assert_array_equal(capture.flat, result.flat)
+    
+    def test_previous_quad_is_reused(self):
+        session = RecaptureSession()
+        first = session.update(photo(FIRST))
+        
+        result = session.update(photo(SECOND))
+        
+        assert session.detections == 1
+        np.testing.assert_array_equal(result.capture.quad, first.capture.quad)
+        assert not result.full
+        assert 0 < result.changed_tiles <= 6
+    
+    def test_moved_sheet_is_detected_again(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST))
+        moved = np.roll(photo(FIRST), (40, 30), axis=(0, 1))
+        
+        result = session.update(moved)
+        
+        assert session.detections == 2
+        np.testing.assert_allclose(result.capture.quad, QUAD + [30, 40], atol=3)
+        # Registered again, the sheet itself did not change
+        assert result.changed_tiles == 0
+    
+    def test_redetection_timings_are_not_counted_twice(self):
+        session = RecaptureSession()
+        session.update(photo(FIRST))
+        moved = np.roll(photo(FIRST), (40, 30), axis=(0, 1))
+        
+        start = time.perf_counter()
+        result = session.update(moved)
+        elapsed = time.perf_counter() - start
+        
+        stages = result.timings.stages
+        assert session.detections == 2
+        assert {"detect", "warp", "diff"} <= stages.keys()
+        # Stages are disjoint, so together they cannot exceed the wall time
+        assert result.timings.total <= elapsed
+    
+    def test_rejects_tile_size_not_dividing_frame(self):
+        with pytest.raises(ValueError):
+            RecaptureSession(tile_size=64)
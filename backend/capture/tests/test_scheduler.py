@@ -0,0 +1,97 @@
+"""Tests for detection strategy scheduling and quad confidence."""
+
+import pytest
+import numpy as np
+import cv2
+from ..geometry import detect_paper, quad_confidence, STRATEGIES
+from ..scheduler import StrategyScheduler
+
+
+@pytest.fixture
+def paper_image():
+    """Synthetic image with a clean white sheet on a gray background."""
+    img = np.ones((800, 600, 3), dtype=np.uint8) * 100
+    cv2.rectangle(img, (100, 120), (500, 680), (250, 250, 250), -1)
+    return img
+
+
+class TestStrategyScheduler:
+    """Test strategy ordering and statistics."""
+    
+    def test_initial_order_follows_cost_priors(self):
+        scheduler = StrategyScheduler(cost_priors={"slow": 1.0, "fast": 0.1})
+        assert scheduler.order(["slow", "fast"]) == ["fast", "slow"]
+    
+    def test_winners_move_forward(self):
+        scheduler = StrategyScheduler(cost_priors={"a": 0.1, "b": 0.1})
+        for _ in range(10):
+            scheduler.record("a", 0.1, hit=False)
+            scheduler.record("b", 0.1, hit=True)
+            scheduler.record_outcome(["a", "b"], "b")
+        
+        assert scheduler.order(["a", "b"]) == ["b", "a"]
+        stats = scheduler.stats()
+        assert stats["b"]["wins"] == 10
+        assert stats["b"]["hit_rate"] == 1.0
+        assert stats["a"]["hit_rate"] == 0.0
+        assert stats["a"]["mean_time"] == pytest.approx(0.1)
+    
+    def test_reset(self):
+        scheduler = StrategyScheduler()
+        scheduler.record("edges", 0.01)
+        scheduler.reset()
+        assert scheduler.stats() == {}
+
+
+class TestEarlyExit:
+    """Test confidence-based early exit in detect_paper."""
+    
+    def test_confident_quad_stops_early(self, paper_image):
+        result = detect_paper(paper_image, scheduler=StrategyScheduler())
+        
+        assert result.quad is not None
+        assert result.confidence >= 0.8
+        assert len(result.attempted) == 1
+        assert set(result.timings) == set(result.attempted)
+    
+    def test_exhaustive_runs_all_strategies(self, paper_image):
+        result = detect_paper(paper_image, min_confidence=1.1, scheduler=StrategyScheduler())
+        
+        assert sorted(result.attempted) == sorted(STRATEGIES)
+        assert result.quad is not None
+    
+    def test_confidence_prefers_supported_rectangles(self, paper_image):
+        good = np.array([[100, 120], [500, 120], [500, 680], [100, 680]], dtype=np.float32)
+        # Same area but not on the paper outline and badly skewed
+        bad = np.array([[50, 50], [450, 200], [550, 750], [150, 600]], dtype=np.float32)
+        
+        assert quad_confidence(good, paper_image) > 0.9
+        assert quad_confidence(bad, paper_image) < quad_confidence(good, paper_image)
+
+
+class TestParallelDetection:
+    """Test running strategies concurrently on the shared pool."""
+    
+    def test_parallel_matches_sequential(self, paper_image):
+        sequential = detect_paper(paper_image, min_confidence=1.1,
+                                  scheduler=StrategyScheduler())
+        parallel = detect_paper(paper_image, min_confidence=1.1,
+                                scheduler=StrategyScheduler(), parallel=True)
+        
+        assert sorted(parallel.finished) == sorted(STRATEGIES)
+        assert parallel.confidence == pytest.approx(sequential.confidence)
+        np.testing.assert_allclose(parallel.quad, sequential.quad)
+    
+    def test_parallel_early_exit(self, paper_image):
+        result = detect_paper(paper_image, scheduler=StrategyScheduler(), parallel=True)
+        
+        assert result.quad is not None
+        assert result.strategy in result.finished
+        assert set(result.finished) <= set(result.attempted)
+    
+    def test_expired_deadline_returns_without_waiting(self, paper_image):
+        result = detect_paper(paper_image, scheduler=StrategyScheduler(),
+                              parallel=True, deadline=0.0)
+        
+        assert set(result.finished) <= set(result.attempted)
+        assert result.quad is None or result.quad.shape == (4, 2)
@@ -0,0 +1,65 @@
+"""Tests for streaming capture sessions and their wire format."""
+
+import pytest
+import numpy as np
+import cv2
+from ..models import TrackingResult
+from ..stream import (
+    StreamSession,
+    decode_frame_message,
+    encode_frame_message,
+    FLAG_QUAD,
+    FLAG_STABLE,
+    MSG_PREVIEW,
+)
+from .test_tracking import make_frame
+
+
+def encode_jpeg(img):
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+class TestWireFormat:
+    """Test binary message packing."""
+    
+    def test_frame_message_roundtrip(self):
+        quad = np.array([[1, 2], [3, 4], [5, 6], [7, 8]], dtype=np.float32)
+        result = TrackingResult(quad=quad, confidence=0.9, alignment_score=0.5)
+        
+        data = encode_frame_message(42, result, "Excellent capture!", valid=True, stable=False)
+        message = decode_frame_message(data)
+        
+        assert len(data) < 100
+        assert message.seq == 42
+        assert message.flags & FLAG_QUAD
+        assert not message.flags & FLAG_STABLE
+        assert message.alignment_score == pytest.approx(0.5)
+        np.testing.assert_array_equal(message.quad, quad)
+        assert message.feedback == "Excellent capture!"
+
+
+class TestStreamSession:
+    """Test per-connection frame processing."""
+    
+    def test_preview_only_on_request(self):
+        session = StreamSession(stable_frames=100)
+        frame = encode_jpeg(make_frame()[0])
+        
+        message, preview = session.process(frame, seq=1)
+        assert decode_frame_message(message).flags & FLAG_QUAD
+        assert preview is None
+        
+        _, preview = session.process(frame, seq=2, want_preview=True)
+        assert preview is not None
+        assert preview[0] == MSG_PREVIEW
+    
+    def test_preview_sent_once_when_stable(self):
+        session = StreamSession(stable_frames=2)
+        frame = encode_jpeg(make_frame()[0])
+        
+        previews = [session.process(frame, seq=i)[1] for i in range(5)]
+        assert [p is not None for p in previews] == [False, False, True, False, False]
+    
+    def test_undecodable_frame(self):
+        with pytest.raises(ValueError):
+            StreamSession().process(b"not an image", seq=0)
@@ -0,0 +1,137 @@
+"""Tests for SVG rendering and overlay blending."""
+
+import sys
+import pytest
+import numpy as np
+from ..svg_overlay import argb32_to_bgra, blend_overlay, prepare_overlay
+
+
+def reference_unpremultiply(bgra_premultiplied):
+    """Per-pixel port of cairo's PNG writer (unpremultiply_data)."""
+    out = np.zeros_like(bgra_premultiplied)
+    for (y, x), a in np.ndenumerate(bgra_premultiplied[:, :, 3]):
+        if a == 0:
+            continue
+        for c in range(3):
+            out[y, x, c] = (int(bgra_premultiplied[y, x, c]) * 255 + a // 2) // a
+        out[y, x, 3] = a
+    return out
+
+
+def reference_blend(base, overlay, alpha):
+    """Float blend that blend_overlay used before the fixed-point engine."""
+    if overlay.shape[2] == 4:
+        alpha = alpha * (overlay[:, :, 3] / 255.0)[:, :, np.newaxis]
+        overlay = overlay[:, :, :3]
+    blended = (1 - alpha) * base.astype(np.float32) + alpha * overlay.astype(np.float32)
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+
+def make_argb32(h, w, stride_pad, seed=0):
+    """Random premultiplied surface buffer with row padding, in native byte order."""
+    rng = np.random.default_rng(seed)
+    alpha = rng.choice([0, 255, 1, 17, 128, 254], size=(h, w)).astype(np.uint16)
+    colour = rng.integers(0, 256, size=(h, w, 3)).astype(np.uint16)
+    premultiplied = np.dstack([(colour * alpha[..., None] + 127) // 255, alpha]).astype(np.uint8)
+    
+    rows = np.zeros((h, w * 4 + stride_pad), dtype=np.uint8)
+    pixels = premultiplied if sys.byteorder == "little" else premultiplied[:, :, ::-1]
+    rows[:, :w * 4] = pixels.reshape(h, -1)
+    return rows, premultiplied
+
+
+class TestArgb32Conversion:
+    """Test direct surface-to-array conversion."""
+    
+    def test_matches_cairo_png_unpremultiply(self):
+        rows, premultiplied = make_argb32(16, 24, stride_pad=32)
+        
+        bgra = argb32_to_bgra(rows.tobytes(), 24, 16, rows.shape[1])
+        
+        assert bgra.shape == (16, 24, 4)
+        np.testing.assert_array_equal(bgra, reference_unpremultiply(premultiplied))
+    
+    def test_opaque_and_transparent_pass_through(self):
+        rows = np.zeros((2, 8), dtype=np.uint8)
+        rows[0] = [10, 20, 30, 255, 0, 0, 0, 0]
+        rows[1] = [1, 2, 3, 255, 0, 0, 0, 0]
+        
+        bgra = argb32_to_bgra(rows.tobytes(), 2, 2, 8)
+        if sys.byteorder == "little":
+            assert bgra[0, 0].tolist() == [10, 20, 30, 255]
+        assert bgra[0, 1].tolist() == [0, 0, 0, 0]
+
+
+class TestBlendOverlay:
+    """Test fixed-point and uniform-alpha blending."""
+    
+    @pytest.mark.parametrize("channels", [3, 4])
+    @pytest.mark.parametrize("alpha", [0.0, 0.3, 0.77, 1.0])
+    def test_within_one_of_float_blend(self, channels, alpha):
+        rng = np.random.default_rng(1)
+        base = rng.integers(0, 256, size=(64, 48, 3), dtype=np.uint8)
+        overlay = rng.integers(0, 256, size=(64, 48, channels), dtype=np.uint8)
+        
+        blended = blend_overlay(base, overlay, alpha)
+        diff = np.abs(blended.astype(int) - reference_blend(base, overlay, alpha))
+        
+        assert blended.dtype == np.uint8
+        assert diff.max() <= 1
+    
+    def test_blend_in_place(self):
+        rng = np.random.default_rng(2)
+        base = rng.integers(0, 256, size=(32, 32, 3), dtype=np.uint8)
+        overlay = rng.integers(0, 256, size=(32, 32, 4), dtype=np.uint8)
+        expected = blend_overlay(base, overlay, 0.3)
+        
+        result = blend_overlay(base, overlay, 0.3, out=base)
+        
+        assert result is base
+        np.testing.assert_array_equal(base, expected)
+    
+    def test_prepared_overlay_reused_for_read_only_arrays(self):
+        overlay = np.zeros((8, 8, 4), dtype=np.uint8)
+        overlay[:, :, 3] = 255
+        overlay.flags.writeable = False
+        
+        prepared = prepare_overlay(overlay, 0.5)
+        
+        assert prepare_overlay(overlay, 0.5) is prepared
+        assert prepare_overlay(overlay, 0.3) is not prepared
+        base = np.full((8, 8, 3), 200, dtype=np.uint8)
+        assert blend_overlay(base, prepared).max() == 100
+    
+    def test_prepared_overlay_shared_between_views(self):
+        overlay = np.zeros((8, 8, 4), dtype=np.uint8)
+        overlay.flags.writeable = False
+        
+        prepared = prepare_overlay(overlay[:], 0.5)
+        
+        assert prepare_overlay(overlay[:], 0.5) is prepared
+        assert prepare_overlay(overlay[:4], 0.5) is not prepared
+    
+    def test_read_only_view_of_writable_overlay_not_cached(self):
+        overlay = np.zeros((8, 8, 4), dtype=np.uint8)
+        view = overlay[:]
+        view.flags.writeable = False
+        
+        prepared = prepare_overlay(view, 0.5)
+        overlay[:, :, 3] = 255
+        
+        assert prepare_overlay(view, 0.5) is not prepared
+        assert prepare_overlay(view, 0.5).inv_weight.max() < prepared.inv_weight.max()
+    
+    def test_prepared_region_blends_like_the_whole(self):
+        rng = np.random.default_rng(3)
+        base = rng.integers(0, 256, size=(32, 32, 3), dtype=np.uint8)
+        overlay = rng.integers(0, 256, size=(32, 32, 4), dtype=np.uint8)
+        prepared = prepare_overlay(overlay, 0.3)
+        
+        region = blend_overlay(base[8:20, 4:28], prepared.region(4, 8, 24, 12))
+        
+        np.testing.assert_array_equal(region, blend_overlay(base, prepared)[8:20, 4:28])
+    
+    def test_rejects_bad_out(self):
+        base = np.zeros((8, 8, 3), dtype=np.uint8)
+        with pytest.raises(ValueError):
+            blend_overlay(base, base, 0.3, out=np.zeros((8, 8, 3), dtype=np.float32))
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Tests for live paper tracking."""
+
+import pytest
+import numpy as np
+import cv2
+from ..tracking import PaperTracker
+
+
+def make_frame(shift: float = 0.0):
+    """Synthetic viewfinder frame with paper shifted by ``shift`` pixels."""
+    rng = np.random.default_rng(0)
+    img = np.clip(90 + rng.normal(0, 8, (720, 960, 1)), 0, 255).astype(np.uint8)
+    img = np.repeat(img, 3, axis=2)
+    corners = np.array([
+        [200, 100],
+        [760, 120],
+        [740, 650],
+        [220, 630]
+    ], dtype=np.float64) + [shift, shift / 2]
+    cv2.fillPoly(img, [np.rint(corners * 16).astype(np.int32)], (240, 240, 240),
+                 lineType=cv2.LINE_AA, shift=4)
+    return img, corners
+
+
+class TestPaperTracker:
+    """Test keyframe detection, tracking and fallback."""
+    
+    def test_tracks_between_keyframes(self):
+        tracker = PaperTracker(keyframe_interval=30, smoothing=0)
+        
+        results = []
+        for i in range(10):
+            frame, corners = make_frame(i * 1.5)
+            results.append((tracker.update(frame), corners))
+        
+        assert results[0][0].keyframe
+        assert not any(result.keyframe for result, _ in results[1:])
+        for result, corners in results:
+            assert result.quad is not None
+            assert np.abs(result.quad - corners).max() < 4.0
+            assert result.homography.shape == (3, 3)
+            assert 0 < result.alignment_score < 1
+    
+    def test_keyframe_interval(self):
+        tracker = PaperTracker(keyframe_interval=3)
+        keyframes = [tracker.update(make_frame(i)[0]).keyframe for i in range(6)]
+        assert keyframes == [True, False, False, True, False, False]
+    
+    def test_falls_back_when_paper_lost(self):
+        tracker = PaperTracker()
+        tracker.update(make_frame()[0])
+        
+        result = tracker.update(np.full((720, 960, 3), 90, dtype=np.uint8))
+        assert result.keyframe
+        assert result.quad is None
+        assert tracker.quad is None
+    
+    def test_invalid_smoothing(self):
+        with pytest.raises(ValueError):
+            PaperTracker(smoothing=1.0)
@@ -0,0 +1,187 @@
+"""Temporal paper tracking for live camera streams."""
+
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .geometry import (
+    DetectionContext,
+    detect_paper,
+    quad_confidence,
+    _order_points,
+)
+from .models import TrackingResult
+from .scheduler import StrategyScheduler
+
+
+# Longer side of the grayscale frame used for optical flow
+TRACK_MAX_SIDE = 640
+
+# Forward-backward optical flow error (tracking pixels) above which a corner is lost
+MAX_FB_ERROR = 1.0
+
+
+class PaperTracker:
+    """Track the paper quad across frames of a live camera stream.
+
+    Full ``detect_paper`` runs only on keyframes: the first frame, every
+    ``keyframe_interval`` frames, and whenever tracking confidence drops below
+    ``min_confidence``. In between, the four corners are followed with
+    pyramidal Lucas-Kanade optical flow on a downscaled grayscale frame,
+    validated with a forward-backward check and ``quad_confidence``.
+
+    Corners are smoothed with an exponential moving average before the
+    homography is computed, so the overlay doesn't jitter. Large moves bypass
+    the smoothing so the quad doesn't lag behind a moving phone.
+
+    Example:
+        tracker = PaperTracker()
+        for frame in frames:
+            result = tracker.update(frame)
+            if result.quad is not None:
+                show_feedback(result.alignment_score)
+    """
+
+    def __init__(self, keyframe_interval: int = 30, min_confidence: float = 0.6,
+                 smoothing: float = 0.5, out_size: int = 1080,
+                 scheduler: Optional[StrategyScheduler] = None) -> None:
+        """Create a tracker.
+
+        Args:
+            keyframe_interval: Maximum number of frames between full detections
+            min_confidence: Tracking confidence (0-1) below which detection reruns
+            smoothing: Weight of the previous corners in the moving average (0=off)
+            out_size: Output size the homography maps the paper onto
+            scheduler: Strategy scheduler passed to ``detect_paper`` on keyframes
+        """
+        if keyframe_interval < 1:
+            raise ValueError(f"keyframe_interval must be >= 1, got {keyframe_interval}")
+        if not 0 <= smoothing < 1:
+            raise ValueError(f"Smoothing must be in range [0, 1), got {smoothing}")
+
+        self.keyframe_interval = keyframe_interval
+        self.min_confidence = min_confidence
+        self.smoothing = smoothing
+        self.out_size = out_size
+        self.scheduler = scheduler
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all tracking state; the next frame becomes a keyframe."""
+        self._prev_gray: Optional[np.ndarray] = None
+        self._prev_pts: Optional[np.ndarray] = None   # Corners in tracking coordinates
+        self._smoothed: Optional[np.ndarray] = None   # Corners in frame coordinates
+        self._scale = 1.0                             # Tracking size / frame size
+        self._since_keyframe = 0
+
+    @property
+    def quad(self) -> Optional[np.ndarray]:
+        """Current smoothed quad in frame coordinates, if tracking."""
+        return None if self._smoothed is None else self._smoothed.copy()
+
+    def update(self, frame: np.ndarray) -> TrackingResult:
+        """Process the next frame of the stream.
+
+        Args:
+            frame: Camera frame in BGR format
+
+        Returns:
+            TrackingResult for this frame (``quad`` is None if paper was lost)
+
+        Raises:
+            ValueError: If frame is invalid
+        """
+        ctx = DetectionContext(frame, max_side=TRACK_MAX_SIDE, levels=1)
+        gray = ctx.gray(0)
+
+        quad = None
+        confidence = 0.0
+        keyframe = (
+            self._prev_gray is None
+            or self._prev_gray.shape != gray.shape
+            or self._since_keyframe + 1 >= self.keyframe_interval
+        )
+
+        if not keyframe:
+            quad, confidence = self._track(gray)
+            if quad is None or confidence < self.min_confidence:
+                keyframe = True
+
+        if keyframe:
+            detection = detect_paper(frame, scheduler=self.scheduler)
+            if detection.quad is None:
+                self.reset()
+                return TrackingResult(keyframe=True)
+            quad = detection.quad.astype(np.float32)
+            confidence = detection.confidence
+            self._smoothed = None  # Don't blend across a re-detection
+            self._since_keyframe = 0
+        else:
+            self._since_keyframe += 1
+
+        assert quad is not None
+        quad = _order_points(quad)
+        smoothed = self._smooth(quad, frame.shape[:2])
+
+        # Track from the raw corners; following the lagging average would drift
+        self._prev_gray = gray
+        self._prev_pts = (quad * ctx.scale).astype(np.float32)
+        self._scale = ctx.scale
+
+        dst = np.array([
+            [0, 0],
+            [self.out_size - 1, 0],
+            [self.out_size - 1, self.out_size - 1],
+            [0, self.out_size - 1]
+        ], dtype=np.float32)
+        homography = cv2.getPerspectiveTransform(smoothed, dst)
+
+        img_area = frame.shape[0] * frame.shape[1]
+        return TrackingResult(
+            quad=smoothed.copy(),
+            homography=homography.astype(np.float32),
+            confidence=float(confidence),
+            alignment_score=float(min(1.0, cv2.contourArea(smoothed) / img_area)),
+            keyframe=keyframe,
+        )
+
+    def _track(self, gray: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+        """Follow the previous corners into ``gray`` with optical flow."""
+        assert self._prev_gray is not None and self._prev_pts is not None
+        prev_pts = self._prev_pts.reshape(-1, 1, 2)
+        lk_params: Dict[str, Any] = dict(
+            winSize=(21, 21),
+            maxLevel=3,
+            criteria=(cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+
+        # The next-points arrays are output buffers (no OPTFLOW_USE_INITIAL_FLOW)
+        pts, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev_pts,
+                                                  np.empty_like(prev_pts), **lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, pts,
+                                                        np.empty_like(pts), **lk_params)
+
+        fb_error = np.linalg.norm((back - prev_pts).reshape(-1, 2), axis=1)
+        ok = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < MAX_FB_ERROR)
+        if not ok.all():
+            return None, 0.0
+
+        quad = pts.reshape(4, 2)
+        confidence = quad_confidence(_order_points(quad), gray)
+        return quad / self._scale, confidence
+
+    def _smooth(self, quad: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """Exponential moving average of corners, bypassed on large moves."""
+        if self._smoothed is None or self.smoothing == 0:
+            self._smoothed = quad.astype(np.float32)
+            return self._smoothed
+
+        # A move of more than 2% of the frame diagonal is real motion, not jitter
+        threshold = 0.02 * float(np.hypot(frame_shape[0], frame_shape[1]))
+        if np.abs(quad - self._smoothed).max() > threshold:
+            self._smoothed = quad.astype(np.float32)
+        else:
+            self._smoothed = (self.smoothing * self._smoothed
+                              + (1 - self.smoothing) * quad).astype(np.float32)
+        return self._smoothed
@@ -0,0 +1,45 @@
+"""
+MASTER-STROKE Comparison Module
+
+Compares a captured drawing against a tutorial reference step and reports
+missing and extra strokes, and tone and texture (shading) errors, as scored
+error regions.
+"""
+
+from .strokes import (
+    compare_strokes,
+    prepare_reference,
+    detect_edges,
+    PreparedReference,
+    StrokeComparison,
+    StrokeTracker,
+    ErrorRegion,
+)
+from .shading import (
+    compare_shading,
+    prepare_shading_reference,
+    local_statistics,
+    value_map,
+    LocalStats,
+    ShadingReference,
+    ShadingComparison,
+    ShadingRegion,
+)
+
+__all__ = [
+    "compare_strokes",
+    "prepare_reference",
+    "detect_edges",
+    "PreparedReference",
+    "StrokeComparison",
+    "StrokeTracker",
+    "ErrorRegion",
+    "compare_shading",
+    "prepare_shading_reference",
+    "local_statistics",
+    "value_map",
+    "LocalStats",
+    "ShadingReference",
+    "ShadingComparison",
+    "ShadingRegion",
+]
@@ -0,0 +1,72 @@
+"""Cache of references prepared from read-only arrays."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def is_immutable(arr: np.ndarray) -> bool:
+    """True if nothing can change ``arr``'s pixels while it is referenced.
+
+    The array and every array in its base chain must be read-only, and the
+    memory at the end of the chain must be the array's own or a read-only
+    buffer (e.g. a read-only memory map). A read-only view of a writable
+    array is not immutable: the writable array can still change it.
+    """
+    obj: Any = arr
+    while isinstance(obj, np.ndarray):
+        if obj.flags.writeable:
+            return False
+        obj = obj.base
+    if obj is None:
+        return True
+    try:
+        return memoryview(obj).readonly
+    except TypeError:
+        return False
+
+
+class PreparedCache(Generic[T]):
+    """Small LRU of values derived from read-only arrays, keyed by array identity.
+
+    Immutable arrays (tutorial bundle views, see ``is_immutable``) cannot
+    change, so work derived from them can be reused. Entries hold a
+    reference to their source array, so its ``id`` cannot be recycled while
+    cached. Other arrays are never cached.
+    """
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[np.ndarray, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: np.ndarray, key: Hashable, build: Callable[[], T]) -> T:
+        """Return the value for ``(source, key)``, calling ``build`` on a miss."""
+        if not is_immutable(source):
+            return build()
+
+        entry_key = (id(source), key)
+        with self._lock:
+            cached = self._entries.get(entry_key)
+            if cached is not None and cached[0] is source:
+                self._entries.move_to_end(entry_key)
+                return cached[1]
+        # Built outside the lock; a concurrent miss may build twice
+        value = build()
+        with self._lock:
+            self._entries[entry_key] = (source, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,296 @@
+"""Shading (value) comparison between a captured drawing and a reference step.
+
+Shading is judged on value maps: blurred grayscale images, as stored per
+step in tutorial bundles. For each window size the local mean (tone) and
+standard deviation (contrast) of both maps are compared, and areas where the
+drawing is too light, too dark, too flat or too busy become error regions.
+
+Local statistics come from one integral image of the value map and of its
+square: every window size is then four lookups per pixel, whatever its
+size, and all window sizes share the same integral pass. Value maps are
+smooth (nearly nothing is left above the analysis Nyquist frequency after
+the blur), so the analysis runs at 1/ANALYSIS_SCALE resolution, and the
+drawing is downsampled before it is blurred.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .cache import PreparedCache
+
+
+# Gaussian sigma of value maps; matches the bundles' "values" arrays
+VALUE_SIGMA = 3.0
+
+# Window sizes in frame pixels (local statistics at several scales)
+DEFAULT_WINDOWS = (16, 32, 64)
+
+# Value maps are downsampled by this factor before analysis
+ANALYSIS_SCALE = 4
+
+# Differences (0-255 gray levels) above which an area counts as wrong
+VALUE_THRESHOLD = 40.0
+CONTRAST_THRESHOLD = 20.0
+
+# Smallest error region reported, in frame pixels
+MIN_REGION_AREA = 32 * 32
+
+# Region kinds for positive and negative differences (user minus reference)
+_VALUE_KINDS = ("too_light", "too_dark")
+_CONTRAST_KINDS = ("too_busy", "too_flat")
+
+# Prepared references for read-only value maps (bundle views)
+_prepared: "PreparedCache[ShadingReference]" = PreparedCache()
+
+
+@dataclass
+class LocalStats:
+    """Local statistics of an image over one square window size.
+
+    Each pixel's window spans ``window`` pixels starting ``window // 2``
+    before it, with reflected borders.
+
+    Attributes:
+        window: Window size in pixels of the analysed image
+        mean: float32 local mean
+        variance: float32 local variance
+        contrast: float32 local standard deviation
+    """
+    window: int
+    mean: np.ndarray
+    variance: np.ndarray
+    contrast: np.ndarray
+
+
+@dataclass
+class ShadingRegion:
+    """An area whose tone or contrast differs from the reference.
+
+    Attributes:
+        kind: "too_light" / "too_dark" (local mean) or "too_busy" /
+            "too_flat" (local contrast)
+        x, y, width, height: Bounding box in frame pixels
+        area: Area in frame pixels
+        mean_error: Mean absolute difference in gray levels
+        severity: ``area * mean_error``; regions are sorted by it
+    """
+    kind: str
+    x: int
+    y: int
+    width: int
+    height: int
+    area: int
+    mean_error: float
+    severity: float
+
+
+@dataclass
+class ShadingComparison:
+    """Outcome of comparing a drawing's shading against a reference step.
+
+    Attributes:
+        value_error: Mean absolute local-mean difference (gray levels)
+        contrast_error: Mean absolute local-contrast difference (gray levels)
+        error_fraction: Fraction of the frame inside a flagged area
+        regions: Error regions, most severe first
+    """
+    value_error: float
+    contrast_error: float
+    error_fraction: float
+    regions: List[ShadingRegion] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form."""
+        return asdict(self)
+
+
+class ShadingReference:
+    """Value map of one step with its local statistics precomputed.
+
+    Attributes:
+        shape: Frame shape (height, width) of the value map
+        windows: Window sizes in frame pixels
+        stats: Local statistics of the downsampled value map per window
+    """
+
+    def __init__(self, values: np.ndarray, windows: Sequence[int] = DEFAULT_WINDOWS) -> None:
+        """Analyse a reference value map.
+
+        Raises:
+            ValueError: If ``values`` is not a 2-D uint8 array, or a window is
+                invalid for its size
+        """
+        if values.ndim != 2 or values.dtype != np.uint8:
+            raise ValueError(f"Expected a 2-D uint8 value map, got {values.shape} {values.dtype}")
+        self.shape: Tuple[int, int] = values.shape[:2]  # type: ignore[assignment]
+        self.windows = tuple(windows)
+        self.stats = local_statistics(_downsample(values), _analysis_windows(self.windows))
+
+
+def value_map(img_bgr: np.ndarray) -> np.ndarray:
+    """Blurred grayscale value map, as bundles store for reference steps."""
+    gray = img_bgr if img_bgr.ndim == 2 else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(gray, (0, 0), VALUE_SIGMA)
+
+
+def local_statistics(gray: np.ndarray, windows: Sequence[int]) -> Dict[int, LocalStats]:
+    """Local mean, variance and contrast for every window size in one pass.
+
+    One integral image of the (reflect-padded) image and one of its square
+    are computed; each window's box sums are then four lookups per pixel.
+
+    Args:
+        gray: 2-D uint8 image
+        windows: Window sizes in pixels
+
+    Returns:
+        LocalStats per window size
+
+    Raises:
+        ValueError: If a window is < 1 or larger than the image
+    """
+    h, w = gray.shape[:2]
+    windows = sorted(set(int(size) for size in windows))
+    if not windows or windows[0] < 1 or windows[-1] > min(h, w):
+        raise ValueError(f"Window sizes must be 1..{min(h, w)}, got {windows}")
+
+    # Window covers [i - size // 2, i - size // 2 + size) around pixel i
+    before = max(size // 2 for size in windows)
+    after = max(size - size // 2 - 1 for size in windows)
+    padded = cv2.copyMakeBorder(gray, before, after, before, after, cv2.BORDER_REFLECT)
+    # Sums of uint8 fit int32 exactly; squares need float64
+    sums, squares = cv2.integral2(padded, sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+
+    stats = {}
+    for size in windows:
+        offset = before - size // 2
+        scale = 1.0 / (size * size)
+        mean = cv2.multiply(_box(sums, offset, size, h, w), scale, dtype=cv2.CV_32F)
+        mean_sq = cv2.multiply(_box(squares, offset, size, h, w), scale, dtype=cv2.CV_32F)
+        variance = cv2.max(cv2.subtract(mean_sq, cv2.multiply(mean, mean)), 0)
+        stats[size] = LocalStats(size, mean, variance, cv2.sqrt(variance))
+    return stats
+
+
+def prepare_shading_reference(values: np.ndarray,
+                              windows: Sequence[int] = DEFAULT_WINDOWS) -> ShadingReference:
+    """Prepare a reference value map, reusing earlier work for read-only arrays."""
+    windows = tuple(windows)
+    return _prepared.get(values, windows, lambda: ShadingReference(values, windows))
+
+
+def compare_shading(flat_bgr: np.ndarray,
+                    reference: Union[ShadingReference, np.ndarray],
+                    windows: Sequence[int] = DEFAULT_WINDOWS,
+                    value_threshold: float = VALUE_THRESHOLD,
+                    contrast_threshold: float = CONTRAST_THRESHOLD,
+                    min_region_area: int = MIN_REGION_AREA) -> ShadingComparison:
+    """Compare a captured drawing's shading against a reference step.
+
+    Tone errors count where the local mean is off at every window size (a
+    difference at small windows only is texture); contrast errors count
+    where the local contrast is off at any window size.
+
+    Args:
+        flat_bgr: Captured image in the capture frame, e.g. ``CaptureResult.flat``
+        reference: Prepared reference (its windows are used), or a reference
+            value map such as ``BundleStep.values``
+        windows: Window sizes in frame pixels, for a value map ``reference``
+        value_threshold: Local mean difference flagged as too light/dark
+        contrast_threshold: Local contrast difference flagged as too busy/flat
+        min_region_area: Smallest error region reported, in frame pixels
+
+    Returns:
+        ShadingComparison with overall errors and error regions
+
+    Raises:
+        ValueError: If the image and reference sizes differ
+    """
+    if not isinstance(reference, ShadingReference):
+        reference = prepare_shading_reference(reference, windows)
+    if flat_bgr.shape[:2] != reference.shape:
+        raise ValueError(f"Image is {flat_bgr.shape[:2]}, reference is {reference.shape}")
+
+    # Step 1: Local statistics of the drawing at every window size
+    gray = flat_bgr if flat_bgr.ndim == 2 else cv2.cvtColor(flat_bgr, cv2.COLOR_BGR2GRAY)
+    small = cv2.GaussianBlur(_downsample(gray), (0, 0), VALUE_SIGMA / ANALYSIS_SCALE)
+    user = local_statistics(small, list(reference.stats))
+
+    # Step 2: Signed differences, combined across window sizes
+    pairs = [(user[size], stats) for size, stats in reference.stats.items()]
+    value_diff = _combine([u.mean - r.mean for u, r in pairs], largest=False)
+    contrast_diff = _combine([u.contrast - r.contrast for u, r in pairs], largest=True)
+
+    # Step 3: Flagged areas become regions
+    min_area = max(1, min_region_area // (ANALYSIS_SCALE * ANALYSIS_SCALE))
+    regions = (_regions(value_diff, value_threshold, _VALUE_KINDS, reference.shape, min_area)
+               + _regions(contrast_diff, contrast_threshold, _CONTRAST_KINDS,
+                          reference.shape, min_area))
+    regions.sort(key=lambda r: r.severity, reverse=True)
+
+    flagged = (cv2.absdiff(value_diff, 0) > value_threshold) | \
+        (cv2.absdiff(contrast_diff, 0) > contrast_threshold)
+    return ShadingComparison(
+        value_error=round(float(cv2.absdiff(value_diff, 0).mean()), 3),
+        contrast_error=round(float(cv2.absdiff(contrast_diff, 0).mean()), 3),
+        error_fraction=round(float(flagged.mean()), 4),
+        regions=regions,
+    )
+
+
+def _box(integral: np.ndarray, offset: int, size: int, h: int, w: int) -> np.ndarray:
+    """Window sums from an integral image: four shifted views per pixel."""
+    a, b = offset, offset + size
+    return cv2.subtract(cv2.subtract(integral[b:b + h, b:b + w], integral[a:a + h, b:b + w]),
+                        cv2.subtract(integral[b:b + h, a:a + w], integral[a:a + h, a:a + w]))
+
+
+def _downsample(img: np.ndarray) -> np.ndarray:
+    h, w = img.shape[:2]
+    size = (max(1, w // ANALYSIS_SCALE), max(1, h // ANALYSIS_SCALE))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def _analysis_windows(windows: Sequence[int]) -> List[int]:
+    """Frame-pixel window sizes at the analysis resolution."""
+    return [max(1, round(size / ANALYSIS_SCALE)) for size in windows]
+
+
+def _combine(diffs: List[np.ndarray], largest: bool) -> np.ndarray:
+    """Per pixel, the difference with the largest (or smallest) magnitude."""
+    result = diffs[0]
+    for diff in diffs[1:]:
+        bigger = cv2.absdiff(diff, 0) > cv2.absdiff(result, 0)
+        result = np.where(bigger if largest else ~bigger, diff, result)
+    return result
+
+
+def _regions(diff: np.ndarray, threshold: float, kinds: Tuple[str, str],
+             shape: Tuple[int, int], min_area: int) -> List[ShadingRegion]:
+    """Regions where ``diff`` exceeds ``threshold`` (first kind) or is below
+    ``-threshold`` (second kind)."""
+    h, w = shape
+    scale = ANALYSIS_SCALE
+    magnitude = cv2.absdiff(diff, 0)
+    regions = []
+    for kind, mask in zip(kinds, (diff > threshold, diff < -threshold)):
+        if not mask.any():
+            continue
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(
+            mask.view(np.uint8), connectivity=8)
+        # Per-region error sums in one pass
+        error_sum = np.bincount(labels.ravel(), weights=magnitude.ravel(), minlength=count)
+        for i in np.flatnonzero(stats[:, cv2.CC_STAT_AREA] >= min_area):
+            if i == 0:  # Background
+                continue
+            x, y, rw, rh, area = (int(v) for v in stats[i])
+            mean_error = float(error_sum[i] / area)
+            frame_area = area * scale * scale
+            regions.append(ShadingRegion(
+                kind, x * scale, y * scale, min(rw * scale, w - x * scale),
+                min(rh * scale, h - y * scale), frame_area, round(mean_error, 2),
+                round(frame_area * mean_error, 1)))
+    return regions
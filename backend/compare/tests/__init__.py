@@ -0,0 +1,2 @@
+# backend/compare/tests/__init__.py
+"""Test package for compare module."""
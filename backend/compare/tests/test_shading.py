@@ -0,0 +1,143 @@
+"""Tests for shading comparison."""
+
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from ..shading import (
+    ShadingReference,
+    compare_shading,
+    local_statistics,
+    prepare_shading_reference,
+    value_map,
+)
+
+SIZE = 1080
+
+
+def page(fill=255):
+    return np.full((SIZE, SIZE, 3), fill, dtype=np.uint8)
+
+
+def stripes(img, x0, y0, x1, y1, period=24, ink=40):
+    """Hatch a rectangle with vertical stripes (textured shading)."""
+    for x in range(x0, x1, period):
+        cv2.rectangle(img, (x, y0), (min(x + period // 2 - 1, x1), y1), (ink, ink, ink), -1)
+    return img
+
+
+def naive_stats(gray, window):
+    """The prototype's per-pixel loop: mean and std of a reflect-padded patch."""
+    pad = window // 2
+    padded = cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_REFLECT)
+    h, w = gray.shape
+    patches = [[padded[y:y + window, x:x + window] for x in range(w)] for y in range(h)]
+    return (np.array([[p.mean() for p in row] for row in patches]),
+            np.array([[p.std() for p in row] for row in patches]))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    img = page()
+    cv2.rectangle(img, (100, 100), (400, 400), (90, 90, 90), -1)
+    stripes(img, 600, 600, 900, 900)
+    return value_map(img)
+
+
+def find(result, kind, point):
+    x, y = point
+    return [r for r in result.regions if r.kind == kind
+            and r.x <= x < r.x + r.width and r.y <= y < r.y + r.height]
+
+
+class TestLocalStatistics:
+    """Test integral-image window statistics."""
+    
+    @pytest.mark.parametrize("window", [1, 4, 5, 16])
+    def test_matches_per_pixel_loop(self, window):
+        gray = np.random.default_rng(window).integers(0, 256, (33, 40), dtype=np.uint8)
+        stats = local_statistics(gray, [window, 16])[window]
+        mean, std = naive_stats(gray, window)
+        
+        assert np.allclose(stats.mean, mean, atol=1e-3)
+        assert np.allclose(stats.contrast, std, atol=1e-3)
+        assert np.allclose(stats.variance, std ** 2, atol=0.05)
+    
+    def test_all_windows_in_one_call(self):
+        gray = np.random.default_rng(0).integers(0, 256, (64, 64), dtype=np.uint8)
+        stats = local_statistics(gray, [32, 8, 8, 2])
+        
+        assert sorted(stats) == [2, 8, 32]
+        assert all(s.mean.shape == gray.shape and s.mean.dtype == np.float32
+                   for s in stats.values())
+    
+    @pytest.mark.parametrize("windows", [[], [0], [65]])
+    def test_invalid_windows(self, windows):
+        with pytest.raises(ValueError):
+            local_statistics(np.zeros((64, 64), dtype=np.uint8), windows)
+
+
+class TestCompareShading:
+    """Test shading scores and error regions."""
+    
+    def test_matching_drawing_has_no_errors(self, reference):
+        img = page(240)
+        cv2.rectangle(img, (100, 100), (400, 400), (85, 85, 85), -1)
+        stripes(img, 600, 600, 900, 900, ink=45)
+        result = compare_shading(img, reference)
+        
+        assert result.regions == []
+        assert result.error_fraction == 0.0
+        # Off-white paper is 15 levels darker everywhere
+        assert result.value_error < 20
+    
+    def test_too_light_and_too_dark(self, reference):
+        img = page()
+        cv2.rectangle(img, (100, 100), (400, 400), (220, 220, 220), -1)
+        stripes(img, 600, 600, 900, 900)
+        cv2.circle(img, (800, 250), 80, (30, 30, 30), -1)
+        result = compare_shading(img, reference)
+        
+        assert find(result, "too_light", (250, 250))
+        assert find(result, "too_dark", (800, 250))
+        assert result.regions[0].kind == "too_light"
+        assert result.regions[0].mean_error > 80
+    
+    def test_flat_fill_instead_of_texture(self, reference):
+        img = page()
+        cv2.rectangle(img, (100, 100), (400, 400), (90, 90, 90), -1)
+        # Same average tone as the hatching, but no texture
+        cv2.rectangle(img, (600, 600), (900, 900), (148, 148, 148), -1)
+        result = compare_shading(img, reference)
+        
+        assert find(result, "too_flat", (750, 750))
+        assert not find(result, "too_dark", (750, 750))
+        assert not find(result, "too_light", (750, 750))
+    
+    def test_read_only_values_are_prepared_once(self, reference):
+        values = reference.copy()
+        values.flags.writeable = False
+        
+        assert prepare_shading_reference(values) is prepare_shading_reference(values)
+        assert prepare_shading_reference(values, (32,)).windows == (32,)
+        assert prepare_shading_reference(values.copy()) is not prepare_shading_reference(values)
+    
+    def test_prepared_reference_matches_value_map(self, reference):
+        img = page()
+        cv2.rectangle(img, (100, 100), (400, 400), (200, 200, 200), -1)
+        
+        assert (compare_shading(img, ShadingReference(reference)).to_dict()
+                == compare_shading(img, reference).to_dict())
+    
+    def test_size_mismatch(self, reference):
+        with pytest.raises(ValueError):
+            compare_shading(np.zeros((540, 540, 3), dtype=np.uint8), reference)
+    
+    def test_to_dict_is_json_serializable(self, reference):
+        result = compare_shading(page(), reference)
+        data = json.loads(json.dumps(result.to_dict()))
+        
+        assert {"kind", "x", "y", "width", "height", "area", "mean_error",
+                "severity"} <= set(data["regions"][0])
@@ -0,0 +1,176 @@
+"""Tests for stroke comparison."""
+
+import json
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ..strokes import (
+    DEFAULT_TOLERANCE,
+    PreparedReference,
+    StrokeTracker,
+    compare_strokes,
+    detect_edges,
+    prepare_reference,
+)
+
+SIZE = 1080
+
+
+def drawing(shapes, ink=(60, 60, 60), paper=(235, 238, 240), offset=(0, 0)):
+    """Render line shapes ("circle", "box", "line") like a pencil drawing."""
+    img = np.full((SIZE, SIZE, 3), paper, dtype=np.uint8)
+    dx, dy = offset
+    for shape in shapes:
+        if shape == "circle":
+            cv2.circle(img, (300 + dx, 300 + dy), 150, ink, 3, cv2.LINE_AA)
+        elif shape == "box":
+            cv2.rectangle(img, (600 + dx, 550 + dy), (900 + dx, 850 + dy), ink, 3, cv2.LINE_AA)
+        elif shape == "line":
+            cv2.line(img, (150 + dx, 800 + dy), (450 + dx, 950 + dy), ink, 3, cv2.LINE_AA)
+    return img
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return PreparedReference.from_image(drawing(["circle", "box"], ink=(0, 0, 0),
+                                                paper=(255, 255, 255)))
+
+
+def contains(region, point):
+    x, y = point
+    return (region.x <= x < region.x + region.width
+            and region.y <= y < region.y + region.height)
+
+
+class TestPreparedReference:
+    """Test the precomputed reference side."""
+    
+    def test_distance_is_zero_on_edges(self, reference):
+        assert len(reference.edge_index) > 0
+        assert np.all(reference.distance.ravel()[reference.edge_index] == 0)
+        # Circle centre is ~150px from the nearest stroke
+        assert 140 < reference.distance[300, 300] < 155
+    
+    def test_rejects_non_edge_map(self):
+        with pytest.raises(ValueError):
+            PreparedReference(np.zeros((10, 10, 3), dtype=np.uint8))
+    
+    def test_read_only_edges_are_prepared_once(self, reference):
+        edges = reference.edges.copy()
+        edges.flags.writeable = False
+        assert prepare_reference(edges) is prepare_reference(edges)
+        
+        writable = reference.edges.copy()
+        assert prepare_reference(writable) is not prepare_reference(writable)
+        
+        # A read-only view can still change through its writable base
+        view = writable[:]
+        view.flags.writeable = False
+        assert prepare_reference(view) is not prepare_reference(view)
+
+
+class TestCompareStrokes:
+    """Test scores and error regions."""
+    
+    def test_matching_drawing_scores_high(self, reference):
+        result = compare_strokes(drawing(["circle", "box"]), reference)
+        
+        assert result.score > 0.95
+        assert result.regions == []
+        assert result.missing_distance < 1.5
+    
+    def test_small_offset_is_tolerated(self, reference):
+        result = compare_strokes(drawing(["circle", "box"], offset=(3, -2)), reference)
+        
+        assert result.score > 0.9
+        assert result.regions == []
+    
+    def test_missing_stroke_is_located(self, reference):
+        result = compare_strokes(drawing(["circle"]), reference)
+        
+        assert result.precision > 0.95
+        assert 0.2 < result.recall < 0.7
+        assert result.regions[0].kind == "missing"
+        assert contains(result.regions[0], (750, 700))
+        assert all(r.kind == "missing" for r in result.regions)
+    
+    def test_extra_stroke_is_located(self, reference):
+        result = compare_strokes(drawing(["circle", "box", "line"]), reference)
+        
+        assert result.recall > 0.95
+        assert result.precision < 0.9
+        extra = [r for r in result.regions if r.kind == "extra"]
+        assert len(extra) == 1
+        assert contains(extra[0], (300, 875))
+        assert extra[0].mean_distance > DEFAULT_TOLERANCE
+        assert extra[0].severity == pytest.approx(extra[0].pixels * extra[0].mean_distance,
+                                                  rel=0.01)
+    
+    def test_blank_page(self, reference):
+        result = compare_strokes(drawing([]), reference)
+        
+        assert result.recall == 0.0
+        assert result.score == 0.0
+        assert {r.kind for r in result.regions} == {"missing"}
+    
+    def test_accepts_edge_map(self, reference):
+        img = drawing(["circle"])
+        from_edges = compare_strokes(img, reference.edges)
+        
+        assert from_edges.to_dict() == compare_strokes(img, reference).to_dict()
+    
+    def test_size_mismatch(self, reference):
+        with pytest.raises(ValueError):
+            compare_strokes(np.zeros((540, 540, 3), dtype=np.uint8), reference)
+    
+    def test_to_dict_is_json_serializable(self, reference):
+        result = compare_strokes(drawing(["circle", "line"]), reference)
+        data = json.loads(json.dumps(result.to_dict()))
+        
+        assert {"kind", "x", "y", "width", "height", "pixels", "mean_distance",
+                "severity"} <= set(data["regions"][0])
+    
+    def test_fast_enough_for_every_capture(self, reference):
+        img = drawing(["circle", "line"])
+        compare_strokes(img, reference)
+        start = time.perf_counter()
+        for _ in range(5):
+            compare_strokes(img, reference)
+        # Generous bound for slow CI machines; typically a few milliseconds
+        assert (time.perf_counter() - start) / 5 < 0.25
+
+
+class TestStrokeTracker:
+    """Test incremental updates of the drawn side."""
+    
+    def test_full_update_matches_compare_strokes(self, reference):
+        img = drawing(["circle", "line"])
+        tracker = StrokeTracker()
+        tracker.update(img)
+        
+        assert tracker.compare(reference) == compare_strokes(img, reference)
+    
+    def test_region_updates_match_full_recompute(self, reference):
+        tracker = StrokeTracker()
+        tracker.update(drawing(["circle"]))
+        
+        # Each update only changes the pixels inside its region
+        tracker.update(drawing(["circle", "line"]), [(140, 790, 320, 170)])
+        img = drawing(["circle", "line", "box"])
+        tracker.update(img, [(590, 540, 320, 320)])
+        
+        assert np.array_equal(tracker.edges, detect_edges(img))
+        assert tracker.compare(reference) == compare_strokes(img, reference)
+    
+    def test_compare_before_update(self, reference):
+        with pytest.raises(ValueError):
+            StrokeTracker().compare(reference)
+
+
+def test_detect_edges_accepts_grayscale():
+    img = drawing(["box"])
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    assert np.array_equal(detect_edges(img), detect_edges(gray))
@@ -0,0 +1,51 @@
+"""
+MASTER-STROKE Preprocessing Module
+
+Server-side versions of the sketch preprocessing dashboard's algorithms,
+with parameter sweeps that run many combinations of one algorithm in
+parallel while sharing their common intermediates.
+"""
+
+from .workspace import Workspace
+from .catalogue import (
+    ALGORITHMS,
+    Algorithm,
+    Param,
+    apply_algorithm,
+    get_algorithm,
+    multi_otsu_thresholds,
+    otsu_thresholds,
+)
+from .sweep import (
+    run_sweep,
+    SweepExecutor,
+    SweepBusyError,
+    apply_pipeline,
+    expand_grid,
+    preview_combinations,
+    encode_image,
+    Combination,
+    SweepItem,
+    MAX_COMBINATIONS,
+)
+
+__all__ = [
+    "Workspace",
+    "ALGORITHMS",
+    "Algorithm",
+    "Param",
+    "apply_algorithm",
+    "get_algorithm",
+    "multi_otsu_thresholds",
+    "otsu_thresholds",
+    "run_sweep",
+    "SweepExecutor",
+    "SweepBusyError",
+    "apply_pipeline",
+    "expand_grid",
+    "preview_combinations",
+    "encode_image",
+    "Combination",
+    "SweepItem",
+    "MAX_COMBINATIONS",
+]
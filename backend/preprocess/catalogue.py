@@ -0,0 +1,690 @@
+"""Preprocessing algorithm catalogue.
+
+OpenCV/NumPy versions of the algorithms offered by the sketch preprocessing
+dashboard, under the same keys and with the same parameters, so the
+dashboard can run them (and sweep their parameters) on the server instead
+of in per-pixel JavaScript loops.
+
+Every algorithm takes a ``Workspace`` and a dict of resolved parameters and
+returns a uint8 image: BGR for filters that keep colour, grayscale
+otherwise. Binarizations give 255 for paper and 0 for ink; edge and line
+maps are white on black. Intermediates (grayscale, blurs, local statistics,
+Otsu, Canny, Fourier spectrum) come from the workspace, so combinations of
+a parameter sweep share them.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .workspace import Workspace
+
+_BOOL_OPTIONS = ("true", "false")
+
+
+@dataclass(frozen=True)
+class Param:
+    """Definition of one algorithm parameter (mirrors the dashboard's).
+
+    Attributes:
+        default: Default value
+        minimum, maximum: Allowed range of numeric parameters
+        step: Slider step of numeric parameters; an integer step (with an
+            integer default) makes the parameter an integer
+        options: Allowed values of choice parameters
+        preview: Values the dashboard previews in parameter sweeps
+        label: Display label
+    """
+    default: Any
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    step: Optional[float] = None
+    options: Optional[Tuple[str, ...]] = None
+    preview: Tuple[Any, ...] = ()
+    label: str = ""
+
+    @property
+    def integer(self) -> bool:
+        """True for integer-valued numeric parameters."""
+        return (self.options is None and isinstance(self.default, int)
+                and (self.step is None or float(self.step).is_integer()))
+
+    def coerce(self, name: str, value: Any) -> Any:
+        """Validate ``value`` and convert it to the parameter's type.
+
+        Raises:
+            ValueError: If the value is not an allowed option or is out of range
+        """
+        if self.options is not None:
+            text = str(value).lower() if isinstance(value, bool) else str(value)
+            if text not in self.options:
+                raise ValueError(f"{name} must be one of {list(self.options)}, got {value!r}")
+            return text
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+        if not math.isfinite(number) or (
+                self.minimum is not None and number < self.minimum) or (
+                self.maximum is not None and number > self.maximum):
+            raise ValueError(f"{name} must be in [{self.minimum}, {self.maximum}], got {value!r}")
+        return int(round(number)) if self.integer else number
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form, in the dashboard's parameter format."""
+        spec: Dict[str, Any] = {"default": self.default, "label": self.label,
+                                "previewValues": list(self.preview)}
+        if self.options is not None:
+            spec["options"] = list(self.options)
+        else:
+            spec.update(min=self.minimum, max=self.maximum, step=self.step)
+        return spec
+
+
+@dataclass(frozen=True)
+class Algorithm:
+    """A catalogue entry.
+
+    Attributes:
+        name: Display name
+        category: Dashboard category
+        description: One-line description
+        func: Implementation, called with a workspace and resolved parameters
+        params: Parameter definitions by name
+    """
+    name: str
+    category: str
+    description: str
+    func: Callable[[Workspace, Dict[str, Any]], np.ndarray]
+    params: Dict[str, Param] = field(default_factory=dict)
+
+    def resolve(self, params: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """Complete ``params`` with defaults and validate them.
+
+        Raises:
+            ValueError: If a parameter is unknown or invalid
+        """
+        params = params or {}
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {sorted(unknown)}")
+        return {name: spec.coerce(name, params.get(name, spec.default))
+                for name, spec in self.params.items()}
+
+    def apply(self, source: Union[Workspace, np.ndarray],
+              params: Optional[Mapping[str, Any]] = None) -> np.ndarray:
+        """Run the algorithm on a workspace or image.
+
+        Raises:
+            ValueError: If a parameter is unknown or invalid
+        """
+        workspace = source if isinstance(source, Workspace) else Workspace(source)
+        return self.func(workspace, self.resolve(params))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form, in the dashboard's algorithm format."""
+        return {"name": self.name, "category": self.category, "description": self.description,
+                "params": {name: spec.to_dict() for name, spec in self.params.items()}}
+
+
+def get_algorithm(key: str) -> Algorithm:
+    """Catalogue entry for ``key``.
+
+    Raises:
+        ValueError: If the algorithm is unknown
+    """
+    algorithm = ALGORITHMS.get(key)
+    if algorithm is None:
+        raise ValueError(f"Unknown algorithm: {key}")
+    return algorithm
+
+
+def apply_algorithm(key: str, source: Union[Workspace, np.ndarray],
+                    params: Optional[Mapping[str, Any]] = None) -> np.ndarray:
+    """Run catalogue algorithm ``key`` on a workspace or image.
+
+    Raises:
+        ValueError: If the algorithm or a parameter is unknown or invalid
+    """
+    return get_algorithm(key).apply(source, params)
+
+
+# Basic
+
+
+def _grayscale(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return ws.gray(p["method"], (p["redWeight"], p["greenWeight"], p["blueWeight"]))
+
+
+def _gamma_correction(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    lut = np.power(np.arange(256) / 255.0, 1.0 / p["gamma"]) * 255.0
+    return cv2.LUT(ws.image, np.clip(lut + 0.5, 0, 255).astype(np.uint8))
+
+
+# Smoothing
+
+
+def _gaussian_blur(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return ws.blur(p["kernelSize"], p["sigma"])
+
+
+def _median_filter(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return cv2.medianBlur(ws.image, p["kernelSize"] | 1)
+
+
+def _bilateral_filter(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return cv2.bilateralFilter(ws.gray(), p["d"], p["sigmaColor"], p["sigmaSpace"],
+                               borderType=cv2.BORDER_REPLICATE)
+
+
+def _anisotropic_diffusion(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Perona-Malik diffusion; each iteration is a handful of whole-image ops."""
+    img = ws.gray().astype(np.float32)
+    kappa_sq = float(p["kappa"]) ** 2
+    gamma = float(p["gamma"])
+    for _ in range(p["iterations"]):
+        padded = cv2.copyMakeBorder(img, 1, 1, 1, 1, cv2.BORDER_REPLICATE)
+        flux = np.zeros_like(img)
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            diff = padded[1 + dy:padded.shape[0] - 1 + dy, 1 + dx:padded.shape[1] - 1 + dx] - img
+            flux += np.exp(-(diff * diff) / kappa_sq) * diff
+        img += gamma * flux
+    return np.clip(img + 0.5, 0, 255).astype(np.uint8)
+
+
+def _wiener_filter(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Adaptive Wiener filter over 5×5 windows (noise as a fraction of full-scale variance)."""
+    mean, variance = ws.local_stats(5)
+    noise = float(p["estimatedNoise"]) * 255.0 ** 2
+    gain = np.maximum(variance - noise, 0) / np.maximum(variance, noise)
+    out = mean + gain * (ws.gray().astype(np.float32) - mean)
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+
+# Enhancement
+
+
+def _unsharp_mask(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    radius = p["radius"]
+    blurred = ws.blur(math.ceil(radius * 2), radius)
+    amount = p["amount"]
+    sharpened = cv2.addWeighted(ws.image, 1 + amount, blurred, -amount, 0)
+    # Only pixels differing from their blur by more than the threshold change
+    changed = cv2.absdiff(ws.image, blurred) > p["threshold"]
+    return np.where(changed, sharpened, ws.image)
+
+
+def _clahe(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    grid = p["tileGridSize"]
+    return cv2.createCLAHE(clipLimit=p["clipLimit"], tileGridSize=(grid, grid)).apply(ws.gray())
+
+
+# Edge detection
+
+
+def _canny(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return ws.canny(p["lowThreshold"], p["highThreshold"], p["gaussianKernel"],
+                    p["L2gradient"] == "true")
+
+
+def _sobel_edges(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    ksize = p["ksize"] | 1
+    gx, gy = ws.gradients(ksize)
+    if p["direction"] == "horizontal":
+        magnitude = np.abs(gx)
+    elif p["direction"] == "vertical":
+        magnitude = np.abs(gy)
+    else:
+        magnitude = cv2.magnitude(gx, gy)
+    # Thresholds are in units of the 3×3 kernel's response
+    limit = p["threshold"] / _derivative_gain(1, 3) * _derivative_gain(1, ksize)
+    return cv2.threshold(magnitude, limit, 255, cv2.THRESH_BINARY)[1].astype(np.uint8)
+
+
+def _laplacian_edges(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    ksize = p["ksize"] | 1
+    response = cv2.Laplacian(ws.gray(), cv2.CV_32F, ksize=ksize, borderType=cv2.BORDER_REPLICATE)
+    # Thresholds are in units of the 4-neighbour kernel's response
+    limit = p["threshold"] * _derivative_gain(2, ksize) / _derivative_gain(2, 1)
+    return cv2.threshold(np.abs(response), limit, 255, cv2.THRESH_BINARY)[1].astype(np.uint8)
+
+
+def _derivative_gain(order: int, ksize: int) -> float:
+    """Response of OpenCV's derivative kernel to a unit ramp (order 1) or
+    half parabola (order 2), relative to a unit-gain difference."""
+    if ksize == 1:
+        # Unsmoothed [-1, 0, 1] and [1, -2, 1] kernels
+        return 2.0
+    kx, ky = cv2.getDerivKernels(order, 0, ksize)
+    offsets = np.arange(ksize) - ksize // 2
+    return float(np.sum(kx.ravel() * offsets ** order) * np.sum(ky))
+
+
+def _canny_fusion(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Canny edges combined with the Otsu binarization (pixelwise maximum)."""
+    return cv2.max(ws.canny(p["lowThreshold"], p["highThreshold"], 5, True), ws.otsu())
+
+
+def _hough_lines(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    edges = ws.canny(50, 150, 5, True)
+    lines = cv2.HoughLinesP(edges, p["rho"], math.radians(p["theta"]), p["threshold"],
+                            minLineLength=p["minLineLength"], maxLineGap=p["maxLineGap"])
+    out = np.zeros_like(edges)
+    if lines is not None:
+        cv2.polylines(out, lines.reshape(-1, 2, 2), False, 255, 2)
+    return out
+
+
+# Morphology
+
+
+_KERNEL_SHAPES = {"ellipse": cv2.MORPH_ELLIPSE, "rectangle": cv2.MORPH_RECT,
+                  "cross": cv2.MORPH_CROSS}
+_MORPH_OPS = {"opening": cv2.MORPH_OPEN, "closing": cv2.MORPH_CLOSE,
+              "gradient": cv2.MORPH_GRADIENT, "tophat": cv2.MORPH_TOPHAT,
+              "blackhat": cv2.MORPH_BLACKHAT, "dilation": cv2.MORPH_DILATE,
+              "erosion": cv2.MORPH_ERODE}
+
+
+def _morphology(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    size = p["kernelSize"]
+    kernel = cv2.getStructuringElement(_KERNEL_SHAPES[p["kernelShape"]], (size, size))
+    return cv2.morphologyEx(ws.gray(), _MORPH_OPS[p["operation"]], kernel,
+                            iterations=p["iterations"])
+
+
+def _top_hat(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return _morphology(ws, {"operation": "tophat", "kernelSize": p["kernelSize"],
+                            "kernelShape": "ellipse", "iterations": 1})
+
+
+def _black_hat(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    return _morphology(ws, {"operation": "blackhat", "kernelSize": p["kernelSize"],
+                            "kernelShape": "ellipse", "iterations": 1})
+
+
+def _skeletonization(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Skeleton of the ink (dark) strokes of the Otsu binarization."""
+    ink = cv2.bitwise_not(ws.otsu())
+    method = p["method"]
+    if method != "thin" and hasattr(cv2, "ximgproc"):
+        kind = (cv2.ximgproc.THINNING_ZHANGSUEN if method == "zhang-suen"
+                else cv2.ximgproc.THINNING_GUOHALL)
+        return cv2.ximgproc.thinning(ink, thinningType=kind)
+
+    # Morphological skeleton ("thin", or without opencv-contrib): union of
+    # the erosion residues, one whole-image step per iteration
+    kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+    skeleton = np.zeros_like(ink)
+    for _ in range(p["iterations"]):
+        eroded = cv2.erode(ink, kernel)
+        cv2.bitwise_or(skeleton, cv2.subtract(ink, cv2.dilate(eroded, kernel)), skeleton)
+        if not cv2.countNonZero(eroded):
+            break
+        ink = eroded
+    return skeleton
+
+
+# Thresholding
+
+
+def _sauvola(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    mean, variance = ws.local_stats(p["windowSize"])
+    threshold = mean * (1 + p["k"] * (cv2.sqrt(variance) / 128.0 - 1))
+    return ((ws.gray() > threshold) * np.uint8(255)).astype(np.uint8)
+
+
+def _adaptive_threshold(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    method = (cv2.ADAPTIVE_THRESH_MEAN_C if p["adaptiveMethod"] == "mean"
+              else cv2.ADAPTIVE_THRESH_GAUSSIAN_C)
+    kind = cv2.THRESH_BINARY if p["thresholdType"] == "binary" else cv2.THRESH_BINARY_INV
+    return cv2.adaptiveThreshold(ws.gray(), p["maxValue"], method, kind,
+                                 max(3, p["blockSize"] | 1), p["C"])
+
+
+def _otsu_threshold(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    binary = ws.otsu()
+    return binary if p["thresholdType"] == "binary" else cv2.bitwise_not(binary)
+
+
+def _multi_otsu(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Quantize to ``classes`` evenly spaced levels at the multi-level Otsu thresholds."""
+    classes = p["classes"]
+    thresholds = ws.memo(("multi_otsu", classes),
+                         lambda: multi_otsu_thresholds(ws.histogram(), classes))
+    levels = np.linspace(0, 255, classes).round().astype(np.uint8)
+    lut = levels[np.searchsorted(thresholds, np.arange(256), side="left")]
+    return cv2.LUT(ws.gray(), lut)
+
+
+def _multi_scale_otsu(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Otsu threshold per ``tileSize`` tile, all tiles solved at once."""
+    gray = ws.gray()
+    tile = p["tileSize"]
+    h, w = gray.shape
+    tiles_x = -(-w // tile)
+    tile_ids = ws.memo(("tile_ids", tile), lambda: (
+        (np.arange(h) // tile)[:, None] * tiles_x + (np.arange(w) // tile)[None, :]).ravel())
+    count = -(-h // tile) * tiles_x
+    # One histogram row per tile, from a single bincount
+    histograms = np.bincount(tile_ids * 256 + gray.ravel(),
+                             minlength=count * 256).reshape(count, 256)
+    thresholds = otsu_thresholds(histograms).astype(np.uint8)
+    return ((gray.ravel() > thresholds[tile_ids]).reshape(h, w) * np.uint8(255)).astype(np.uint8)
+
+
+def otsu_thresholds(histograms: np.ndarray) -> np.ndarray:
+    """Otsu threshold of each histogram row (values above it are foreground).
+
+    Rows with a single occupied bin get threshold 0.
+    """
+    hist = np.atleast_2d(histograms).astype(np.float64)
+    levels = np.arange(hist.shape[1], dtype=np.float64)
+    weight = np.cumsum(hist, axis=1)
+    total = weight[:, -1:]
+    mass = np.cumsum(hist * levels, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_low = mass / weight
+        mean_high = (mass[:, -1:] - mass) / (total - weight)
+        between = weight * (total - weight) * (mean_low - mean_high) ** 2
+    between = np.where((weight > 0) & (total - weight > 0), between, 0)
+    return np.argmax(between, axis=1)
+
+
+def multi_otsu_thresholds(histogram: np.ndarray, classes: int) -> np.ndarray:
+    """Thresholds splitting a histogram into ``classes`` classes with the
+    highest between-class variance.
+
+    Solved exactly by dynamic programming over bins, O(classes × bins²)
+    with each step vectorized. Values <= threshold ``i`` (and above
+    threshold ``i-1``) belong to class ``i``.
+
+    Returns:
+        ``classes - 1`` increasing thresholds (int)
+    """
+    hist = np.asarray(histogram, dtype=np.float64)
+    bins = len(hist)
+    weight = np.concatenate(([0.0], np.cumsum(hist)))
+    mass = np.concatenate(([0.0], np.cumsum(hist * np.arange(bins))))
+    # score[a, b]: contribution sum^2 / count of the class of bins a..b-1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        count = weight[None, :] - weight[:, None]
+        score = np.where(count > 0, (mass[None, :] - mass[:, None]) ** 2 / count, 0.0)
+    score[np.tril_indices(bins + 1)] = -np.inf
+
+    # best[b]: best score of splitting bins 0..b-1 into the classes so far
+    best = score[0].copy()
+    choices = []
+    for _ in range(classes - 1):
+        candidates = best[:, None] + score
+        choices.append(np.argmax(candidates, axis=0))
+        best = candidates.max(axis=0)
+
+    # Walk the split points back from the last bin
+    thresholds = []
+    end = bins
+    for choice in reversed(choices):
+        end = int(choice[end])
+        thresholds.append(end - 1)
+    return np.array(sorted(thresholds), dtype=np.int64)
+
+
+# Shading removal
+
+
+def _local_variance(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """255 where the local variance exceeds the threshold (texture, strokes)."""
+    _, variance = ws.local_stats(p["windowSize"])
+    return ((variance > p["threshold"]) * np.uint8(255)).astype(np.uint8)
+
+
+def _intensity_variance(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Whiten flat (low-variance) areas, keeping strokes and texture."""
+    _, variance = ws.local_stats(p["kernelSize"])
+    keep = variance > p["varianceThreshold"]
+    if p["preserveEdges"] == "true":
+        keep |= ws.canny(50, 150, 5, True) > 0
+    return np.where(keep, ws.gray(), np.uint8(255))
+
+
+# Frequency domain
+
+
+def _fourier_high_pass(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """High-pass filter in the frequency domain, rescaled to 0-255."""
+    spectrum = ws.spectrum()
+    h, w = spectrum.shape[:2]
+    radius = ws.memo(("frequency_radius", h, w), lambda: np.sqrt(
+        np.fft.fftfreq(h)[:, None] ** 2 + np.fft.fftfreq(w)[None, :] ** 2).astype(np.float32))
+    cutoff = p["cutoffFreq"]
+    if p["filterType"] == "ideal":
+        response = (radius > cutoff).astype(np.float32)
+    elif p["filterType"] == "gaussian":
+        response = 1 - np.exp(-(radius ** 2) / (2 * cutoff ** 2))
+    else:  # Butterworth
+        with np.errstate(divide="ignore"):
+            response = 1 / (1 + (cutoff / radius) ** (2 * p["order"]))
+    filtered = cv2.idft(spectrum * response[:, :, None].astype(np.float32),
+                        flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+    return cv2.normalize(filtered, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+
+
+# Contours
+
+
+def _contour_detection(ws: Workspace, p: Dict[str, Any]) -> np.ndarray:
+    """Outlines of ink shapes filtered by area and perimeter, drawn on white."""
+    ink = cv2.bitwise_not(ws.otsu())
+    contours, _ = cv2.findContours(ink, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    kept = [c for c in contours
+            if p["minArea"] <= cv2.contourArea(c) <= p["maxArea"]
+            and cv2.arcLength(c, True) >= p["minPerimeter"]]
+    out = np.full_like(ink, 255)
+    thickness = cv2.FILLED if p["fillContours"] == "true" else p["thickness"]
+    cv2.drawContours(out, kept, -1, 0, thickness)
+    return out
+
+
+def _p(default: Any, minimum: Optional[float] = None, maximum: Optional[float] = None,
+       step: Optional[float] = None, preview: Tuple[Any, ...] = (), label: str = "") -> Param:
+    return Param(default, minimum, maximum, step, None, preview, label)
+
+
+def _choice(default: str, options: Tuple[str, ...], preview: Optional[Tuple[str, ...]] = None,
+            label: str = "") -> Param:
+    return Param(default, options=options, preview=options if preview is None else preview,
+                 label=label)
+
+
+# Algorithms by dashboard key. Parameters, ranges and preview values follow
+# the dashboard; topHat, blackHat, localVariance, multiScaleOtsu and
+# cannyFusion are the steps of its enhanced pipeline.
+ALGORITHMS: Dict[str, Algorithm] = {
+    "grayscale": Algorithm(
+        "Grayscale Conversion", "Basic", "Convert to grayscale using weighted RGB channels",
+        _grayscale, {
+            "method": _choice("luminance", ("luminance", "average", "lightness", "custom"),
+                              label="Conversion Method"),
+            "redWeight": _p(0.299, 0, 1, 0.001, (0.1, 0.299, 0.5, 0.8), "Red Weight"),
+            "greenWeight": _p(0.587, 0, 1, 0.001, (0.3, 0.587, 0.8), "Green Weight"),
+            "blueWeight": _p(0.114, 0, 1, 0.001, (0.05, 0.114, 0.3), "Blue Weight"),
+        }),
+    "gaussianBlur": Algorithm(
+        "Gaussian Blur", "Smoothing", "Smooth image with Gaussian kernel to reduce noise",
+        _gaussian_blur, {
+            "kernelSize": _p(5, 1, 15, 2, (1, 3, 7, 11, 15), "Kernel Size"),
+            "sigma": _p(1.4, 0.1, 5, 0.1, (0.3, 1.0, 2.0, 4.0), "Sigma"),
+        }),
+    "bilateralFilter": Algorithm(
+        "Bilateral Filter", "Smoothing", "Edge-preserving smoothing filter",
+        _bilateral_filter, {
+            "d": _p(9, 5, 15, 2, (5, 9, 15), "Diameter"),
+            "sigmaColor": _p(75, 10, 150, 5, (25, 75, 125), "Sigma Color"),
+            "sigmaSpace": _p(75, 10, 150, 5, (25, 75, 125), "Sigma Space"),
+        }),
+    "medianFilter": Algorithm(
+        "Median Filter", "Smoothing", "Remove salt-and-pepper noise while preserving edges",
+        _median_filter, {
+            "kernelSize": _p(5, 3, 9, 2, (3, 5, 7, 9), "Kernel Size"),
+        }),
+    "anisotropicDiffusion": Algorithm(
+        "Anisotropic Diffusion", "Smoothing", "Advanced edge-preserving smoothing",
+        _anisotropic_diffusion, {
+            "iterations": _p(10, 1, 20, 1, (5, 10, 15), "Iterations"),
+            "kappa": _p(30, 10, 100, 5, (20, 30, 50), "Diffusion Constant"),
+            "gamma": _p(0.2, 0.1, 0.3, 0.01, (0.1, 0.2, 0.3), "Rate of Diffusion"),
+        }),
+    "edgeDetection": Algorithm(
+        "Canny Edge Detection", "Edge Detection", "Multi-stage edge detection algorithm",
+        _canny, {
+            "lowThreshold": _p(50, 10, 150, 5, (20, 50, 80, 120), "Low Threshold"),
+            "highThreshold": _p(150, 50, 300, 10, (80, 150, 220, 280), "High Threshold"),
+            "gaussianKernel": _p(5, 3, 7, 2, (3, 5, 7), "Gaussian Kernel"),
+            "L2gradient": _choice("true", _BOOL_OPTIONS, label="L2 Gradient"),
+        }),
+    "sobelEdges": Algorithm(
+        "Sobel Edge Detection", "Edge Detection", "Gradient-based edge detection",
+        _sobel_edges, {
+            "ksize": _p(3, 1, 7, 2, (1, 3, 5, 7), "Kernel Size"),
+            "threshold": _p(100, 50, 200, 10, (60, 100, 140, 180), "Threshold"),
+            "direction": _choice("both", ("both", "horizontal", "vertical"), label="Direction"),
+        }),
+    "laplacianEdges": Algorithm(
+        "Laplacian Edge Detection", "Edge Detection", "Second derivative edge detection",
+        _laplacian_edges, {
+            "ksize": _p(3, 1, 7, 2, (1, 3, 5), "Kernel Size"),
+            "threshold": _p(30, 10, 100, 5, (20, 30, 50), "Threshold"),
+        }),
+    "cannyFusion": Algorithm(
+        "Canny Fusion", "Edge Detection", "Canny edges fused with an Otsu binarization",
+        _canny_fusion, {
+            "lowThreshold": _p(50, 10, 150, 5, (20, 50, 80, 120), "Low Threshold"),
+            "highThreshold": _p(150, 50, 300, 10, (80, 150, 220, 280), "High Threshold"),
+        }),
+    "morphology": Algorithm(
+        "Morphological Operations", "Morphology", "Shape-based image processing operations",
+        _morphology, {
+            "operation": _choice("closing", tuple(_MORPH_OPS),
+                                 ("opening", "closing", "gradient", "dilation", "erosion"),
+                                 "Operation"),
+            "kernelSize": _p(3, 1, 15, 2, (1, 3, 7, 11), "Kernel Size"),
+            "kernelShape": _choice("ellipse", tuple(_KERNEL_SHAPES), label="Kernel Shape"),
+            "iterations": _p(1, 1, 5, 1, (1, 2, 3, 4), "Iterations"),
+        }),
+    "topHat": Algorithm(
+        "Top-Hat", "Morphology", "Bright details smaller than the kernel (image minus opening)",
+        _top_hat, {
+            "kernelSize": _p(15, 3, 31, 2, (7, 15, 25), "Kernel Size"),
+        }),
+    "blackHat": Algorithm(
+        "Black-Hat", "Morphology", "Dark strokes thinner than the kernel (closing minus image)",
+        _black_hat, {
+            "kernelSize": _p(15, 3, 31, 2, (7, 15, 25), "Kernel Size"),
+        }),
+    "skeletonization": Algorithm(
+        "Skeletonization", "Morphology", "Reduce shapes to skeletal form",
+        _skeletonization, {
+            "method": _choice("zhang-suen", ("zhang-suen", "guo-hall", "thin"),
+                              label="Algorithm"),
+            "iterations": _p(20, 1, 50, 1, (10, 20, 30), "Max Iterations"),
+        }),
+    "sauvolaThreshold": Algorithm(
+        "Sauvola Thresholding", "Thresholding",
+        "Adaptive binarization using Sauvola's method for local thresholding.",
+        _sauvola, {
+            "windowSize": _p(63, 15, 75, 2, (15, 31, 51, 63, 75), "Window Size"),
+            "k": _p(0.2, 0.1, 0.5, 0.01, (0.1, 0.2, 0.3, 0.4, 0.5), "K Value"),
+        }),
+    "adaptiveThreshold": Algorithm(
+        "Adaptive Threshold", "Thresholding", "Local thresholding for varying illumination",
+        _adaptive_threshold, {
+            "maxValue": _p(255, 200, 255, 5, (200, 255), "Max Value"),
+            "adaptiveMethod": _choice("gaussian", ("mean", "gaussian"), label="Adaptive Method"),
+            "thresholdType": _choice("binary", ("binary", "binary_inv"), label="Threshold Type"),
+            "blockSize": _p(11, 3, 21, 2, (5, 9, 15, 21), "Block Size"),
+            "C": _p(2, 0, 20, 1, (0, 2, 8, 15), "Constant C"),
+        }),
+    "otsuThreshold": Algorithm(
+        "Otsu Threshold", "Thresholding", "Automatic global thresholding",
+        _otsu_threshold, {
+            "thresholdType": _choice("binary", ("binary", "binary_inv"), label="Threshold Type"),
+        }),
+    "multiOtsu": Algorithm(
+        "Multi-level Otsu", "Thresholding", "Multi-class thresholding",
+        _multi_otsu, {
+            "classes": _p(3, 2, 5, 1, (2, 3, 4), "Number of Classes"),
+        }),
+    "multiScaleOtsu": Algorithm(
+        "Multi-scale Otsu", "Thresholding", "Otsu thresholding per tile",
+        _multi_scale_otsu, {
+            "tileSize": _p(48, 16, 256, 8, (32, 48, 96, 192), "Tile Size"),
+        }),
+    "localVariance": Algorithm(
+        "Local Variance", "Shading Removal", "Mark textured and stroked areas by local variance",
+        _local_variance, {
+            "windowSize": _p(11, 3, 31, 2, (5, 11, 21), "Window Size"),
+            "threshold": _p(200, 10, 1000, 10, (100, 200, 400), "Variance Threshold"),
+        }),
+    "intensityVariance": Algorithm(
+        "Intensity Variance Filter", "Shading Removal",
+        "Remove regions with low intensity variance (flat shading)",
+        _intensity_variance, {
+            "kernelSize": _p(9, 5, 21, 2, (5, 9, 15, 21), "Kernel Size"),
+            "varianceThreshold": _p(200, 50, 500, 10, (75, 150, 300, 450), "Variance Threshold"),
+            "preserveEdges": _choice("true", _BOOL_OPTIONS, label="Preserve Edges"),
+        }),
+    "clahe": Algorithm(
+        "CLAHE (Contrast Enhancement)", "Enhancement",
+        "Contrast Limited Adaptive Histogram Equalization",
+        _clahe, {
+            "clipLimit": _p(3, 1, 10, 0.5, (2, 3, 5), "Clip Limit"),
+            "tileGridSize": _p(8, 4, 16, 2, (4, 8, 12), "Tile Grid Size"),
+        }),
+    "unsharpMask": Algorithm(
+        "Unsharp Masking", "Enhancement", "Enhance edge details and sharpness",
+        _unsharp_mask, {
+            "radius": _p(1.5, 0.5, 5, 0.1, (0.5, 1.5, 3.0, 5.0), "Radius"),
+            "amount": _p(1.5, 0.5, 3, 0.1, (0.5, 1.5, 2.5), "Amount"),
+            "threshold": _p(3, 0, 50, 1, (0, 3, 15, 30), "Threshold"),
+        }),
+    "gammaCorrection": Algorithm(
+        "Gamma Correction", "Enhancement", "Adjust image brightness and contrast",
+        _gamma_correction, {
+            "gamma": _p(1.0, 0.1, 3, 0.1, (0.3, 0.7, 1.0, 1.5, 2.2), "Gamma Value"),
+        }),
+    "fourierTransform": Algorithm(
+        "Fourier High-pass Filter", "Frequency", "Remove low-frequency components (backgrounds)",
+        _fourier_high_pass, {
+            "cutoffFreq": _p(0.1, 0.01, 0.5, 0.01, (0.05, 0.1, 0.2), "Cutoff Frequency"),
+            "filterType": _choice("butterworth", ("ideal", "butterworth", "gaussian"),
+                                  label="Filter Type"),
+            "order": _p(2, 1, 10, 1, (1, 2, 4), "Filter Order"),
+        }),
+    "houghLines": Algorithm(
+        "Hough Line Transform", "Line Detection", "Detect and enhance straight lines",
+        _hough_lines, {
+            "rho": _p(1, 1, 5, 1, (1, 2, 3), "Distance Resolution"),
+            "theta": _p(1, 1, 5, 1, (1, 2, 3), "Angle Resolution (degrees)"),
+            "threshold": _p(100, 50, 200, 10, (70, 100, 150), "Accumulator Threshold"),
+            "minLineLength": _p(50, 10, 100, 5, (30, 50, 80), "Min Line Length"),
+            "maxLineGap": _p(10, 1, 20, 1, (5, 10, 15), "Max Line Gap"),
+        }),
+    "contourDetection": Algorithm(
+        "Contour Detection & Filtering", "Contours",
+        "Find and filter contours by area, perimeter, etc.",
+        _contour_detection, {
+            "minArea": _p(100, 10, 2000, 10, (50, 100, 200), "Min Area"),
+            "maxArea": _p(10000, 1000, 50000, 100, (5000, 10000, 20000), "Max Area"),
+            "minPerimeter": _p(50, 10, 500, 10, (30, 50, 80), "Min Perimeter"),
+            "thickness": _p(2, 1, 5, 1, (1, 2, 3), "Line Thickness"),
+            "fillContours": _choice("false", _BOOL_OPTIONS, label="Fill Contours"),
+        }),
+    "wienerFilter": Algorithm(
+        "Wiener Filter", "Denoising", "Optimal linear filter for noise reduction",
+        _wiener_filter, {
+            "estimatedNoise": _p(0.01, 0.001, 0.1, 0.001, (0.005, 0.01, 0.02), "Noise Estimate"),
+        }),
+}
@@ -0,0 +1,474 @@
+"""Parameter sweeps: one algorithm, many parameter combinations, in parallel."""
+
+import itertools
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional,
+                    Sequence, Tuple)
+
+import cv2
+import numpy as np
+
+from .catalogue import Algorithm, get_algorithm
+from .workspace import Workspace
+
+# Largest number of combinations a grid may expand to
+MAX_COMBINATIONS = 256
+
+# Combinations previewed by default (the dashboard's 3×3 grid)
+PREVIEW_COMBINATIONS = 9
+
+# Encodes a result image to bytes, e.g. ``encode_image``
+Encoder = Callable[[np.ndarray], bytes]
+
+
+class SweepBusyError(RuntimeError):
+    """Raised when a sweep is started while its executor is at its admission limit.
+
+    Attributes:
+        retry_after: Suggested number of seconds before retrying
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Sweep executor is busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SweepExecutor:
+    """Bounded thread pool shared by concurrent sweeps.
+
+    Every sweep run on the executor submits its combinations to the same
+    ``workers`` threads, so concurrent sweeps share the cores instead of
+    each starting its own pool. A sweep reserves a slot per combination (at
+    most ``workers + max_queue``) before it starts, and keeps no more
+    combinations running or queued than it reserved, submitting the rest as
+    results come in. If the slots are not free, ``run_sweep`` raises
+    ``SweepBusyError`` before submitting anything.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None) -> None:
+        """Create an executor.
+
+        Args:
+            workers: Number of threads (default: CPU count)
+            max_queue: Combinations allowed to wait for a thread before new
+                sweeps are turned away (default: 2 × workers)
+
+        Raises:
+            ValueError: If sizes are invalid
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = 2 * self.workers if max_queue is None else max_queue
+        if self.workers < 1 or self.max_queue < 0:
+            raise ValueError("workers must be >= 1 and max_queue >= 0")
+        self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                        thread_name_prefix="preprocess-sweep")
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_time = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """Most combinations running or queued at once, over all sweeps."""
+        return self.workers + self.max_queue
+
+    def reserve(self, combinations: int) -> int:
+        """Reserve slots for a new sweep's combinations.
+
+        Args:
+            combinations: Number of combinations in the sweep
+
+        Returns:
+            Slots reserved (at most ``capacity``): how many of the sweep's
+            combinations may be submitted at a time. Give them back with
+            ``release``.
+
+        Raises:
+            SweepBusyError: If that many slots are not free
+        """
+        slots = max(1, min(combinations, self.capacity))
+        with self._lock:
+            if self._reserved + slots > self.capacity:
+                self._rejected += 1
+                jobs = self._completed
+                mean_job = self._busy_time / jobs if jobs else 1.0
+                raise SweepBusyError(max(1, math.ceil(mean_job * self._reserved
+                                                      / self.workers)))
+            self._reserved += slots
+        return slots
+
+    def release(self, slots: int) -> None:
+        """Give back slots taken with ``reserve``."""
+        with self._lock:
+            self._reserved -= slots
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> "Future[Any]":
+        """Schedule ``func(*args)`` on the shared threads.
+
+        Callers keep within their reserved slots; ``submit`` itself does not
+        check capacity.
+        """
+        with self._lock:
+            self._in_flight += 1
+
+        def run() -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._busy_time += time.perf_counter() - start
+                    self._completed += 1
+                    self._in_flight -= 1
+
+        try:
+            future = self._pool.submit(run)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._finish)
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        """Admission counters."""
+        with self._lock:
+            return {"workers": self.workers, "capacity": self.capacity,
+                    "reserved": self._reserved, "in_flight": self._in_flight,
+                    "completed": self._completed, "rejected": self._rejected}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the threads."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _finish(self, future: "Future[Any]") -> None:
+        # Combinations cancelled before they started never ran ``run``
+        if future.cancelled():
+            with self._lock:
+                self._in_flight -= 1
+
+
+@dataclass
+class Combination:
+    """A set of parameter values to run.
+
+    Attributes:
+        params: Parameter values by name (missing ones take their defaults)
+        label: Display label
+    """
+    params: Dict[str, Any]
+    label: str = ""
+
+
+@dataclass
+class SweepItem:
+    """Outcome of one combination of a sweep.
+
+    Attributes:
+        index: Position of the combination in the input
+        params: Resolved parameters (all of them), or the requested ones if
+            they were invalid
+        label: Label of the combination
+        image: Result image, or None if it failed or was encoded
+        encoded: Encoded result, if an encoder was given
+        error: Error message if the combination failed
+        elapsed: Seconds from submission to completion
+    """
+    index: int
+    params: Dict[str, Any] = field(default_factory=dict)
+    label: str = ""
+    image: Optional[np.ndarray] = None
+    encoded: Optional[bytes] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True if the combination ran successfully."""
+        return self.error is None
+
+
+def encode_image(img: np.ndarray, fmt: str = "png", quality: int = 90) -> bytes:
+    """Encode a result image as PNG or JPEG.
+
+    Raises:
+        ValueError: If the format is unknown or encoding fails
+    """
+    if fmt == "png":
+        ok, buf = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    elif fmt in ("jpeg", "jpg"):
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    if not ok:
+        raise ValueError(f"Failed to encode {fmt}")
+    return buf.tobytes()
+
+
+def _label(params: Mapping[str, Any]) -> str:
+    return ", ".join(f"{name}: {value}" for name, value in params.items())
+
+
+def expand_grid(algorithm: Algorithm, grid: Mapping[str, Sequence[Any]],
+                max_combinations: int = MAX_COMBINATIONS) -> List[Combination]:
+    """Every combination of the values in ``grid`` (cartesian product).
+
+    Args:
+        algorithm: Algorithm the grid is for
+        grid: Values to try per parameter name; other parameters keep their
+            defaults (or the sweep's base parameters)
+        max_combinations: Limit on the number of combinations
+
+    Returns:
+        Combinations, varying the last parameter fastest
+
+    Raises:
+        ValueError: If a parameter is unknown, has no values, or the grid
+            has more than ``max_combinations`` combinations
+    """
+    unknown = set(grid) - set(algorithm.params)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {algorithm.name}: {sorted(unknown)}")
+    names = list(grid)
+    if any(not isinstance(grid[name], (list, tuple)) or not grid[name] for name in names):
+        raise ValueError("Every grid parameter needs a list of at least one value")
+    values = [list(grid[name]) for name in names]
+    count = int(np.prod([len(v) for v in values]))
+    if count > max_combinations:
+        raise ValueError(f"Grid has {count} combinations, over the limit of {max_combinations}")
+    combinations = []
+    for combo in itertools.product(*values):
+        params = dict(zip(names, combo))
+        combinations.append(Combination(params, _label(params)))
+    return combinations
+
+
+def preview_combinations(algorithm: Algorithm,
+                         max_combinations: int = PREVIEW_COMBINATIONS) -> List[Combination]:
+    """The dashboard's preview combinations of an algorithm's preview values.
+
+    Same selection as the dashboard: every value of a single parameter; the
+    corners, centre and edge midpoints of the grid of two; and for more
+    parameters the defaults, the all-minimal and all-maximal settings,
+    single-parameter variations and a balanced setting.
+    """
+    names = list(algorithm.params)
+    previews = [list(spec.preview) or [spec.default] for spec in algorithm.params.values()]
+    combinations: List[Combination] = []
+
+    if not names:
+        return [Combination({}, "Default settings")]
+
+    if len(names) == 1:
+        for value in previews[0][:max_combinations]:
+            combinations.append(Combination({names[0]: value}, f"{names[0]}: {value}"))
+        return combinations
+
+    if len(names) == 2:
+        first, second = previews
+        last1, last2 = len(first) - 1, len(second) - 1
+        mid1, mid2 = len(first) // 2, len(second) // 2
+        # Extremes and key contrasts first, then the rest of the grid
+        points = [(0, 0), (0, last2), (last1, 0), (last1, last2), (mid1, mid2)]
+        if max_combinations > 5:
+            points += [(0, mid2), (last1, mid2), (mid1, 0), (mid1, last2)]
+        points += [p for p in itertools.product(range(len(first)), range(len(second)))
+                   if p not in points]
+        for i, j in points[:max_combinations]:
+            params = {names[0]: first[i], names[1]: second[j]}
+            combinations.append(Combination(params, _label(params)))
+        return combinations
+
+    defaults = {name: spec.default for name, spec in algorithm.params.items()}
+    combinations.append(Combination(defaults, "Default settings"))
+    combinations.append(Combination({n: v[0] for n, v in zip(names, previews)},
+                                    "Minimal settings"))
+    combinations.append(Combination({n: v[-1] for n, v in zip(names, previews)},
+                                    "Maximal settings"))
+    for name, values in zip(names, previews):
+        for value in (values[0], values[-1]):
+            if len(combinations) >= max_combinations or value == defaults[name]:
+                continue
+            combinations.append(Combination({**defaults, name: value},
+                                            f"{name}: {value} (others default)"))
+    if len(combinations) < max_combinations:
+        combinations.append(Combination({n: v[len(v) // 2] for n, v in zip(names, previews)},
+                                        "Balanced settings"))
+    return combinations[:max_combinations]
+
+
+def apply_pipeline(image: np.ndarray,
+                   steps: Iterable[Mapping[str, Any]]) -> np.ndarray:
+    """Run catalogue algorithms in sequence.
+
+    Args:
+        image: Input image
+        steps: Steps like ``{"algorithm": "clahe", "params": {"clipLimit": 2}}``
+
+    Raises:
+        ValueError: If a step's algorithm or parameters are unknown or invalid
+    """
+    for step in steps:
+        if not isinstance(step, Mapping) or "algorithm" not in step:
+            raise ValueError(f"Pipeline step has no algorithm: {step!r}")
+        image = get_algorithm(step["algorithm"]).apply(image, step.get("params"))
+    return image
+
+
+def run_sweep(
+    image: np.ndarray,
+    algorithm: str,
+    combinations: Optional[Iterable[Combination]] = None,
+    base_params: Optional[Mapping[str, Any]] = None,
+    pipeline: Optional[Iterable[Mapping[str, Any]]] = None,
+    encode: Optional[Encoder] = None,
+    workers: Optional[int] = None,
+    executor: Optional[SweepExecutor] = None
+) -> Iterator[SweepItem]:
+    """Run an algorithm with many parameter combinations in parallel,
+    yielding each result as it finishes.
+
+    The ``pipeline`` steps run once, before the sweep. Every combination
+    then runs on the same ``Workspace``, so intermediates that do not depend
+    on the swept parameters (grayscale, blurs, local statistics for a
+    window, Otsu, ...) are computed once and shared. Items are yielded in
+    completion order; ``SweepItem.index`` gives each combination's input
+    position. A failing combination yields an item with ``error`` set and
+    does not stop the sweep.
+
+    Args:
+        image: Input BGR or grayscale uint8 image
+        algorithm: Catalogue key
+        combinations: Parameter combinations (default: the preview combinations)
+        base_params: Values for parameters the combinations leave out
+        pipeline: Steps applied before the sweep (see ``apply_pipeline``)
+        encode: Optional encoder run in the workers (e.g. ``encode_image``);
+            items then carry ``encoded`` instead of ``image``
+        workers: Thread count of the sweep's own pool (default: CPU count);
+            ignored with ``executor``
+        executor: Shared executor to run the combinations on instead of a
+            pool of the sweep's own
+
+    Returns:
+        Iterator of SweepItem
+
+    Raises:
+        ValueError: If the algorithm, the pipeline or the image is invalid
+            (raised by this call, before any combination runs)
+        SweepBusyError: If ``executor`` has no free slots for the sweep
+    """
+    entry = get_algorithm(algorithm)
+    combinations = list(preview_combinations(entry) if combinations is None else combinations)
+    if executor is None:
+        return _iterate_sweep(_prepare_workspace(image, pipeline), entry, combinations,
+                              dict(base_params or {}), encode,
+                              workers or os.cpu_count() or 1, None, len(combinations))
+
+    slots = executor.reserve(len(combinations))
+    try:
+        workspace = _prepare_workspace(image, pipeline)
+    except BaseException:
+        executor.release(slots)
+        raise
+    reservation = _Reservation(executor, slots)
+    items = _iterate_sweep(workspace, entry, combinations, dict(base_params or {}), encode,
+                           executor.workers, reservation, slots)
+    # Also give the slots back if the sweep is dropped without being iterated
+    weakref.finalize(items, reservation.release)
+    return items
+
+
+class _Reservation:
+    """Slots a sweep holds on a ``SweepExecutor``, released once."""
+
+    def __init__(self, executor: SweepExecutor, slots: int) -> None:
+        self.executor = executor
+        self.slots = slots
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.executor.release(self.slots)
+
+
+def _prepare_workspace(image: np.ndarray,
+                       pipeline: Optional[Iterable[Mapping[str, Any]]]) -> Workspace:
+    """Run the pre-sweep pipeline and wrap the result."""
+    if pipeline:
+        image = apply_pipeline(image, pipeline)
+    return Workspace(image)
+
+
+def _iterate_sweep(workspace: Workspace, algorithm: Algorithm,
+                   combinations: List[Combination], base: Dict[str, Any],
+                   encode: Optional[Encoder], workers: int,
+                   reservation: Optional[_Reservation], window: int) -> Iterator[SweepItem]:
+    """Generator behind ``run_sweep``, run once the workspace is ready.
+
+    At most ``window`` combinations are submitted at a time.
+    """
+    def run(params: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Optional[bytes]]:
+        result = algorithm.func(workspace, params)
+        if encode is not None:
+            return None, encode(result)
+        return result, None
+
+    pool: Optional[ThreadPoolExecutor] = None
+    submit: Callable[..., "Future[Any]"]
+    if reservation is None:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess-sweep")
+        submit = pool.submit
+    else:
+        submit = reservation.executor.submit
+    pending: Dict["Future[Any]", int] = {}
+    resolved: Dict[int, Dict[str, Any]] = {}
+    source = enumerate(combinations)
+    started = time.perf_counter()
+
+    try:
+        while True:
+            # Top up the window of submitted combinations
+            while len(pending) < window:
+                entry = next(source, None)
+                if entry is None:
+                    break
+                index, combination = entry
+                requested = {**base, **combination.params}
+                try:
+                    resolved[index] = algorithm.resolve(requested)
+                except ValueError as e:
+                    yield SweepItem(index, requested, combination.label, error=str(e))
+                    continue
+                pending[submit(run, resolved[index])] = index
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                item = SweepItem(index, resolved[index], combinations[index].label,
+                                 elapsed=time.perf_counter() - started)
+                try:
+                    item.image, item.encoded = future.result()
+                except Exception as e:
+                    item.error = str(e)
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if reservation is not None:
+            reservation.release()
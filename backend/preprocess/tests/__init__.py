@@ -0,0 +1,2 @@
+# backend/preprocess/tests/__init__.py
+"""Test package for preprocess module."""
@@ -0,0 +1,207 @@
+"""Tests for the preprocessing algorithm catalogue."""
+
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from ..catalogue import (
+    ALGORITHMS,
+    Param,
+    apply_algorithm,
+    get_algorithm,
+    multi_otsu_thresholds,
+    otsu_thresholds,
+)
+from ..workspace import Workspace
+
+
+def sketch(size=160, seed=0):
+    """Pencil-like strokes and a shaded patch on noisy paper."""
+    img = np.full((size, size, 3), 225, dtype=np.uint8)
+    cv2.line(img, (10, 20), (size - 20, size - 30), (30, 30, 30), 2)
+    cv2.circle(img, (size // 2, size // 2), size // 4, (60, 60, 60), 1)
+    cv2.rectangle(img, (20, size - 50), (60, size - 20), (140, 140, 140), -1)
+    noise = np.random.default_rng(seed).integers(0, 20, img.shape, dtype=np.uint8)
+    return cv2.add(img, noise)
+
+
+def naive_otsu(hist):
+    """The dashboard's Otsu loop (first maximum, strict comparison)."""
+    total = hist.sum()
+    total_sum = float(np.dot(np.arange(256), hist))
+    weight_b = sum_b = 0.0
+    best, threshold = 0.0, 0
+    for t in range(256):
+        weight_b += hist[t]
+        if weight_b == 0:
+            continue
+        weight_f = total - weight_b
+        if weight_f == 0:
+            break
+        sum_b += t * hist[t]
+        mean_b = sum_b / weight_b
+        mean_f = (total_sum - sum_b) / weight_f
+        between = weight_b * weight_f * (mean_b - mean_f) ** 2
+        if between > best:
+            best, threshold = between, t
+    return threshold
+
+
+class TestCatalogue:
+    """Test the catalogue entries and parameter handling."""
+    
+    @pytest.mark.parametrize("key", sorted(ALGORITHMS))
+    def test_defaults_run(self, key):
+        img = sketch()
+        out = apply_algorithm(key, img)
+        
+        assert out.dtype == np.uint8
+        assert out.shape[:2] == img.shape[:2]
+    
+    @pytest.mark.parametrize("key", sorted(ALGORITHMS))
+    def test_preview_values_are_valid(self, key):
+        algorithm = ALGORITHMS[key]
+        for name, spec in algorithm.params.items():
+            for value in spec.preview:
+                algorithm.resolve({name: value})
+        assert algorithm.to_dict()["params"].keys() == algorithm.params.keys()
+    
+    def test_grayscale_input(self):
+        gray = cv2.cvtColor(sketch(), cv2.COLOR_BGR2GRAY)
+        
+        assert apply_algorithm("gaussianBlur", gray).shape == gray.shape
+        assert np.array_equal(apply_algorithm("grayscale", gray), gray)
+    
+    def test_resolve_fills_defaults_and_coerces(self):
+        params = get_algorithm("edgeDetection").resolve({"lowThreshold": "40", "L2gradient": False})
+        
+        assert params == {"lowThreshold": 40, "highThreshold": 150, "gaussianKernel": 5,
+                          "L2gradient": "false"}
+        assert isinstance(params["lowThreshold"], int)
+        assert isinstance(get_algorithm("clahe").resolve({"clipLimit": 2})["clipLimit"], float)
+    
+    @pytest.mark.parametrize("params", [
+        {"nope": 1},
+        {"lowThreshold": 5},
+        {"lowThreshold": "abc"},
+        {"lowThreshold": float("nan")},
+        {"L2gradient": "maybe"},
+    ])
+    def test_invalid_params(self, params):
+        with pytest.raises(ValueError):
+            apply_algorithm("edgeDetection", sketch(), params)
+    
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            get_algorithm("structuredEdgeDetection")
+    
+    def test_param_dict_matches_dashboard_format(self):
+        assert Param(5, 1, 15, 2, preview=(1, 3), label="Kernel").to_dict() == {
+            "default": 5, "min": 1, "max": 15, "step": 2, "label": "Kernel",
+            "previewValues": [1, 3]}
+        assert Param("a", options=("a", "b"), preview=("a", "b")).to_dict()["options"] == ["a", "b"]
+
+
+class TestThresholds:
+    """Test thresholding algorithms against the dashboard's semantics."""
+    
+    def test_sauvola_matches_formula(self):
+        gray = cv2.cvtColor(sketch(48), cv2.COLOR_BGR2GRAY)
+        out = apply_algorithm("sauvolaThreshold", gray, {"windowSize": 15, "k": 0.3})
+        padded = cv2.copyMakeBorder(gray, 7, 7, 7, 7, cv2.BORDER_REPLICATE).astype(np.float64)
+        expected = np.zeros_like(gray)
+        for y, x in itertools.product(range(48), range(48)):
+            patch = padded[y:y + 15, x:x + 15]
+            threshold = patch.mean() * (1 + 0.3 * (patch.std() / 128 - 1))
+            expected[y, x] = 255 if gray[y, x] > threshold else 0
+        
+        # float32 statistics may flip pixels sitting exactly on the threshold
+        assert np.mean(out != expected) < 0.002
+    
+    def test_otsu_thresholds_match_dashboard_loop(self):
+        rng = np.random.default_rng(1)
+        hists = [np.bincount(rng.integers(lo, hi, 500), minlength=256)
+                 for lo, hi in [(0, 256), (100, 140), (7, 8), (0, 2)]]
+        
+        assert list(otsu_thresholds(np.array(hists))) == [naive_otsu(h) for h in hists]
+    
+    def test_multi_scale_otsu_per_tile(self):
+        gray = cv2.cvtColor(sketch(100), cv2.COLOR_BGR2GRAY)
+        out = apply_algorithm("multiScaleOtsu", gray, {"tileSize": 32})
+        
+        for y, x in itertools.product(range(0, 100, 32), range(0, 100, 32)):
+            tile = gray[y:y + 32, x:x + 32]
+            threshold = naive_otsu(np.bincount(tile.ravel(), minlength=256))
+            assert np.array_equal(out[y:y + 32, x:x + 32], np.where(tile > threshold, 255, 0))
+    
+    def test_multi_otsu_two_classes_is_otsu(self):
+        hist = np.bincount(cv2.cvtColor(sketch(), cv2.COLOR_BGR2GRAY).ravel(), minlength=256)
+        
+        assert list(multi_otsu_thresholds(hist, 2)) == [otsu_thresholds(hist)[0]]
+    
+    def test_multi_otsu_separates_modes(self):
+        values = np.concatenate([np.full(100, 20), np.full(100, 120), np.full(100, 220)])
+        thresholds = multi_otsu_thresholds(np.bincount(values, minlength=256), 3)
+        
+        assert len(thresholds) == 2
+        assert 20 <= thresholds[0] < 120 <= thresholds[1] < 220
+        img = values.reshape(10, 30).astype(np.uint8)
+        assert set(np.unique(apply_algorithm("multiOtsu", img, {"classes": 3}))) == {0, 128, 255}
+
+
+class TestFilters:
+    """Test filters against direct OpenCV calls."""
+    
+    def test_sobel_threshold_is_kernel_independent(self):
+        # A ramp with slope 10 per pixel has 3×3 Sobel magnitude 80
+        ramp = np.tile((np.arange(64) * 10 % 256).astype(np.uint8)[:20], (20, 1))
+        for ksize in (1, 3, 5, 7):
+            low = apply_algorithm("sobelEdges", ramp, {"ksize": ksize, "threshold": 60,
+                                                       "direction": "horizontal"})
+            high = apply_algorithm("sobelEdges", ramp, {"ksize": ksize, "threshold": 100,
+                                                        "direction": "horizontal"})
+            assert low[10, 8:12].all() and not high[10, 8:12].any()
+    
+    def test_unsharp_threshold_leaves_flat_areas(self):
+        img = sketch()
+        out = apply_algorithm("unsharpMask", img, {"threshold": 50})
+        
+        assert np.array_equal(out[100:110, 130:140], img[100:110, 130:140])
+        assert not np.array_equal(apply_algorithm("unsharpMask", img, {"threshold": 0}), img)
+    
+    def test_clahe_is_opencv(self):
+        gray = cv2.cvtColor(sketch(), cv2.COLOR_BGR2GRAY)
+        expected = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 4)).apply(gray)
+        
+        assert np.array_equal(apply_algorithm("clahe", gray, {"clipLimit": 2, "tileGridSize": 4}),
+                              expected)
+    
+    @pytest.mark.parametrize("method", ["zhang-suen", "guo-hall", "thin"])
+    def test_skeleton_is_thin(self, method):
+        img = np.full((60, 60), 255, dtype=np.uint8)
+        cv2.rectangle(img, (10, 25), (50, 35), 0, -1)
+        out = apply_algorithm("skeletonization", img, {"method": method})
+        
+        assert 0 < np.count_nonzero(out) < np.count_nonzero(255 - img) // 4
+    
+    def test_fourier_high_pass_removes_gradient(self):
+        gradient = np.tile(np.linspace(60, 250, 64).astype(np.uint8), (64, 1))
+        img = gradient.copy()
+        img[30:34, :] = 0
+        out = apply_algorithm("fourierTransform", img, {"filterType": "gaussian"})
+        
+        # The line stands out; the smooth background (away from the
+        # wrap-around seam) is flattened
+        assert out[31:33, 10:54].mean() < out[5:25, 10:54].mean() - 30
+        assert np.ptp(out[5:25, 10:54].mean(axis=0)) < 10
+    
+    def test_workspace_intermediates_are_shared(self):
+        ws = Workspace(sketch())
+        apply_algorithm("sauvolaThreshold", ws, {"windowSize": 21, "k": 0.1})
+        apply_algorithm("sauvolaThreshold", ws, {"windowSize": 21, "k": 0.4})
+        apply_algorithm("localVariance", ws, {"windowSize": 21})
+        
+        # gray and one set of 21×21 statistics, computed once each
+        assert ws.stats() == {"intermediates": 2, "hits": 4, "misses": 2}
@@ -0,0 +1,255 @@
+"""Tests for parameter sweeps and the shared workspace."""
+
+import gc
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ..catalogue import apply_algorithm, get_algorithm
+from ..sweep import (
+    Combination,
+    SweepBusyError,
+    SweepExecutor,
+    apply_pipeline,
+    encode_image,
+    expand_grid,
+    preview_combinations,
+    run_sweep,
+)
+from ..workspace import Workspace
+
+
+def sketch(size=120):
+    img = np.full((size, size, 3), 230, dtype=np.uint8)
+    cv2.line(img, (10, 10), (size - 10, size - 20), (40, 40, 40), 2)
+    cv2.rectangle(img, (20, 60), (60, 100), (150, 150, 150), -1)
+    return img
+
+
+class TestWorkspace:
+    """Test memoized intermediates."""
+    
+    def test_computes_once(self):
+        ws = Workspace(sketch())
+        calls = []
+        first = ws.memo("key", lambda: calls.append(1) or np.zeros(3))
+        second = ws.memo("key", lambda: calls.append(1) or np.ones(3))
+        
+        assert first is second and calls == [1]
+        assert not first.flags.writeable
+        assert ws.stats() == {"intermediates": 1, "hits": 1, "misses": 1}
+    
+    def test_concurrent_callers_wait_for_first(self):
+        ws = Workspace(sketch())
+        calls = []
+        
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ws.memo("k", slow)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert results == [42] * 4 and calls == [1]
+    
+    def test_errors_are_cached(self):
+        ws = Workspace(sketch())
+        
+        for _ in range(2):
+            with pytest.raises(ZeroDivisionError):
+                ws.memo("bad", lambda: 1 // 0)
+        assert ws.stats()["misses"] == 1
+    
+    def test_image_is_read_only_copy(self):
+        img = sketch()
+        ws = Workspace(img)
+        
+        assert img.flags.writeable and not ws.image.flags.writeable
+        assert ws.image is not img
+    
+    @pytest.mark.parametrize("img", [np.zeros((4, 4), dtype=np.float32),
+                                     np.zeros((4, 4, 4), dtype=np.uint8)])
+    def test_invalid_image(self, img):
+        with pytest.raises(ValueError):
+            Workspace(img)
+    
+    def test_grayscale_methods(self):
+        ws = Workspace(np.array([[[10, 20, 90]]], dtype=np.uint8))
+        
+        assert ws.gray()[0, 0] == cv2.cvtColor(ws.image, cv2.COLOR_BGR2GRAY)[0, 0]
+        assert ws.gray("average")[0, 0] == 40
+        assert ws.gray("lightness")[0, 0] == 50
+        assert ws.gray("custom", (1, 0, 0))[0, 0] == 90
+        with pytest.raises(ValueError):
+            ws.gray("nope")
+
+
+class TestCombinations:
+    """Test grid expansion and the dashboard's preview selection."""
+    
+    def test_expand_grid(self):
+        combos = expand_grid(get_algorithm("edgeDetection"),
+                             {"lowThreshold": [20, 50], "highThreshold": [100, 150, 200]})
+        
+        assert len(combos) == 6
+        assert combos[1].params == {"lowThreshold": 20, "highThreshold": 150}
+        assert combos[1].label == "lowThreshold: 20, highThreshold: 150"
+    
+    @pytest.mark.parametrize("grid", [{"nope": [1]}, {"lowThreshold": []}, {"lowThreshold": 20}])
+    def test_invalid_grid(self, grid):
+        with pytest.raises(ValueError):
+            expand_grid(get_algorithm("edgeDetection"), grid)
+    
+    def test_grid_limit(self):
+        with pytest.raises(ValueError):
+            expand_grid(get_algorithm("edgeDetection"),
+                        {"lowThreshold": list(range(10, 150)), "highThreshold": [100, 200]})
+    
+    def test_preview_single_parameter(self):
+        combos = preview_combinations(get_algorithm("gammaCorrection"))
+        
+        assert [c.params["gamma"] for c in combos] == [0.3, 0.7, 1.0, 1.5, 2.2]
+        assert combos[0].label == "gamma: 0.3"
+    
+    def test_preview_two_parameters_extremes_first(self):
+        combos = preview_combinations(get_algorithm("sauvolaThreshold"))
+        points = [(c.params["windowSize"], c.params["k"]) for c in combos]
+        
+        assert points[:5] == [(15, 0.1), (15, 0.5), (75, 0.1), (75, 0.5), (51, 0.3)]
+        assert points[5:9] == [(15, 0.3), (75, 0.3), (51, 0.1), (51, 0.5)]
+        assert len(points) == 9 == len(set(points))
+        assert len(preview_combinations(get_algorithm("sauvolaThreshold"), 15)) == 15
+    
+    def test_preview_many_parameters(self):
+        labels = [c.label for c in preview_combinations(get_algorithm("edgeDetection"))]
+        
+        assert labels[:3] == ["Default settings", "Minimal settings", "Maximal settings"]
+        assert labels[3:] == ["lowThreshold: 20 (others default)",
+                              "lowThreshold: 120 (others default)",
+                              "highThreshold: 80 (others default)",
+                              "highThreshold: 280 (others default)",
+                              "gaussianKernel: 3 (others default)",
+                              "gaussianKernel: 7 (others default)"]
+        combos = preview_combinations(get_algorithm("edgeDetection"), 15)
+        assert combos[-1].label == "Balanced settings"
+
+
+class TestRunSweep:
+    """Test parallel sweeps."""
+    
+    def test_results_match_single_runs(self):
+        img = sketch()
+        combos = expand_grid(get_algorithm("sauvolaThreshold"),
+                             {"windowSize": [15, 31], "k": [0.1, 0.3, 0.5]})
+        items = list(run_sweep(img, "sauvolaThreshold", combos, workers=3))
+        
+        assert sorted(i.index for i in items) == list(range(6))
+        for item in items:
+            assert item.ok
+            expected = apply_algorithm("sauvolaThreshold", img, combos[item.index].params)
+            assert np.array_equal(item.image, expected)
+    
+    def test_base_params_and_defaults(self):
+        items = list(run_sweep(sketch(), "edgeDetection",
+                               [Combination({"lowThreshold": 30})],
+                               base_params={"highThreshold": 90}))
+        
+        assert items[0].params == {"lowThreshold": 30, "highThreshold": 90,
+                                   "gaussianKernel": 5, "L2gradient": "true"}
+    
+    def test_invalid_combination_does_not_stop_sweep(self):
+        combos = [Combination({"gamma": 0.5}), Combination({"gamma": 99}, "bad"),
+                  Combination({"gamma": 2.0})]
+        items = sorted(run_sweep(sketch(), "gammaCorrection", combos), key=lambda i: i.index)
+        
+        assert [i.ok for i in items] == [True, False, True]
+        assert items[1].label == "bad" and items[1].params == {"gamma": 99}
+    
+    def test_default_preview_combinations(self):
+        items = list(run_sweep(sketch(), "sauvolaThreshold"))
+        
+        assert len(items) == 9 and all(i.ok for i in items)
+    
+    def test_pipeline_runs_first(self):
+        img = sketch()
+        pipeline = [{"algorithm": "gaussianBlur", "params": {"kernelSize": 5}},
+                    {"algorithm": "grayscale"}]
+        item, = run_sweep(img, "otsuThreshold", [Combination({})], pipeline=pipeline)
+        expected = apply_algorithm("otsuThreshold", apply_pipeline(img, pipeline))
+        
+        assert np.array_equal(item.image, expected)
+    
+    def test_encoded_results(self):
+        item, = run_sweep(sketch(), "grayscale", [Combination({})], encode=encode_image)
+        
+        assert item.image is None
+        decoded = cv2.imdecode(np.frombuffer(item.encoded, np.uint8), cv2.IMREAD_UNCHANGED)
+        assert np.array_equal(decoded, cv2.cvtColor(sketch(), cv2.COLOR_BGR2GRAY))
+    
+    @pytest.mark.parametrize("kwargs", [
+        {"algorithm": "nope"},
+        {"algorithm": "clahe", "pipeline": [{"params": {}}]},
+        {"algorithm": "clahe", "pipeline": [{"algorithm": "clahe", "params": {"x": 1}}]},
+    ])
+    def test_invalid_sweep_raises_up_front(self, kwargs):
+        with pytest.raises(ValueError):
+            run_sweep(sketch(), **kwargs)
+    
+    def test_shared_executor(self):
+        executor = SweepExecutor(workers=2)
+        try:
+            first = list(run_sweep(sketch(), "sauvolaThreshold", executor=executor))
+            second = list(run_sweep(sketch(), "gammaCorrection", executor=executor))
+            
+            assert len(first) == 9 and all(i.ok for i in first + second)
+            assert executor.stats()["in_flight"] == 0
+            assert executor.stats()["completed"] == len(first) + len(second)
+        finally:
+            executor.shutdown()
+    
+    def test_saturated_executor_rejects_sweeps(self):
+        executor = SweepExecutor(workers=1, max_queue=1)
+        try:
+            first = run_sweep(sketch(), "gammaCorrection", executor=executor)
+            with pytest.raises(SweepBusyError) as e:
+                run_sweep(sketch(), "grayscale", executor=executor)
+            assert e.value.retry_after >= 1
+            assert executor.stats()["rejected"] == 1
+            
+            # The admitted sweep never has more than its slots outstanding
+            items = []
+            for item in first:
+                assert executor.stats()["in_flight"] <= executor.capacity
+                items.append(item)
+            assert len(items) == 5 and all(item.ok for item in items)
+            assert executor.stats()["reserved"] == 0
+            assert list(run_sweep(sketch(), "grayscale", [Combination({})],
+                                  executor=executor))[0].ok
+        finally:
+            executor.shutdown()
+    
+    def test_dropped_sweep_releases_its_slots(self):
+        executor = SweepExecutor(workers=1, max_queue=0)
+        try:
+            items = run_sweep(sketch(), "grayscale", [Combination({})], executor=executor)
+            assert executor.stats()["reserved"] == 1
+            
+            del items
+            gc.collect()
+            
+            assert executor.stats()["reserved"] == 0
+        finally:
+            executor.shutdown()
+    
+    def test_unknown_output_format(self):
+        with pytest.raises(ValueError):
+            encode_image(sketch(), "gif")
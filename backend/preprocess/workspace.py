@@ -0,0 +1,184 @@
+"""Intermediate results shared by every algorithm run on one image."""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+import cv2
+import numpy as np
+
+T = TypeVar("T")
+
+# Grayscale weights (red, green, blue) of the "luminance" method
+LUMINANCE_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+class Workspace:
+    """An input image plus memoized intermediates derived from it.
+
+    Algorithms ask the workspace for what they need (the grayscale image,
+    a blur of a given kernel, local statistics for a window, ...). Each
+    intermediate is computed once, by the first caller, and shared with
+    every later caller, including callers on other threads, which wait for
+    the first computation instead of repeating it. Shared arrays are
+    read-only.
+
+    Attributes:
+        image: Input image (BGR or grayscale uint8), read-only
+        hits: Intermediate requests served from the memo
+        misses: Intermediates computed
+    """
+
+    def __init__(self, image: np.ndarray) -> None:
+        """Wrap an image.
+
+        Raises:
+            ValueError: If the image is not a uint8 grayscale or BGR array
+        """
+        if (image.dtype != np.uint8
+                or not (image.ndim == 2
+                        or (image.ndim == 3 and image.shape[2] == 3))):
+            raise ValueError(f"Expected a uint8 grayscale or BGR image, got "
+                             f"{image.shape} {image.dtype}")
+        self.image = image.copy() if image.flags.writeable else image
+        self.image.flags.writeable = False
+        self.hits = 0
+        self.misses = 0
+        self._memo: Dict[Hashable, "Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    def memo(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Value of ``compute()`` for ``key``, computed at most once.
+
+        Exceptions are cached too: every caller of a failing key sees the
+        same error.
+        """
+        with self._lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = self._memo[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        assert future is not None
+        if owner:
+            try:
+                value = compute()
+                if isinstance(value, np.ndarray):
+                    value.flags.writeable = False
+                future.set_result(value)
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()  # type: ignore[no-any-return]
+
+    def stats(self) -> Dict[str, int]:
+        """Memo counters."""
+        with self._lock:
+            return {"intermediates": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+    # Shared intermediates
+
+    def gray(self, method: str = "luminance",
+             weights: Tuple[float, float, float] = LUMINANCE_WEIGHTS) -> np.ndarray:
+        """Grayscale image.
+
+        Args:
+            method: "luminance", "average", "lightness" (mean of the largest
+                and smallest channel) or "custom" (``weights``)
+            weights: Red, green and blue weights for "custom"
+
+        Raises:
+            ValueError: If the method is unknown
+        """
+        if self.image.ndim == 2:
+            return self.image
+        if method == "luminance":
+            return self.memo(("gray", method), lambda: cv2.cvtColor(self.image,
+                                                                    cv2.COLOR_BGR2GRAY))
+        if method == "average":
+            return self.memo(("gray", method),
+                             lambda: _weighted_gray(self.image, (1 / 3, 1 / 3, 1 / 3)))
+        if method == "lightness":
+            return self.memo(("gray", method), lambda: _lightness(self.image))
+        if method == "custom":
+            key = ("gray", method, tuple(float(w) for w in weights))
+            return self.memo(key, lambda: _weighted_gray(self.image, weights))
+        raise ValueError(f"Unknown grayscale method: {method}")
+
+    def blur(self, ksize: int, sigma: float, gray: bool = False) -> np.ndarray:
+        """Gaussian blur of the image (or of its luminance with ``gray``).
+
+        ``ksize`` is rounded up to odd; 1 returns the source unchanged, and
+        ``sigma`` 0 derives sigma from the kernel size, as in OpenCV.
+        """
+        ksize = int(ksize) | 1
+        source = self.gray() if gray else self.image
+        if ksize == 1:
+            return source
+        return self.memo(("blur", gray, ksize, float(sigma)),
+                         lambda: cv2.GaussianBlur(source, (ksize, ksize), sigma,
+                                                  borderType=cv2.BORDER_REPLICATE))
+
+    def local_stats(self, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Local mean and variance (float32) of the grayscale image over
+        ``window``×``window`` neighbourhoods, with replicated borders."""
+        window = int(window)
+
+        def compute() -> Tuple[np.ndarray, np.ndarray]:
+            gray = self.gray()
+            size = (window, window)
+            mean = cv2.boxFilter(gray, cv2.CV_32F, size, borderType=cv2.BORDER_REPLICATE)
+            mean_sq = cv2.sqrBoxFilter(gray, cv2.CV_32F, size, borderType=cv2.BORDER_REPLICATE)
+            variance = cv2.max(cv2.subtract(mean_sq, cv2.multiply(mean, mean)), 0)
+            mean.flags.writeable = False
+            variance.flags.writeable = False
+            return mean, variance
+
+        return self.memo(("local_stats", window), compute)
+
+    def histogram(self) -> np.ndarray:
+        """256-bin histogram of the grayscale image (int64)."""
+        return self.memo("histogram",
+                         lambda: np.bincount(self.gray().ravel(), minlength=256))
+
+    def otsu(self) -> np.ndarray:
+        """Otsu binarization of the grayscale image (255 above the threshold)."""
+        return self.memo("otsu", lambda: cv2.threshold(
+            self.gray(), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1])
+
+    def canny(self, low: float, high: float, ksize: int = 5, l2: bool = True) -> np.ndarray:
+        """Canny edges of the grayscale image after a ``ksize`` Gaussian blur."""
+        blurred = self.blur(ksize, 0, gray=True)
+        return self.memo(("canny", float(low), float(high), int(ksize) | 1, l2),
+                         lambda: cv2.Canny(blurred, low, high, L2gradient=l2))
+
+    def gradients(self, ksize: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sobel x and y derivatives (float32) of the grayscale image."""
+        def compute() -> Tuple[np.ndarray, np.ndarray]:
+            gray = self.gray()
+            gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=ksize, borderType=cv2.BORDER_REPLICATE)
+            gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=ksize, borderType=cv2.BORDER_REPLICATE)
+            gx.flags.writeable = False
+            gy.flags.writeable = False
+            return gx, gy
+
+        return self.memo(("gradients", int(ksize)), compute)
+
+    def spectrum(self) -> np.ndarray:
+        """Discrete Fourier transform of the grayscale image (h×w×2 float32)."""
+        return self.memo("spectrum", lambda: cv2.dft(
+            self.gray().astype(np.float32), flags=cv2.DFT_COMPLEX_OUTPUT))
+
+
+def _weighted_gray(img: np.ndarray, weights: Tuple[float, float, float]) -> np.ndarray:
+    """Gray from red, green and blue weights (saturating, like the dashboard)."""
+    red, green, blue = (float(w) for w in weights)
+    return cv2.transform(img, np.array([[blue, green, red]], dtype=np.float32))
+
+
+def _lightness(img: np.ndarray) -> np.ndarray:
+    b, g, r = cv2.split(img)
+    high = cv2.max(cv2.max(b, g), r)
+    low = cv2.min(cv2.min(b, g), r)
+    return cv2.addWeighted(high, 0.5, low, 0.5, 0)
@@ -81,6 +81,7 @@ export default function CameraScreen({ navigation, route }) {
 
       const { 
         preview_png, 
+        preview_media_type = 'image/png',
         alignment_score, 
         quality_feedback,
         quality_valid,
@@ -88,7 +89,7 @@ export default function CameraScreen({ navigation, route }) {
       } = response.data;
 
       // Update UI with results
-      setOverlayImg(`data:image/png;base64,${preview_png}`);
+      setOverlayImg(`data:${preview_media_type};base64,${preview_png}`);
       setAlignmentScore(alignment_score);
 
       // Show quality feedback
@@ -1,18 +1,52 @@
 """FastAPI server for MASTER-STROKE capture endpoint."""
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import cv2
 import numpy as np
 import base64
 import json
-from typing import Optional
+import os
+import struct
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import logging
 
 # Import capture module
-from backend.capture.pipeline import run_capture, validate_capture_quality
-from backend.capture.models import CaptureResult
+from backend.capture.pipeline import (
+    NO_PAPER_FEEDBACK,
+    LazyCaptureResult,
+    feedback_for_score,
+    run_capture,
+    validate_capture_quality,
+)
+from backend.capture.batch import run_capture_batch
+from backend.capture.bundles import BundleStep, load_bundles
+from backend.capture.cache import CachedResponse, ResponseCache
+from backend.capture.encoding import PreviewOptions
+from backend.capture.ingest import (
+    ImageHeader,
+    UploadTooLargeError,
+    choose_reduction,
+    decode_image,
+    decode_transform,
+    probe_image,
+    read_upload,
+    run_capture_encoded,
+)
+from backend.capture.executor import CaptureExecutor, ExecutorBusyError
+from backend.capture.geometry import transform_quad
+from backend.capture.metrics import get_metrics
+from backend.capture.models import StageTimings
+from backend.capture.stream import StreamSession
+from backend.capture.svg_overlay import configure_overlay_cache, get_overlay_cache
+from backend.preprocess import (ALGORITHMS, SweepBusyError, SweepExecutor, encode_image,
+                                expand_grid, get_algorithm, run_sweep)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +69,136 @@ app.add_middleware(
 )
 
 
+# Pipeline execution backend, configured through the environment:
+#   CAPTURE_EXECUTOR   "thread" (default) or "process"
+#   CAPTURE_WORKERS    number of workers (default: CPU count)
+#   CAPTURE_MAX_QUEUE  captures allowed to wait for a worker before 503s
+executor = CaptureExecutor(
+    backend=os.environ.get("CAPTURE_EXECUTOR", "thread"),
+    workers=int(os.environ["CAPTURE_WORKERS"]) if "CAPTURE_WORKERS" in os.environ else None,
+    max_queue=int(os.environ["CAPTURE_MAX_QUEUE"]) if "CAPTURE_MAX_QUEUE" in os.environ else None,
+)
+
+
+# Rendered overlay cache: OVERLAY_CACHE_MB memory budget, optional
+# OVERLAY_CACHE_DIR for a disk tier shared by worker processes
+if "OVERLAY_CACHE_MB" in os.environ or "OVERLAY_CACHE_DIR" in os.environ:
+    configure_overlay_cache(
+        max_bytes=int(os.environ.get("OVERLAY_CACHE_MB", "256")) * 1024 * 1024,
+        disk_dir=os.environ.get("OVERLAY_CACHE_DIR"),
+    )
+
+
+# Cache of /capture responses keyed by upload content and parameters, so
+# retried or re-submitted photos skip the pipeline:
+#   RESPONSE_CACHE_MB       memory tier budget (default 64; 0 disables the cache)
+#   RESPONSE_CACHE_DIR      optional directory for a disk tier
+#   RESPONSE_CACHE_DISK_MB  disk tier budget (default 1024)
+#   RESPONSE_CACHE_TTL      entry lifetime in seconds (default 3600)
+response_cache = (ResponseCache(
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MB", "64")) * 1024 * 1024,
+    disk_dir=os.environ.get("RESPONSE_CACHE_DIR"),
+    disk_max_bytes=int(os.environ.get("RESPONSE_CACHE_DISK_MB", "1024")) * 1024 * 1024,
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "3600")),
+) if os.environ.get("RESPONSE_CACHE_MB", "64") != "0" else None)
+
+
+# Default preview encoding, overridable per request:
+#   PREVIEW_FORMAT      "png" (default), "jpeg" or "webp"
+#   PREVIEW_PNG_LEVEL   PNG zlib level 0-9 (default 9)
+#   PREVIEW_QUALITY     JPEG/WebP quality 1-100 (default 85)
+#   PREVIEW_MAX_SIZE    longest preview side in pixels (default: full size)
+default_preview = PreviewOptions(
+    format=os.environ.get("PREVIEW_FORMAT", "png"),
+    png_level=int(os.environ.get("PREVIEW_PNG_LEVEL", "9")),
+    quality=int(os.environ.get("PREVIEW_QUALITY", "85")),
+    max_size=int(os.environ["PREVIEW_MAX_SIZE"]) if "PREVIEW_MAX_SIZE" in os.environ else None,
+)
+
+RESPONSE_MODES = ("json", "binary", "multipart")
+
+# Maximum number of images in one /capture/batch request
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "50"))
+
+# Shorter side /capture/quad decodes viewfinder frames down to
+QUAD_DECODE_SIDE = 480
+
+# Upload limits: bytes per uploaded file and decoded pixels per image
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", "32")) * 1024 * 1024
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", "100000000"))
+
+# Allowance for multipart boundaries and form fields on top of the file bytes
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+# SERVER_TIMING=1 adds a Server-Timing header with per-stage durations to
+# capture responses
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+metrics = get_metrics()
+
+
+# Preprocessing sweeps share one bounded pool:
+#   PREPROCESS_WORKERS    threads shared by all sweeps (default: CPU count)
+#   PREPROCESS_MAX_QUEUE  combinations allowed to wait for a thread (default:
+#                         2 × workers); a sweep reserves a slot per combination
+#                         up front and gets 503 if they are not free
+#   PREPROCESS_MAX_SIZE   longest image side sweeps run at (default 1080;
+#                         requests may ask for less)
+sweep_executor = SweepExecutor(
+    workers=int(os.environ["PREPROCESS_WORKERS"]) if "PREPROCESS_WORKERS" in os.environ else None,
+    max_queue=(int(os.environ["PREPROCESS_MAX_QUEUE"])
+               if "PREPROCESS_MAX_QUEUE" in os.environ else None),
+)
+PREPROCESS_MAX_SIZE = int(os.environ.get("PREPROCESS_MAX_SIZE", "1080"))
+
+
+# Precomputed tutorial bundles (see backend.capture.bundles), memory-mapped once
+# at startup from TUTORIAL_BUNDLE_DIR
+bundles = (load_bundles(os.environ["TUTORIAL_BUNDLE_DIR"])
+           if "TUTORIAL_BUNDLE_DIR" in os.environ else {})
+
+
+# Middleware registered later wraps the earlier ones, so request latency is
+# the outermost layer and also times the requests rejected by the body limit
+@app.middleware("http")
+async def limit_request_body(request: Request, call_next):
+    """Reject uploads whose declared Content-Length is over the limit.
+    
+    Runs before the multipart body is parsed, so oversized uploads are never
+    spooled. Bodies sent without a Content-Length (chunked) are still
+    bounded per file by ``read_upload``, but only after spooling.
+    """
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length is not None and length.isdigit():
+        files = MAX_BATCH_SIZE if request.url.path == "/capture/batch" else 1
+        limit = files * MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+        if int(length) > limit:
+            metrics.failures.inc("too_large")
+            return JSONResponse(status_code=413,
+                                content={"detail": f"Request exceeds {limit} bytes"})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time every request into the request latency histogram."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep the series bounded
+    route = request.scope.get("route")
+    metrics.request_seconds.observe(time.perf_counter() - start, request.method,
+                                    getattr(route, "path", "unmatched"), str(response.status_code))
+    return response
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    """Stop pipeline and sweep workers with the server."""
+    executor.shutdown(wait=False)
+    sweep_executor.shutdown(wait=False)
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -44,22 +208,49 @@ async def root():
 @app.post("/capture")
 async def capture(
     file: UploadFile = File(...),
-    step_svg: Optional[str] = Form(None)
+    step_svg: Optional[str] = Form(None),
+    tutorial: Optional[str] = Form(None),
+    step: Optional[int] = Form(None),
+    preview_format: Optional[str] = Form(None),
+    preview_quality: Optional[int] = Form(None),
+    preview_level: Optional[int] = Form(None),
+    preview_max_size: Optional[int] = Form(None),
+    response_mode: str = Form("json")
 ):
     """Process captured image with paper detection and optional overlay.
     
     Args:
         file: Uploaded image file (JPEG/PNG)
         step_svg: Optional SVG file path for ghost overlay
+        tutorial: Optional tutorial bundle name; with ``step``, its
+            precomputed overlay is used instead of ``step_svg``
+        step: Tutorial step number
+        preview_format: Preview codec: "png", "jpeg" or "webp"
+        preview_quality: JPEG/WebP quality (1-100)
+        preview_level: PNG compression level (0-9)
+        preview_max_size: Longest preview side in pixels
+        response_mode: "json" (default), "binary" for the raw preview as the
+            body with metadata in X- headers, or "multipart" for a
+            multipart/mixed body with a JSON part and an image part
         
     Returns:
         JSON response with:
             - alignment_score: Paper detection quality (0-1)
             - preview_png: Base64 encoded preview image
+            - preview_media_type: MIME type of the preview
             - warp_matrix: 3x3 homography matrix as list
             - quality_feedback: Human-readable quality assessment
+        In binary and multipart modes the preview is sent unencoded.
     """
     try:
+        if response_mode not in RESPONSE_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown response mode: {response_mode}"
+            )
+        preview = _preview_options(preview_format, preview_quality, preview_level,
+                                   preview_max_size)
+        
         # Validate file type
         if file.content_type not in ["image/jpeg", "image/png"]:
             raise HTTPException(
@@ -67,43 +258,66 @@ async def capture(
                 detail=f"Unsupported file type: {file.content_type}"
             )
         
-        # Read and decode image
-        raw = await file.read()
-        if len(raw) == 0:
-            raise HTTPException(status_code=400, detail="Empty file")
+        ghost_overlay = None
+        if tutorial is not None:
+            ghost_overlay = _bundle_step(tutorial, step).overlay
         
-        # Decode image
-        img_array = np.frombuffer(raw, dtype=np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        # Read the upload and check its header; decoding happens in the worker
+        raw, header = await _read_image(file)
         
-        if img is None:
-            raise HTTPException(status_code=400, detail="Failed to decode image")
+        # Identical upload with identical parameters: answer from the cache
+        cache_key = await run_in_threadpool(_response_cache_key, raw, step_svg, tutorial,
+                                            step, preview)
+        if cache_key is not None:
+            assert response_cache is not None
+            cached = await run_in_threadpool(response_cache.get, cache_key)
+            metrics.response_cache.inc("hit" if cached is not None else "miss")
+            if cached is not None:
+                response = _capture_response(cached.body, cached.metadata, response_mode)
+                response.headers["X-Cache"] = "hit"
+                return response
         
-        logger.info(f"Processing image: {img.shape}, SVG: {step_svg}")
+        logger.info(f"Processing image: {header.oriented_size}, SVG: {step_svg}")
         
-        # Run capture pipeline
+        # Run capture pipeline on the executor
+        try:
+            # Only the preview is kept; flat is not sent back from workers
+            future = executor.submit(np.frombuffer(raw, dtype=np.uint8),
+                                     func=run_capture_encoded, ghost_svg=step_svg,
+                                     ghost_overlay=ghost_overlay, preview=preview,
+                                     outputs=("preview",), max_pixels=MAX_IMAGE_PIXELS)
+        except ExecutorBusyError as e:
+            logger.warning(f"Capture rejected: {str(e)}")
+            metrics.failures.inc("busy")
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": str(e.retry_after)}
+            )
         try:
-            result: CaptureResult = run_capture(img, ghost_svg=step_svg)
+            result: LazyCaptureResult = await asyncio.wrap_future(future)
         except ValueError as e:
             # Handle paper detection failure gracefully
             logger.warning(f"Capture failed: {str(e)}")
+            metrics.record_failure(e)
             raise HTTPException(status_code=422, detail=str(e))
         
-        # Validate quality
-        is_valid, feedback = validate_capture_quality(result)
-        
-        # Prepare response
-        response = {
-            "alignment_score": result.alignment_score,
-            "preview_png": base64.b64encode(result.preview_png).decode('utf-8'),
-            "warp_matrix": result.warp_matrix.tolist(),
-            "quality_feedback": feedback,
-            "quality_valid": is_valid
-        }
-        
         logger.info(f"Capture successful: score={result.alignment_score:.2f}")
         
-        return JSONResponse(content=response)
+        # Prepare response
+        with result.timings.time("serialize"):
+            metadata = _capture_metadata(result)
+            response = _capture_response(result.preview_png, metadata, response_mode)
+        if cache_key is not None:
+            assert response_cache is not None
+            # Stored after the response is sent, off the event loop: the disk
+            # tier writes, renames and evicts files
+            response.background = BackgroundTask(response_cache.put, cache_key,
+                                                 CachedResponse(result.preview_png, metadata))
+            response.headers["X-Cache"] = "miss"
+        metrics.record(result.timings)
+        _add_server_timing(response, result.timings)
+        return response
         
     except HTTPException:
         raise
@@ -112,6 +326,337 @@ async def capture(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/capture/batch")
+async def capture_batch(
+    files: List[UploadFile] = File(...),
+    step_svg: Optional[str] = Form(None),
+    tutorial: Optional[str] = Form(None),
+    step: Optional[int] = Form(None),
+    preview_format: Optional[str] = Form(None),
+    preview_quality: Optional[int] = Form(None),
+    preview_level: Optional[int] = Form(None),
+    preview_max_size: Optional[int] = Form(None)
+):
+    """Capture many images in one request, streaming results as they finish.
+    
+    Images are decoded and processed in parallel on the capture executor,
+    sharing one overlay render. The response is newline-delimited JSON: one
+    line per image in completion order, each with its ``index`` in the
+    upload and either the /capture JSON fields (``ok: true``) or an
+    ``error`` (``ok: false``), then a final ``{"done": true, ...}`` summary.
+    A failing image does not fail the batch.
+    
+    Args:
+        files: Uploaded image files (JPEG/PNG), at most MAX_BATCH_SIZE
+        step_svg, tutorial, step: Overlay for every image, as for /capture
+        preview_format, preview_quality, preview_level, preview_max_size:
+            Preview encoding, as for /capture
+        
+    Returns:
+        application/x-ndjson stream
+    """
+    if len(files) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many images: {len(files)} (max {MAX_BATCH_SIZE})"
+        )
+    preview = _preview_options(preview_format, preview_quality, preview_level, preview_max_size)
+    ghost_overlay = _bundle_step(tutorial, step).overlay if tutorial is not None else None
+    
+    names = [file.filename for file in files]
+    # Files failing the /capture upload checks get an error line; the rest
+    # are captured (``indices`` maps their batch position to the upload's)
+    rejected: Dict[int, str] = {}
+    indices: List[int] = []
+    raw: List[bytes] = []
+    for index, file in enumerate(files):
+        if file.content_type not in ["image/jpeg", "image/png"]:
+            rejected[index] = f"Unsupported file type: {file.content_type}"
+            continue
+        try:
+            data, _ = await _read_image(file)
+        except HTTPException as e:
+            rejected[index] = e.detail
+            continue
+        indices.append(index)
+        raw.append(data)
+    
+    try:
+        items = await run_in_threadpool(
+            run_capture_batch, raw, ghost_svg=step_svg, ghost_overlay=ghost_overlay,
+            preview=preview, outputs=("preview",), executor=executor,
+            max_pixels=MAX_IMAGE_PIXELS
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    def lines() -> Iterator[bytes]:
+        for index, error in rejected.items():
+            rejection = {"index": index, "filename": names[index], "ok": False, "error": error}
+            yield (json.dumps(rejection) + "\n").encode("utf-8")
+        failed = len(rejected)
+        for item in items:
+            index = indices[item.index]
+            line: Dict[str, Any] = {"index": index, "filename": names[index], "ok": item.ok}
+            result = item.result
+            if item.ok and result is not None:
+                with result.timings.time("serialize"):
+                    line["preview_png"] = base64.b64encode(result.preview_png).decode("utf-8")
+                    line.update(_capture_metadata(result))
+                metrics.record(result.timings)
+            else:
+                failed += 1
+                line["error"] = item.error
+                metrics.failures.inc(item.reason or "error")
+            yield (json.dumps(line) + "\n").encode("utf-8")
+        summary = {"done": True, "count": len(files), "failed": failed}
+        yield (json.dumps(summary) + "\n").encode("utf-8")
+    
+    logger.info(f"Processing batch of {len(raw)} images, SVG: {step_svg}")
+    # A sync iterator is run in the thread pool by StreamingResponse
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _read_image(file: UploadFile) -> Tuple[bytes, ImageHeader]:
+    """Read an upload within the size limit and probe its header, or raise 4xx."""
+    try:
+        raw = await read_upload(file.read, MAX_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        metrics.record_failure(e)
+        raise HTTPException(status_code=413, detail=str(e))
+    if len(raw) == 0:
+        metrics.failures.inc("invalid_input")
+        raise HTTPException(status_code=400, detail="Empty file")
+    
+    try:
+        header = probe_image(raw)
+    except ValueError as e:
+        metrics.record_failure(e)
+        raise HTTPException(status_code=400, detail="Failed to decode image")
+    if header.format == "unknown":
+        metrics.failures.inc("decode")
+        raise HTTPException(status_code=400, detail="Failed to decode image")
+    if header.width * header.height > MAX_IMAGE_PIXELS:
+        metrics.failures.inc("too_large")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image is {header.width}x{header.height}, over {MAX_IMAGE_PIXELS} pixels"
+        )
+    return raw, header
+
+
+def _preview_options(preview_format: Optional[str], preview_quality: Optional[int],
+                     preview_level: Optional[int],
+                     preview_max_size: Optional[int]) -> PreviewOptions:
+    """Per-request preview options over the server defaults, or raise 400."""
+    try:
+        return PreviewOptions(
+            format=preview_format or default_preview.format,
+            png_level=default_preview.png_level if preview_level is None else preview_level,
+            quality=default_preview.quality if preview_quality is None else preview_quality,
+            max_size=preview_max_size or default_preview.max_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _capture_metadata(result: LazyCaptureResult) -> Dict[str, Any]:
+    """Everything about a capture except the preview image itself."""
+    is_valid, feedback = validate_capture_quality(result)
+    return {
+        "alignment_score": result.alignment_score,
+        "warp_matrix": result.warp_matrix.tolist(),
+        "quality_feedback": feedback,
+        "quality_valid": is_valid,
+        "preview_media_type": result.preview_media_type
+    }
+
+
+def _response_cache_key(raw: bytes, step_svg: Optional[str], tutorial: Optional[str],
+                        step: Optional[int], preview: PreviewOptions) -> Optional[str]:
+    """Response cache key of a /capture request, or None if it can't be cached.
+    
+    The SVG's mtime and size are part of the key, so editing it invalidates
+    cached responses (as in the overlay cache).
+    """
+    if response_cache is None:
+        return None
+    svg = None
+    if step_svg and tutorial is None:
+        try:
+            st = os.stat(step_svg)
+        except OSError:
+            # Let the pipeline report the missing file
+            return None
+        svg = [os.path.realpath(step_svg), st.st_mtime_ns, st.st_size]
+    return response_cache.key(raw, {
+        "step_svg": svg,
+        "tutorial": tutorial,
+        "step": step,
+        "preview": [preview.format, preview.png_level, preview.quality, preview.max_size],
+    })
+
+
+def _capture_response(preview: bytes, metadata: Dict[str, Any], response_mode: str) -> Response:
+    """/capture response in the requested mode."""
+    if response_mode == "binary":
+        return _binary_response(preview, metadata)
+    if response_mode == "multipart":
+        return _multipart_response(preview, metadata)
+    return JSONResponse(content={
+        "preview_png": base64.b64encode(preview).decode('utf-8'),
+        **metadata
+    })
+
+
+def _binary_response(preview: bytes, metadata: Dict[str, Any]) -> Response:
+    """Raw preview body with capture metadata in X- headers."""
+    headers = {
+        "X-Alignment-Score": f"{metadata['alignment_score']:.6f}",
+        "X-Warp-Matrix": json.dumps(metadata["warp_matrix"]),
+        "X-Quality-Valid": "true" if metadata["quality_valid"] else "false",
+        "X-Quality-Feedback": metadata["quality_feedback"],
+    }
+    return Response(content=preview, media_type=metadata["preview_media_type"], headers=headers)
+
+
+def _multipart_response(preview: bytes, metadata: Dict[str, Any]) -> Response:
+    """multipart/mixed body: capture metadata as JSON, then the raw preview."""
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode("ascii"),
+        json.dumps(metadata).encode("utf-8"),
+        f"\r\n--{boundary}\r\nContent-Type: {metadata['preview_media_type']}\r\n"
+        f"Content-Length: {len(preview)}\r\n\r\n".encode("ascii"),
+        preview,
+        f"\r\n--{boundary}--\r\n".encode("ascii"),
+    ])
+    return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+
+
+def _add_server_timing(response: Response, timings: StageTimings) -> None:
+    """Attach per-stage durations as a Server-Timing header, if enabled."""
+    if SERVER_TIMING and timings.stages:
+        response.headers["Server-Timing"] = timings.server_timing()
+
+
+def _bundle_step(tutorial: str, step: Optional[int]) -> BundleStep:
+    """Look up a tutorial step in the loaded bundles, or raise 404."""
+    bundle = bundles.get(tutorial)
+    if bundle is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tutorial: {tutorial}")
+    if step is None and not bundle.steps:
+        raise HTTPException(status_code=404, detail=f"Tutorial {tutorial!r} has no steps")
+    try:
+        return bundle.step(step if step is not None else bundle.steps[0])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.get("/tutorials")
+async def list_tutorials():
+    """Tutorials available from loaded bundles, with their step numbers."""
+    return {name: bundle.steps for name, bundle in bundles.items()}
+
+
+@app.get("/tutorials/{tutorial}/steps/{step}/reference")
+async def tutorial_reference(tutorial: str, step: int):
+    """Original reference image for a step, served straight from the bundle."""
+    bundle_step = _bundle_step(tutorial, step)
+    media_type = "image/png" if bundle_step.source.lower().endswith(".png") else "image/jpeg"
+    return Response(content=bundle_step.reference.tobytes(), media_type=media_type)
+
+
+@app.get("/executor/stats")
+async def executor_stats():
+    """Admission counters and per-worker throughput of the pipeline executor."""
+    return executor.stats()
+
+
+@app.get("/metrics")
+async def get_metrics_text():
+    """Stage latency histograms and failure counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and eviction counters of the server's caches."""
+    stats = {"overlay": get_overlay_cache().stats()}
+    if response_cache is not None:
+        stats["response"] = response_cache.stats()
+    return stats
+
+
+@app.post("/capture/quad")
+async def capture_quad(response: Response, file: UploadFile = File(...)):
+    """Detect the paper in a viewfinder frame without processing it.
+    
+    Runs paper detection only, so a downscaled frame (e.g. 480-640 px on
+    the long side) is answered in a few milliseconds. Detection runs
+    directly in the request thread pool rather than queueing behind full
+    captures on the executor.
+    
+    Args:
+        file: Uploaded frame (JPEG/PNG)
+        
+    Returns:
+        JSON with:
+            - found: Whether paper was detected
+            - quad: Corners (TL, TR, BR, BL) in frame pixels, or null
+            - quad_normalized: Corners as fractions of frame width/height
+            - alignment_score: Paper area ÷ frame area (0 if not found)
+            - quality_valid / quality_feedback: As returned by /capture
+    """
+    if file.content_type not in ["image/jpeg", "image/png"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file.content_type}"
+        )
+    
+    raw, header = await _read_image(file)
+    
+    # Detection only needs a small image; larger frames are decoded reduced
+    reduction = choose_reduction(header, QUAD_DECODE_SIDE)
+    timings = StageTimings()
+    try:
+        with timings.time("decode"):
+            img = await run_in_threadpool(decode_image, raw, header, reduction, False)
+    except ValueError as e:
+        metrics.record_failure(e)
+        raise HTTPException(status_code=400, detail="Failed to decode image")
+    w, h = header.oriented_size
+    
+    try:
+        result = await run_in_threadpool(run_capture, img, outputs=("quad",), timings=timings)
+    except ValueError as e:
+        metrics.record_failure(e)
+        _add_server_timing(response, timings)
+        return {
+            "found": False,
+            "quad": None,
+            "quad_normalized": None,
+            "alignment_score": 0.0,
+            "quality_valid": False,
+            "quality_feedback": NO_PAPER_FEEDBACK,
+        }
+    
+    # Back to full-resolution, EXIF-oriented frame pixels
+    assert isinstance(result, LazyCaptureResult)  # outputs were given
+    quad = transform_quad(result.quad, decode_transform(header, reduction)).astype(np.float64)
+    is_valid, feedback = feedback_for_score(result.alignment_score)
+    metrics.record(timings)
+    _add_server_timing(response, timings)
+    return {
+        "found": True,
+        "quad": quad.tolist(),
+        "quad_normalized": (quad / [w, h]).tolist(),
+        "alignment_score": result.alignment_score,
+        "quality_valid": is_valid,
+        "quality_feedback": feedback,
+    }
+
+
 @app.post("/capture/validate")
 async def validate_capture(
     alignment_score: float = Form(...),
@@ -124,16 +669,14 @@ async def validate_capture(
     Returns:
         JSON with validation result and feedback
     """
-    # Create mock result for validation
-    from backend.capture.models import CaptureResult
-    mock_result = CaptureResult(
-        flat=np.zeros((1080, 1080, 3), dtype=np.uint8),
-        warp_matrix=np.eye(3, dtype=np.float32),
-        alignment_score=alignment_score,
-        preview_png=b""
-    )
+    if not 0 <= alignment_score <= 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid alignment score: {alignment_score}"
+        )
     
-    is_valid, feedback = validate_capture_quality(mock_result)
+    # Feedback depends only on the score; no result or image is needed
+    is_valid, feedback = feedback_for_score(alignment_score)
     
     return {
         "valid": is_valid,
@@ -142,6 +685,224 @@ async def validate_capture(
     }
 
 
+class _LatestFrame:
+    """Single-slot mailbox: a new frame replaces any frame not yet processed.
+    
+    This is the stream's backpressure: a slow connection skips stale frames
+    instead of queueing them.
+    """
+    
+    def __init__(self) -> None:
+        self.frame: Optional[Tuple[int, bytes]] = None
+        self.dropped = 0
+        self.closed = False
+        self._event = asyncio.Event()
+    
+    def put(self, seq: int, data: bytes) -> None:
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = (seq, data)
+        self._event.set()
+    
+    def close(self) -> None:
+        self.closed = True
+        self._event.set()
+    
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        while self.frame is None and not self.closed:
+            await self._event.wait()
+            self._event.clear()
+        frame, self.frame = self.frame, None
+        return frame
+
+
+@app.websocket("/capture/stream")
+async def capture_stream(websocket: WebSocket, step_svg: Optional[str] = None):
+    """Stream frames of one drawing session for live alignment feedback.
+    
+    Client messages:
+        binary: 4-byte little-endian sequence number followed by a JPEG/PNG frame
+        text: JSON control message, e.g. {"type": "preview"} to request a preview
+    
+    Server messages (see backend.capture.stream for the layout):
+        binary: a frame message (quad, alignment score, feedback) per processed
+            frame, plus a preview message on request or once the quad is stable
+        text: JSON {"type": "error", "seq": ..., "detail": ...} for bad frames
+    
+    Frames arriving while one is being processed replace each other, so only
+    the newest is processed next.
+    """
+    await websocket.accept()
+    session = StreamSession(ghost_svg=step_svg)
+    mailbox = _LatestFrame()
+    preview_requested = False
+    
+    async def receive() -> None:
+        nonlocal preview_requested
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    data = message["bytes"]
+                    if len(data) <= 4:
+                        continue
+                    (seq,) = struct.unpack_from("<I", data)
+                    mailbox.put(seq, data[4:])
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except json.JSONDecodeError:
+                        continue
+                    if control.get("type") == "preview":
+                        preview_requested = True
+        finally:
+            mailbox.close()
+    
+    async def process() -> None:
+        nonlocal preview_requested
+        while True:
+            frame = await mailbox.get()
+            if frame is None:
+                break
+            seq, data = frame
+            want_preview, preview_requested = preview_requested, False
+            try:
+                message, preview = await run_in_threadpool(
+                    session.process, data, seq, want_preview
+                )
+            except ValueError as e:
+                await websocket.send_text(json.dumps(
+                    {"type": "error", "seq": seq, "detail": str(e)}
+                ))
+                continue
+            await websocket.send_bytes(message)
+            if preview is not None:
+                await websocket.send_bytes(preview)
+    
+    receiver = asyncio.create_task(receive())
+    try:
+        await process()
+    except Exception as e:
+        logger.warning(f"Stream closed: {str(e)}")
+    finally:
+        receiver.cancel()
+        logger.info(f"Stream finished, dropped {mailbox.dropped} stale frames")
+
+
+@app.get("/preprocess/algorithms")
+async def preprocess_algorithms():
+    """Preprocessing algorithm catalogue, in the dashboard's format."""
+    return {key: algorithm.to_dict() for key, algorithm in ALGORITHMS.items()}
+
+
+@app.post("/preprocess/sweep")
+async def preprocess_sweep(
+    file: UploadFile = File(...),
+    algorithm: str = Form(...),
+    grid: Optional[str] = Form(None),
+    params: Optional[str] = Form(None),
+    pipeline: Optional[str] = Form(None),
+    max_size: Optional[int] = Form(None),
+    output_format: str = Form("png")
+):
+    """Run a preprocessing algorithm with many parameter combinations.
+    
+    Combinations run in parallel on one shared workspace, so intermediates
+    they have in common are computed once. The response is newline-delimited
+    JSON: one line per combination in completion order, with its ``index``,
+    resolved ``params``, ``label`` and either the base64 ``image`` (``ok:
+    true``) or an ``error`` (``ok: false``), then a final ``{"done": true,
+    ...}`` summary. An invalid combination does not fail the sweep.
+    
+    Args:
+        file: Uploaded image file (JPEG/PNG)
+        algorithm: Catalogue key (see /preprocess/algorithms)
+        grid: JSON object of values to try per parameter, e.g.
+            ``{"k": [0.1, 0.3]}``; default: the dashboard's preview combinations
+        params: JSON object of values for parameters the grid leaves out
+        pipeline: JSON list of steps run once before the sweep, e.g.
+            ``[{"algorithm": "clahe", "params": {"clipLimit": 2}}]``
+        max_size: Longest side the image is downscaled to (at most, and by
+            default, PREPROCESS_MAX_SIZE)
+        output_format: "png" (default) or "jpeg"
+        
+    Returns:
+        application/x-ndjson stream
+    """
+    try:
+        entry = get_algorithm(algorithm)
+        grid_values = json.loads(grid) if grid else None
+        base_params = json.loads(params) if params else None
+        steps = json.loads(pipeline) if pipeline else None
+        if not isinstance(grid_values, (dict, type(None))):
+            raise ValueError("grid must be a JSON object")
+        if not isinstance(base_params, (dict, type(None))):
+            raise ValueError("params must be a JSON object")
+        if not isinstance(steps, (list, type(None))):
+            raise ValueError("pipeline must be a JSON list")
+        combinations = expand_grid(entry, grid_values) if grid_values is not None else None
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output_format not in ("png", "jpeg"):
+        raise HTTPException(status_code=400, detail=f"Unknown output format: {output_format}")
+    if max_size is not None and max_size < 1:
+        raise HTTPException(status_code=400, detail=f"max_size must be >= 1, got {max_size}")
+    
+    raw, header = await _read_image(file)
+    longest = min(max_size or PREPROCESS_MAX_SIZE, PREPROCESS_MAX_SIZE)
+    
+    def load() -> np.ndarray:
+        # Reduced JPEG decode where it still covers the target size
+        img = decode_image(raw, header, choose_reduction(header, longest),
+                           max_pixels=MAX_IMAGE_PIXELS)
+        scale = longest / max(img.shape[:2])
+        if scale < 1:
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return img
+    
+    try:
+        img = await run_in_threadpool(load)
+        items = await run_in_threadpool(
+            run_sweep, img, algorithm, combinations, base_params=base_params, pipeline=steps,
+            encode=lambda result: encode_image(result, output_format), executor=sweep_executor
+        )
+    except SweepBusyError as e:
+        logger.warning(f"Sweep rejected: {str(e)}")
+        metrics.failures.inc("busy")
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def lines() -> Iterator[bytes]:
+        count = failed = 0
+        started = time.perf_counter()
+        for item in items:
+            count += 1
+            line: Dict[str, Any] = {"index": item.index, "params": item.params,
+                                    "label": item.label, "ok": item.ok}
+            if item.ok:
+                line["image"] = base64.b64encode(item.encoded or b"").decode("utf-8")
+                line["elapsed_ms"] = round(item.elapsed * 1000, 1)
+            else:
+                failed += 1
+                line["error"] = item.error
+            yield (json.dumps(line) + "\n").encode("utf-8")
+        yield (json.dumps({"done": True, "count": count, "failed": failed,
+                           "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                           "width": img.shape[1], "height": img.shape[0]}) + "\n").encode("utf-8")
+    
+    logger.info(f"Preprocessing sweep of {algorithm} on {img.shape[1]}x{img.shape[0]}")
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file